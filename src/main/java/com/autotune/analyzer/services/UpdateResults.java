@@ -36,16 +36,23 @@ import javax.servlet.annotation.WebServlet;
 import javax.servlet.http.HttpServlet;
 import javax.servlet.http.HttpServletRequest;
 import javax.servlet.http.HttpServletResponse;
+import java.io.BufferedReader;
 import java.io.IOException;
+import java.io.InputStreamReader;
 import java.io.PrintWriter;
+import java.io.UncheckedIOException;
 import java.lang.reflect.Type;
 import java.util.ArrayList;
 import java.util.Arrays;
 import java.util.List;
 import java.util.concurrent.ConcurrentHashMap;
 import java.util.stream.Collectors;
+import java.util.zip.GZIPInputStream;
 
 import static com.autotune.analyzer.utils.AnalyzerConstants.ServiceConstants.CHARACTER_ENCODING;
+import static com.autotune.analyzer.utils.AnalyzerConstants.ServiceConstants.CONTENT_ENCODING_HEADER;
+import static com.autotune.analyzer.utils.AnalyzerConstants.ServiceConstants.GZIP_CONTENT_ENCODING;
+import static com.autotune.analyzer.utils.AnalyzerConstants.ServiceConstants.IDENTITY_CONTENT_ENCODING;
 import static com.autotune.analyzer.utils.AnalyzerConstants.ServiceConstants.JSON_CONTENT_TYPE;
 
 /**
@@ -73,7 +80,23 @@ public class UpdateResults extends HttpServlet {
         try {
             // Set the character encoding of the request to UTF-8
             request.setCharacterEncoding(CHARACTER_ENCODING);
-            inputData = request.getReader().lines().collect(Collectors.joining());
+            String contentEncoding = request.getHeader(CONTENT_ENCODING_HEADER);
+            if (!isSupportedContentEncoding(contentEncoding)) {
+                String errorMessage = String.format(AnalyzerErrorConstants.AutotuneObjectErrors.UNSUPPORTED_CONTENT_ENCODING, contentEncoding);
+                LOGGER.error(errorMessage);
+                response.sendError(HttpServletResponse.SC_UNSUPPORTED_MEDIA_TYPE, errorMessage);
+                return;
+            }
+            try (BufferedReader reader = getRequestReader(request, contentEncoding)) {
+                inputData = reader.lines().collect(Collectors.joining());
+            } catch (IOException | UncheckedIOException e) {
+                // A truncated or corrupt gzip payload is a client error
+                if (!isGzipContentEncoding(contentEncoding))
+                    throw e;
+                LOGGER.error("{} : {}", AnalyzerErrorConstants.AutotuneObjectErrors.INVALID_GZIP_PAYLOAD, e.getMessage());
+                response.sendError(HttpServletResponse.SC_BAD_REQUEST, AnalyzerErrorConstants.AutotuneObjectErrors.INVALID_GZIP_PAYLOAD);
+                return;
+            }
             List<UpdateResultsAPIObject> updateResultsAPIObjects;
             Gson gson = new GsonBuilder()
                     .registerTypeAdapter(Double.class, new CustomNumberDeserializer())
@@ -141,6 +164,27 @@ public class UpdateResults extends HttpServlet {
         }
     }
 
+    private boolean isSupportedContentEncoding(String contentEncoding) {
+        return null == contentEncoding
+                || contentEncoding.trim().isEmpty()
+                || contentEncoding.trim().equalsIgnoreCase(IDENTITY_CONTENT_ENCODING)
+                || isGzipContentEncoding(contentEncoding);
+    }
+
+    private boolean isGzipContentEncoding(String contentEncoding) {
+        return null != contentEncoding && contentEncoding.trim().equalsIgnoreCase(GZIP_CONTENT_ENCODING);
+    }
+
+    /**
+     * Returns a reader over the request payload, inflating it when the client sent it gzip compressed
+     */
+    private BufferedReader getRequestReader(HttpServletRequest request, String contentEncoding) throws IOException {
+        if (isGzipContentEncoding(contentEncoding)) {
+            return new BufferedReader(new InputStreamReader(new GZIPInputStream(request.getInputStream()), CHARACTER_ENCODING));
+        }
+        return request.getReader();
+    }
+
     private void sendSuccessResponse(HttpServletResponse response, String message) throws IOException {
         response.setContentType(JSON_CONTENT_TYPE);
         response.setCharacterEncoding(CHARACTER_ENCODING);
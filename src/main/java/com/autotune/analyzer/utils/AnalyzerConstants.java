@@ -281,6 +281,9 @@ public class AnalyzerConstants {
 
         public static final String JSON_CONTENT_TYPE = "application/json";
         public static final String CHARACTER_ENCODING = "UTF-8";
+        public static final String CONTENT_ENCODING_HEADER = "Content-Encoding";
+        public static final String GZIP_CONTENT_ENCODING = "gzip";
+        public static final String IDENTITY_CONTENT_ENCODING = "identity";
         public static final String EXPERIMENT_NAME = "experiment_name";
         public static final String DEPLOYMENTS = "deployments";
         public static final String DEPLOYMENT_NAME = "deployment_name";
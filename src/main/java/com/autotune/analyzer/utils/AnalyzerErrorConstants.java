@@ -93,6 +93,8 @@ public class AnalyzerErrorConstants {
         public static final String UNSUPPORTED_METRIC = "Metric variable name should be among these values: ".concat(Arrays.toString(AnalyzerConstants.MetricName.values()));
         public static final String CONTAINER_AND_EXPERIMENT = " for container : %s for experiment: %s.";
         public static final String JSON_PARSING_ERROR = "Failed to parse the JSON. Please check the input payload ";
+        public static final String UNSUPPORTED_CONTENT_ENCODING = "Unsupported Content-Encoding: %s. Supported encodings are gzip and identity";
+        public static final String INVALID_GZIP_PAYLOAD = "Failed to decompress the gzip payload. Please check the input payload ";
         public static final String AGGREGATION_INFO_INVALID_VALUE = "Invalid value type for aggregation_info objects. Expected a numeric value (Double).";
         public static final String VERSION_MISMATCH = "Version number mismatch found. Expected: %s , Found: %s";
         public static final String NULL_OR_BLANK_CONTAINER_IMAGE_NAME = "container_image_name cannot be null or blank";
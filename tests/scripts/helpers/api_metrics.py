@@ -0,0 +1,263 @@
+"""
+Copyright (c) 2024, 2024 Red Hat, IBM Corporation and others.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import csv
+import json
+import math
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Latencies are recorded in microseconds
+UNITS_PER_SECOND = 1000000
+DEFAULT_SIGNIFICANT_FIGURES = 2
+SUMMARY_PERCENTILES = [50, 90, 99, 99.9]
+# Upper bounds in seconds of the buckets exported in the Prometheus histogram
+PROMETHEUS_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60]
+PROMETHEUS_METRIC = "kruize_client_api_seconds"
+PROMETHEUS_STATUS_METRIC = "kruize_client_api_status_seconds"
+SUMMARY_FIELDS = ["api", "count", "errors", "retries", "response_bytes", "mean", "min", "p50", "p90", "p99", "p99.9",
+                  "max"]
+
+
+class LatencyHistogram:
+    """
+    HDR-style log-linear latency histogram. Values are kept in buckets whose width grows with
+    the magnitude of the value, so any recorded latency is reproduced within a relative error of
+    10^-significant_figures while memory stays bounded whatever the range of latencies.
+    """
+
+    def __init__(self, significant_figures=DEFAULT_SIGNIFICANT_FIGURES):
+        self.significant_figures = significant_figures
+        self.sub_bucket_bits = math.ceil(math.log2(2 * 10 ** significant_figures))
+        self.sub_bucket_count = 1 << self.sub_bucket_bits
+        # Sparse counts keyed by (shift, sub bucket), ordered by the values they hold
+        self.counts = {}
+        self.total_count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def record(self, seconds, count=1):
+        units = max(0, int(round(seconds * UNITS_PER_SECOND)))
+        key = self._bucket_key(units)
+        self.counts[key] = self.counts.get(key, 0) + count
+        self.total_count += count
+        self.total += seconds * count
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = seconds if self.max is None else max(self.max, seconds)
+
+    def _bucket_key(self, units):
+        if units < self.sub_bucket_count:
+            return 0, units
+        shift = units.bit_length() - self.sub_bucket_bits
+        return shift, units >> shift
+
+    @staticmethod
+    def _bucket_highest_value(key):
+        shift, sub_bucket = key
+        return (((sub_bucket + 1) << shift) - 1) / UNITS_PER_SECOND
+
+    def merge(self, other):
+        for key, count in other.counts.items():
+            self.counts[key] = self.counts.get(key, 0) + count
+        self.total_count += other.total_count
+        self.total += other.total
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def mean(self):
+        return self.total / self.total_count if self.total_count else 0.0
+
+    def percentile(self, percentile):
+        if not self.total_count:
+            return 0.0
+        rank = max(1, math.ceil(percentile / 100 * self.total_count))
+        seen = 0
+        for key in sorted(self.counts):
+            seen += self.counts[key]
+            if seen >= rank:
+                return min(self._bucket_highest_value(key), self.max)
+        return self.max
+
+    def count_at_or_below(self, seconds):
+        limit = seconds * UNITS_PER_SECOND
+        return sum(count for key, count in self.counts.items()
+                   if self._bucket_highest_value(key) * UNITS_PER_SECOND <= limit)
+
+    def to_dict(self):
+        return {
+            "significant_figures": self.significant_figures,
+            "total_count": self.total_count,
+            "total": self.total,
+            "min": self.min,
+            "max": self.max,
+            "counts": [[shift, sub_bucket, count] for (shift, sub_bucket), count in sorted(self.counts.items())]
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls(data["significant_figures"])
+        histogram.counts = {(shift, sub_bucket): count for shift, sub_bucket, count in data["counts"]}
+        histogram.total_count = data["total_count"]
+        histogram.total = data["total"]
+        histogram.min = data["min"]
+        histogram.max = data["max"]
+        return histogram
+
+
+class ApiMetrics:
+    """
+    Client side metrics of the Kruize REST API calls: a latency histogram per API, plus
+    per API, method and status counters of calls, response bytes and retries
+    """
+
+    def __init__(self, significant_figures=DEFAULT_SIGNIFICANT_FIGURES):
+        self.significant_figures = significant_figures
+        self.histograms = {}
+        self.calls = {}
+        self._lock = threading.Lock()
+
+    def record(self, api, method, status_code, seconds, response_bytes=0, retries=0):
+        status = str(status_code) if status_code is not None else "error"
+        with self._lock:
+            histogram = self.histograms.get(api)
+            if histogram is None:
+                histogram = self.histograms[api] = LatencyHistogram(self.significant_figures)
+            histogram.record(seconds)
+            calls = self.calls.setdefault((api, method, status), {
+                "count": 0, "seconds": 0.0, "response_bytes": 0, "retries": 0
+            })
+            calls["count"] += 1
+            calls["seconds"] += seconds
+            calls["response_bytes"] += response_bytes
+            calls["retries"] += retries
+
+    def merge(self, other):
+        with self._lock:
+            for api, histogram in other.histograms.items():
+                self.histograms.setdefault(api, LatencyHistogram(histogram.significant_figures)).merge(histogram)
+            for key, calls in other.calls.items():
+                merged = self.calls.setdefault(key, {"count": 0, "seconds": 0.0, "response_bytes": 0, "retries": 0})
+                for field, value in calls.items():
+                    merged[field] += value
+
+    def summary(self):
+        with self._lock:
+            rows = []
+            for api, histogram in sorted(self.histograms.items()):
+                api_calls = [calls for (name, _, status), calls in self.calls.items() if name == api]
+                errors = sum(calls["count"] for (name, _, status), calls in self.calls.items()
+                             if name == api and (status == "error" or int(status) >= 400))
+                row = {
+                    "api": api,
+                    "count": histogram.total_count,
+                    "errors": errors,
+                    "retries": sum(calls["retries"] for calls in api_calls),
+                    "response_bytes": sum(calls["response_bytes"] for calls in api_calls),
+                    "mean": histogram.mean(),
+                    "min": histogram.min,
+                    "max": histogram.max
+                }
+                for percentile in SUMMARY_PERCENTILES:
+                    row["p%s" % percentile] = histogram.percentile(percentile)
+                rows.append(row)
+            return rows
+
+    def print_summary(self):
+        for row in self.summary():
+            print("%s: count : %s  errors : %s  retries : %s  mean : %.3fs  p50 : %.3fs  p90 : %.3fs  p99 : %.3fs  "
+                  "max : %.3fs" % (row["api"], row["count"], row["errors"], row["retries"], row["mean"], row["p50"],
+                                   row["p90"], row["p99"], row["max"]))
+
+    def write_csv(self, filename):
+        with open(filename, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=SUMMARY_FIELDS)
+            writer.writeheader()
+            writer.writerows(self.summary())
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "histograms": {api: histogram.to_dict() for api, histogram in self.histograms.items()},
+                "calls": [{"api": api, "method": method, "status": status, **calls}
+                          for (api, method, status), calls in sorted(self.calls.items())]
+            }
+
+    @classmethod
+    def from_dict(cls, data):
+        metrics = cls()
+        metrics.histograms = {api: LatencyHistogram.from_dict(histogram)
+                              for api, histogram in data["histograms"].items()}
+        for calls in data["calls"]:
+            calls = dict(calls)
+            key = (calls.pop("api"), calls.pop("method"), calls.pop("status"))
+            metrics.calls[key] = calls
+        return metrics
+
+    def write_json(self, filename):
+        with open(filename, "w") as f:
+            json.dump({"summary": self.summary(), **self.to_dict()}, f, indent=4)
+
+    def prometheus_text(self):
+        """
+        Returns the metrics in the Prometheus text exposition format. The latency histogram has no
+        status label, the per status sums and counts can be compared with Kruize's kruizeAPI_seconds
+        """
+        lines = ["# HELP %s Kruize API call latency observed by the client" % PROMETHEUS_METRIC,
+                 "# TYPE %s histogram" % PROMETHEUS_METRIC]
+        with self._lock:
+            for api, histogram in sorted(self.histograms.items()):
+                for bucket in PROMETHEUS_BUCKETS:
+                    lines.append('%s_bucket{api="%s",le="%s"} %s' % (
+                        PROMETHEUS_METRIC, api, bucket, histogram.count_at_or_below(bucket)))
+                lines.append('%s_bucket{api="%s",le="+Inf"} %s' % (PROMETHEUS_METRIC, api, histogram.total_count))
+                lines.append('%s_sum{api="%s"} %s' % (PROMETHEUS_METRIC, api, histogram.total))
+                lines.append('%s_count{api="%s"} %s' % (PROMETHEUS_METRIC, api, histogram.total_count))
+
+            lines.append("# TYPE %s summary" % PROMETHEUS_STATUS_METRIC)
+            for (api, method, status), calls in sorted(self.calls.items()):
+                labels = 'api="%s",method="%s",status="%s"' % (api, method, status)
+                lines.append('%s_sum{%s} %s' % (PROMETHEUS_STATUS_METRIC, labels, calls["seconds"]))
+                lines.append('%s_count{%s} %s' % (PROMETHEUS_STATUS_METRIC, labels, calls["count"]))
+
+            for name, field in [("kruize_client_api_response_bytes_total", "response_bytes"),
+                                ("kruize_client_api_retries_total", "retries")]:
+                lines.append("# TYPE %s counter" % name)
+                for (api, method, status), calls in sorted(self.calls.items()):
+                    lines.append('%s{api="%s",method="%s",status="%s"} %s' % (name, api, method, status, calls[field]))
+        return "\n".join(lines) + "\n"
+
+
+# Description: This function serves the live metrics in the Prometheus text format on the given port from a daemon
+# thread, so that a running load test can be scraped. Returns the server, call shutdown() on it to stop serving
+# Input Parameters: ApiMetrics, port
+def start_metrics_server(metrics, port):
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = metrics.prometheus_text().encode('utf-8')
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("", port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,154 @@
+"""
+Copyright (c) 2024, 2024 Red Hat, IBM Corporation and others.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import threading
+import time
+
+import requests
+
+from helpers import json_codec
+from helpers.utils import SUCCESS_STATUS_CODE
+
+# Matches the default bulkresultslimit of the Kruize updateResults API
+DEFAULT_BATCH_SIZE = 100
+
+
+class BulkResultsWriter:
+    """
+    Buffers individual updateResults interval results and posts them to Kruize as bulk
+    arrays, once batch_size results are pending or the oldest pending result is older
+    than flush_interval seconds. Records rejected by Kruize are collected in failures and
+    returned by the add() / flush() call that posted them, or by the next one for the
+    flushes made by the flush_interval timer.
+    """
+
+    def __init__(self, client, batch_size=DEFAULT_BATCH_SIZE, flush_interval=None):
+        self.client = client
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.pending = []
+        self.failures = []
+        # Failures of the flushes made by the deadline timer, returned by the next add() or flush()
+        self._deferred_failures = []
+        self.posted_count = 0
+        self.request_count = 0
+        self._oldest_pending_time = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._timer = None
+        if flush_interval is not None:
+            self._timer = threading.Thread(target=self._flush_on_deadline, daemon=True)
+            self._timer.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def add(self, result):
+        with self._lock:
+            if not self.pending:
+                self._oldest_pending_time = time.monotonic()
+            self.pending.append(result)
+            failures = self._take_deferred_failures()
+            if len(self.pending) >= self.batch_size or self._deadline_passed():
+                failures.extend(self._flush_locked())
+            return failures
+
+    def add_all(self, results):
+        failures = []
+        for result in results:
+            failures.extend(self.add(result))
+        return failures
+
+    def flush(self):
+        with self._lock:
+            failures = self._take_deferred_failures()
+            failures.extend(self._flush_locked())
+            return failures
+
+    def close(self):
+        self._stop.set()
+        if self._timer is not None:
+            self._timer.join()
+        return self.flush()
+
+    def _deadline_passed(self):
+        return (self.flush_interval is not None and self._oldest_pending_time is not None and
+                time.monotonic() - self._oldest_pending_time >= self.flush_interval)
+
+    def _flush_on_deadline(self):
+        while not self._stop.wait(self.flush_interval / 4):
+            with self._lock:
+                if self._deadline_passed():
+                    self._deferred_failures.extend(self._flush_locked())
+
+    def _take_deferred_failures(self):
+        failures = self._deferred_failures
+        self._deferred_failures = []
+        return failures
+
+    def _flush_locked(self):
+        if not self.pending:
+            return []
+        batch = self.pending
+        self.pending = []
+        self._oldest_pending_time = None
+
+        self.request_count += 1
+        try:
+            response = self.client.update_results(batch)
+            if getattr(response, 'replayed', False):
+                # A retried batch that only collided with its own earlier attempt was saved
+                failures = []
+            else:
+                failures = parse_failed_results(batch, response.status_code, response.text)
+        except requests.exceptions.RequestException as e:
+            failures = [_failed_record(result, str(e), None) for result in batch]
+
+        self.posted_count += len(batch) - len(failures)
+        self.failures.extend(failures)
+        return failures
+
+
+# Description: This function returns the records that failed to save from a bulk updateResults response. Kruize
+# lists them under 'data' with their errors, when the whole request is rejected every record in the batch is failed
+# Input Parameters: posted results, response status code, response body
+def parse_failed_results(batch, status_code, response_text):
+    if status_code == SUCCESS_STATUS_CODE:
+        return []
+
+    try:
+        response_json = json_codec.loads(response_text)
+    except ValueError:
+        response_json = None
+
+    if isinstance(response_json, dict) and response_json.get('data'):
+        return response_json['data']
+
+    message = response_json.get('message') if isinstance(response_json, dict) else response_text
+    return [_failed_record(result, message, status_code) for result in batch]
+
+
+def _failed_record(result, message, httpcode):
+    return {
+        "version": result.get("version"),
+        "experiment_name": result.get("experiment_name"),
+        "interval_start_time": result.get("interval_start_time"),
+        "interval_end_time": result.get("interval_end_time"),
+        "errors": [{"message": message, "httpcode": httpcode}]
+    }
@@ -0,0 +1,227 @@
+"""
+Copyright (c) 2024, 2024 Red Hat, IBM Corporation and others.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import math
+
+import requests
+
+from helpers.load_generator import CONSTANT_ARRIVAL, OpenLoopLoadGenerator
+
+KRUIZE_POD_REGEX = "kruize-[^-]*-[^-]*$"
+KRUIZE_DB_POD_REGEX = "kruize-db-deployment-[^-]*-[^-]*$"
+# Fraction of the container limit at which a resource is considered saturated
+DEFAULT_SATURATION_THRESHOLD = 0.9
+# p99 changes in seconds below which latency is stable whatever the relative change, so jitter on
+# millisecond latencies does not keep a step running
+STABILITY_FLOOR = 0.01
+
+
+# Description: This function returns the usage and limit queries of the Kruize and Kruize DB containers. The usage
+# queries are the kruize_cpu_max / kruize_memory / kruizedb_* queries of scripts/kruize_metrics.py, over the window
+# Input Parameters: query window, e.g. 5m
+def resource_queries(window):
+    queries = {}
+    for prefix, pod, container in [("kruize", KRUIZE_POD_REGEX, "kruize"),
+                                   ("kruizedb", KRUIZE_DB_POD_REGEX, "kruize-db")]:
+        selector = 'pod=~"%s",container="%s"' % (pod, container)
+        queries[prefix + "_cpu_max"] = (
+            "max(sum(rate(container_cpu_usage_seconds_total{%s}[%s])))" % (selector, window),
+            'sum(kube_pod_container_resource_limits{%s,resource="cpu"})' % selector)
+        queries[prefix + "_memory"] = (
+            "(sum(container_memory_working_set_bytes{%s}))" % selector,
+            'sum(kube_pod_container_resource_limits{%s,resource="memory"})' % selector)
+    return queries
+
+
+class KruizeResourceMonitor:
+    """
+    Samples the CPU and memory usage of the Kruize and Kruize DB containers from Prometheus.
+    Limits passed in limits override the ones reported by kube-state-metrics.
+    """
+
+    def __init__(self, prometheus_url, token=None, limits=None):
+        self.prometheus_url = prometheus_url
+        self.headers = {'Authorization': 'Bearer %s' % token} if token else {}
+        self.limits = limits or {}
+        # Like scripts/kruize_metrics.py, the OpenShift thanos querier is accessed without verifying its certificate
+        requests.packages.urllib3.disable_warnings(requests.packages.urllib3.exceptions.InsecureRequestWarning)
+
+    def query(self, query):
+        try:
+            response = requests.get(self.prometheus_url, headers=self.headers, params={'query': query}, verify=False,
+                                    timeout=30)
+            result = response.json()['data']['result']
+        except (requests.exceptions.RequestException, ValueError, KeyError) as e:
+            print("Prometheus query '%s' failed: %s" % (query, e))
+            return None
+        if not result or "value" not in result[0]:
+            return None
+        return float(result[0]["value"][1])
+
+    def sample(self, window_seconds):
+        resources = {}
+        for resource, (usage_query, limit_query) in resource_queries("%ss" % max(1, math.ceil(window_seconds))).items():
+            limit = self.limits.get(resource)
+            resources[resource] = {
+                "usage": self.query(usage_query),
+                "limit": limit if limit is not None else self.query(limit_query)
+            }
+        return resources
+
+
+class CapacityStep:
+    """
+    Outcome of one offered load step, the metrics and throughput are those of its last window
+    """
+
+    def __init__(self, rate, windows, stable, metrics, elapsed_time, breaches, resources):
+        self.rate = rate
+        self.windows = windows
+        self.stable = stable
+        self.metrics = metrics
+        self.elapsed_time = elapsed_time
+        self.breaches = breaches
+        self.resources = resources
+
+    def throughput(self):
+        return {row["api"]: row["count"] / self.elapsed_time if self.elapsed_time else 0.0
+                for row in self.metrics.summary()}
+
+
+class CapacitySearch:
+    """
+    Ramp-to-knee search: offered load starts at start_rate and grows by step_rate. Each step runs
+    open-loop windows of window_duration seconds until the worst per API p99 of two consecutive
+    windows differs by less than stability_tolerance, at most max_windows. The search stops at the
+    first step where an API exceeds the p99 or error rate SLO, or whose latency does not stabilize.
+    """
+
+    def __init__(self, client, workload, start_rate, step_rate, max_rate, window_duration, slo_p99, slo_error_rate,
+                 min_windows=2, max_windows=5, stability_tolerance=0.1, arrival=CONSTANT_ARRIVAL, seed=None,
+                 resource_monitor=None, saturation_threshold=DEFAULT_SATURATION_THRESHOLD):
+        self.client = client
+        self.workload = workload
+        self.start_rate = start_rate
+        self.step_rate = step_rate
+        self.max_rate = max_rate
+        self.window_duration = window_duration
+        self.slo_p99 = slo_p99
+        self.slo_error_rate = slo_error_rate
+        self.min_windows = min_windows
+        self.max_windows = max_windows
+        self.stability_tolerance = stability_tolerance
+        self.arrival = arrival
+        self.seed = seed
+        self.resource_monitor = resource_monitor
+        self.saturation_threshold = saturation_threshold
+        self.steps = []
+
+    async def run(self):
+        rate = self.start_rate
+        while rate <= self.max_rate:
+            step = await self._run_step(rate)
+            self.steps.append(step)
+            self._print_step(step)
+            if step.breaches:
+                break
+            rate += self.step_rate
+        return self.steps
+
+    async def _run_step(self, rate):
+        windows = 0
+        previous_p99 = None
+        stable = False
+        step_time = 0.0
+        while True:
+            seed = None if self.seed is None else self.seed + len(self.steps) * self.max_windows + windows
+            generator = OpenLoopLoadGenerator(self.client, self.workload, rate, self.window_duration, self.arrival,
+                                              seed)
+            await generator.run()
+            windows += 1
+            step_time += generator.elapsed_time
+
+            p99 = max((row["p99"] for row in generator.corrected.summary()), default=0.0)
+            stable = previous_p99 is not None and \
+                abs(p99 - previous_p99) <= max(STABILITY_FLOOR, self.stability_tolerance * previous_p99)
+            if windows >= self.max_windows or (windows >= self.min_windows and stable):
+                break
+            previous_p99 = p99
+
+        breaches = self._slo_breaches(generator.corrected)
+        if not stable:
+            breaches["*"] = "p99 latency did not stabilize in %s windows" % windows
+        resources = self.resource_monitor.sample(step_time) if self.resource_monitor is not None else {}
+        return CapacityStep(rate, windows, stable, generator.corrected, generator.elapsed_time, breaches, resources)
+
+    def _slo_breaches(self, metrics):
+        breaches = {}
+        for row in metrics.summary():
+            error_rate = row["errors"] / row["count"] if row["count"] else 0.0
+            if row["p99"] > self.slo_p99:
+                breaches[row["api"]] = "p99 %.3fs > %.3fs" % (row["p99"], self.slo_p99)
+            elif error_rate > self.slo_error_rate:
+                breaches[row["api"]] = "error rate %.2f%% > %.2f%%" % (100 * error_rate, 100 * self.slo_error_rate)
+        return breaches
+
+    def _print_step(self, step):
+        print("Offered rate : %s/s  windows : %s  stable : %s" % (step.rate, step.windows, step.stable))
+        step.metrics.print_summary()
+        for resource, sample in sorted(step.resources.items()):
+            print("%s : usage : %s  limit : %s" % (resource, sample["usage"], sample["limit"]))
+        for api, breach in sorted(step.breaches.items()):
+            print("SLO breached by %s: %s" % (api, breach))
+
+    def sustainable_rates(self):
+        """
+        Returns the throughput of every API in the last step before it breached the SLO
+        """
+        rates = {}
+        breached = set()
+        for step in self.steps:
+            for api, throughput in step.throughput().items():
+                if api in breached:
+                    continue
+                if api in step.breaches or "*" in step.breaches:
+                    breached.add(api)
+                    rates.setdefault(api, 0.0)
+                else:
+                    rates[api] = throughput
+        return rates
+
+    def saturated_resource(self):
+        """
+        Returns the resource that first reached saturation_threshold of its limit and the offered
+        rate of that step, or None if no resource with a known limit got there
+        """
+        for step in self.steps:
+            utilizations = {resource: sample["usage"] / sample["limit"] for resource, sample in step.resources.items()
+                            if sample["usage"] is not None and sample["limit"]}
+            saturated = [resource for resource, utilization in utilizations.items()
+                         if utilization >= self.saturation_threshold]
+            if saturated:
+                return max(saturated, key=utilizations.get), step.rate
+        return None
+
+    def print_report(self):
+        passed = [step for step in self.steps if not step.breaches]
+        print("Maximum sustainable offered rate : %s/s" % (passed[-1].rate if passed else "none"))
+        for api, rate in sorted(self.sustainable_rates().items()):
+            print("%s: maximum sustainable rate : %.2f/s" % (api, rate))
+        saturated = self.saturated_resource()
+        if saturated is not None:
+            print("First saturated resource : %s at %s/s offered" % saturated)
+        elif self.resource_monitor is not None:
+            print("No resource reached %d%% of its limit" % (100 * self.saturation_threshold))
@@ -0,0 +1,184 @@
+"""
+Copyright (c) 2024, 2024 Red Hat, IBM Corporation and others.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import csv
+import hashlib
+import json
+import math
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+# Environment variable with the directory of the column caches, the system temp directory by default
+CSV_CACHE_ENV = "KRUIZE_CSV_CACHE"
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), "kruize_csv_cache")
+# Bumped when the cache layout changes, older caches are then rebuilt
+CACHE_VERSION = 2
+META_FILE = "meta.json"
+NUMERIC_COLUMN = "numeric"
+TEXT_COLUMN = "text"
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Columns already opened by this process, by (path, size, modification time)
+_opened = {}
+
+
+class CsvColumns:
+    """
+    Columns of a csv file memory mapped from its column cache. A column whose cells are all
+    numbers (or empty) is a float64 array with NaN for the empty cells, any other column is a
+    fixed width str array with "" for the empty and missing cells. The raw strings of every
+    column, as csv.DictReader returns them, are read with text=True.
+    """
+
+    def __init__(self, directory, meta):
+        self.directory = directory
+        self.header = [column["name"] for column in meta["columns"]]
+        self.num_rows = meta["num_rows"]
+        self._columns = {column["name"]: column for column in meta["columns"]}
+        self._arrays = {}
+
+    def __len__(self):
+        return self.num_rows
+
+    def column(self, name, text=False):
+        file = self._columns[name]["text_file" if text else "file"]
+        array = self._arrays.get(file)
+        if array is None:
+            array = np.load(os.path.join(self.directory, file), mmap_mode='r')
+            self._arrays[file] = array
+        return array
+
+    def is_numeric(self, name):
+        return self._columns[name]["type"] == NUMERIC_COLUMN
+
+    def rows(self, names=None, start=0, stop=None, text=False):
+        """
+        Yields the rows [start, stop) as dicts of the given columns (all by default), numeric cells
+        as float or None when empty, text cells as str. With text=True all the cells are the raw str
+        """
+        names = self.header if names is None else names
+        stop = self.num_rows if stop is None else min(stop, self.num_rows)
+        values = []
+        for name in names:
+            column = self.column(name, text)[start:stop].tolist()
+            if self.is_numeric(name) and not text:
+                column = [None if math.isnan(value) else value for value in column]
+            values.append(column)
+        for row in zip(*values):
+            yield dict(zip(names, row))
+
+
+def _file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _parse_numeric(values):
+    # Returns the float64 array of the values, None if one of them is not a number
+    try:
+        numbers = [float(value) if value else math.nan for value in values]
+    except ValueError:
+        return None
+    if all(math.isnan(number) for number in numbers):
+        return None
+    return np.array(numbers, dtype=np.float64)
+
+
+# Description: This function parses the csv once and writes its columns as .npy files and a meta.json to the cache
+# directory, through a temporary directory renamed in place so concurrent runs never see a partial cache
+# Input Parameters: csv file, hash of its content, cache directory of the csv
+def _build_cache(csv_file_path, file_hash, directory):
+    with open(csv_file_path, 'r', newline='') as csvfile:
+        csvreader = csv.reader(csvfile)
+        header = next(csvreader, [])
+        cells = [[] for _ in header]
+        num_rows = 0
+        for row in csvreader:
+            # Blank lines are skipped, like csv.DictReader does
+            if not row:
+                continue
+            for index, values in enumerate(cells):
+                values.append(row[index] if index < len(row) else "")
+            num_rows += 1
+
+    os.makedirs(os.path.dirname(directory), exist_ok=True)
+    build_directory = tempfile.mkdtemp(prefix=".build-", dir=os.path.dirname(directory))
+    try:
+        columns = []
+        for index, (name, values) in enumerate(zip(header, cells)):
+            array = _parse_numeric(values)
+            column_type = NUMERIC_COLUMN
+            if array is None:
+                array = np.array(values, dtype=str)
+                column_type = TEXT_COLUMN
+            column_file = "column_%s.npy" % index
+            np.save(os.path.join(build_directory, column_file), array)
+            text_file = column_file
+            if column_type == NUMERIC_COLUMN:
+                text_file = "column_%s_text.npy" % index
+                np.save(os.path.join(build_directory, text_file), np.array(values, dtype=str))
+            columns.append({"name": name, "type": column_type, "file": column_file, "text_file": text_file})
+
+        meta = {"version": CACHE_VERSION, "source": os.path.abspath(csv_file_path), "sha256": file_hash,
+                "num_rows": num_rows, "columns": columns}
+        with open(os.path.join(build_directory, META_FILE), "w") as f:
+            json.dump(meta, f, indent=4)
+        try:
+            os.rename(build_directory, directory)
+        except OSError:
+            # Built by another run in the meantime
+            if not os.path.exists(os.path.join(directory, META_FILE)):
+                raise
+    finally:
+        shutil.rmtree(build_directory, ignore_errors=True)
+
+
+# Description: This function returns the columns of a csv file. The csv is parsed on first use only: its columns are
+# cached as memory mapped .npy files in a directory keyed by the sha256 of the csv content, later runs (and later
+# calls) only hash the file and map the columns they read
+# Input Parameters: csv file, cache directory (KRUIZE_CSV_CACHE or the system temp directory if None)
+def load_csv_columns(csv_file_path, cache_dir=None):
+    cache_dir = cache_dir or os.environ.get(CSV_CACHE_ENV) or DEFAULT_CACHE_DIR
+    stat = os.stat(csv_file_path)
+    key = (os.path.abspath(csv_file_path), cache_dir, stat.st_size, stat.st_mtime_ns)
+    columns = _opened.get(key)
+    if columns is not None:
+        return columns
+
+    file_hash = _file_hash(csv_file_path)
+    directory = os.path.join(cache_dir, "%s-%s" % (os.path.basename(csv_file_path), file_hash[:24]))
+    meta_file = os.path.join(directory, META_FILE)
+    meta = None
+    if os.path.exists(meta_file):
+        with open(meta_file) as f:
+            meta = json.load(f)
+        if meta.get("version") != CACHE_VERSION or meta.get("sha256") != file_hash:
+            shutil.rmtree(directory, ignore_errors=True)
+            meta = None
+    if meta is None:
+        _build_cache(csv_file_path, file_hash, directory)
+        with open(meta_file) as f:
+            meta = json.load(f)
+
+    columns = CsvColumns(directory, meta)
+    _opened[key] = columns
+    return columns
@@ -0,0 +1,296 @@
+"""
+Copyright (c) 2024, 2024 Red Hat, IBM Corporation and others.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+
+import requests
+
+from helpers.api_metrics import ApiMetrics
+from helpers.kruize import KruizeClient
+from helpers.result_payload import ResultPayloadFactory
+from helpers.retry_policy import RetryPolicy, UPDATE_RESULTS_API, is_idempotent_replay
+
+UNIX_ADDRESS_PREFIX = "unix:"
+# Seconds between the progress messages of a worker
+STATS_INTERVAL = 1.0
+# Seconds a worker keeps trying to connect to a coordinator that is not listening yet
+CONNECT_TIMEOUT = 60
+SUCCESS_STATUS_CODES = [201, 409, 400]
+
+
+# Description: This function parses a coordinator address, either unix:<socket path> or <host>:<port>
+# Input Parameters: address
+def parse_address(address):
+    if address.startswith(UNIX_ADDRESS_PREFIX):
+        return socket.AF_UNIX, address[len(UNIX_ADDRESS_PREFIX):]
+    host, _, port = address.rpartition(":")
+    if not host or not port.isdigit():
+        raise ValueError("Invalid address %s, expected <host>:<port> or %s<socket path>" % (address,
+                                                                                        UNIX_ADDRESS_PREFIX))
+    return socket.AF_INET, (host, int(port))
+
+
+# Description: This function splits the experiment range exp_start..exp_end (both included) in shards of at most
+# shard_size experiments
+# Input Parameters: first experiment number, last experiment number, experiments per shard
+def split_shards(exp_start, exp_end, shard_size):
+    return [(start, min(start + shard_size - 1, exp_end)) for start in range(exp_start, exp_end + 1, shard_size)]
+
+
+def _send_message(wfile, message):
+    wfile.write(json.dumps(message).encode('utf-8') + b"\n")
+    wfile.flush()
+
+
+def _read_message(rfile):
+    line = rfile.readline()
+    if not line:
+        raise ConnectionError("Connection closed")
+    return json.loads(line)
+
+
+# Description: This function checks if an updateResults response only rejected records Kruize already saved
+# Input Parameters: updateResults response
+def _posted_before(response):
+    try:
+        response_json = response.json()
+    except ValueError:
+        return False
+    return is_idempotent_replay(UPDATE_RESULTS_API, response.status_code, response_json)
+
+
+class LoadCoordinator:
+    """
+    Hands out experiment shards to the workers connecting to address, collects their live progress
+    and merges their API metrics. Workers ask for the next shard when they are done with one, so
+    faster workers take more shards; the shard of a worker that disconnects is handed out again,
+    marked as rehanded. The config is passed to the workers with every shard.
+    """
+
+    def __init__(self, address, config, shards):
+        self.address = address
+        self.config = config
+        self.shards = list(shards)
+        self.metrics = ApiMetrics()
+        # Totals of the completed shards, per worker
+        self.worker_totals = {}
+        # Progress of the shard every worker is running
+        self.worker_progress = {}
+        self.start_time = None
+        self.elapsed_time = 0.0
+        self._pending = list(reversed(self.shards))
+        # Shards handed out again after their worker failed, some of their results may already be posted
+        self._rehanded = set()
+        self._completed = 0
+        self._condition = threading.Condition()
+        self._server = None
+
+    def start(self):
+        coordinator = self
+
+        class ShardHandler(socketserver.StreamRequestHandler):
+            def handle(self):
+                coordinator._handle(self.rfile, self.wfile)
+
+        family, address = parse_address(self.address)
+        if family == socket.AF_UNIX:
+            if os.path.exists(address):
+                os.remove(address)
+            self._server = socketserver.ThreadingUnixStreamServer(address, ShardHandler)
+        else:
+            socketserver.ThreadingTCPServer.allow_reuse_address = True
+            self._server = socketserver.ThreadingTCPServer(address, ShardHandler)
+        self._server.daemon_threads = True
+        self.start_time = time.time()
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def wait(self, progress_interval=10):
+        """
+        Waits for all the shards to complete, printing the overall progress every progress_interval seconds
+        """
+        with self._condition:
+            while self._completed < len(self.shards):
+                self._condition.wait(progress_interval)
+                self.print_progress()
+        self.elapsed_time = time.time() - self.start_time
+        self._server.shutdown()
+        self._server.server_close()
+        family, address = parse_address(self.address)
+        if family == socket.AF_UNIX and os.path.exists(address):
+            os.remove(address)
+
+    def _handle(self, rfile, wfile):
+        try:
+            worker = _read_message(rfile)["worker"]
+        except (ConnectionError, OSError, ValueError, KeyError):
+            return
+        while True:
+            shard = self._next_shard()
+            if shard is None:
+                _send_message(wfile, {"type": "done"})
+                return
+            try:
+                _send_message(wfile, {"type": "shard", "exp_start": shard[0], "exp_end": shard[1],
+                                      "rehanded": shard in self._rehanded, "config": self.config})
+                while True:
+                    message = _read_message(rfile)
+                    if message["type"] == "stats":
+                        with self._condition:
+                            self.worker_progress[worker] = message["stats"]
+                    elif message["type"] == "result":
+                        self._complete_shard(worker, message)
+                        break
+            except (ConnectionError, OSError, ValueError, KeyError) as e:
+                print("Worker %s failed on experiments %s..%s, handing them out again: %s" % (
+                    worker, shard[0], shard[1], e))
+                with self._condition:
+                    self.worker_progress.pop(worker, None)
+                    self._pending.append(shard)
+                    self._rehanded.add(shard)
+                    self._condition.notify_all()
+                return
+
+    def _next_shard(self):
+        # A worker waits while shards are running elsewhere, one of them may be handed out again
+        with self._condition:
+            while not self._pending and self._completed < len(self.shards):
+                self._condition.wait()
+            return self._pending.pop() if self._pending else None
+
+    def _complete_shard(self, worker, message):
+        self.metrics.merge(ApiMetrics.from_dict(message["metrics"]))
+        with self._condition:
+            self.worker_progress.pop(worker, None)
+            totals = self.worker_totals.setdefault(worker, {})
+            for field, value in message["stats"].items():
+                totals[field] = totals.get(field, 0) + value
+            self._completed += 1
+            self._condition.notify_all()
+
+    def totals(self):
+        totals = {}
+        with self._condition:
+            for stats in list(self.worker_totals.values()) + list(self.worker_progress.values()):
+                for field, value in stats.items():
+                    totals[field] = totals.get(field, 0) + value
+        return totals
+
+    def print_progress(self):
+        totals = self.totals()
+        print("progress : shards : %s/%s  workers : %s  experiments : %s  results : %s  lost results : %s" % (
+            self._completed, len(self.shards), len(self.worker_progress), totals.get("experiments", 0),
+            totals.get("results", 0), totals.get("lost_results", 0)))
+
+    def print_summary(self):
+        for worker, totals in sorted(self.worker_totals.items()):
+            print("%s : experiments : %s  results : %s  lost results : %s  elapsed time : %.2fs" % (
+                worker, totals.get("experiments", 0), totals.get("results", 0), totals.get("lost_results", 0),
+                totals.get("elapsed_time", 0.0)))
+        totals = self.totals()
+        print("Lost results count: %s" % (totals.get("lost_results", 0)))
+        hours, rem = divmod(self.elapsed_time, 3600)
+        minutes, seconds = divmod(rem, 60)
+        print("Time elapsed: {:0>2}:{:0>2}:{:05.2f}".format(int(hours), int(minutes), seconds))
+        self.metrics.print_summary()
+
+
+class LoadWorker:
+    """
+    Connects to a coordinator and runs the shards it hands out like rosSimulationScalabilityTest.py:
+    every experiment is created, gets its results posted in one bulk updateResults from the
+    configured start date, then an updateRecommendations at the last interval. The results of a
+    rehanded shard that Kruize rejects as duplicate records were posted by the failed worker and
+    are counted as posted, not lost. kruize_url overrides the one of the coordinator's config, for
+    workers reaching Kruize through another route.
+    """
+
+    def __init__(self, address, name=None, kruize_url=None):
+        self.address = address
+        self.name = name or "%s-%s" % (socket.gethostname(), os.getpid())
+        self.kruize_url = kruize_url
+
+    def run(self):
+        with self._connect() as sock, sock.makefile("rb") as rfile, sock.makefile("wb") as wfile:
+            _send_message(wfile, {"type": "hello", "worker": self.name})
+            while True:
+                message = _read_message(rfile)
+                if message["type"] == "done":
+                    return
+                self._run_shard(message["exp_start"], message["exp_end"], message["config"], wfile,
+                                rehanded=message.get("rehanded", False))
+
+    def _connect(self):
+        family, address = parse_address(self.address)
+        deadline = time.time() + CONNECT_TIMEOUT
+        while True:
+            sock = socket.socket(family, socket.SOCK_STREAM)
+            try:
+                sock.connect(address)
+                return sock
+            except OSError:
+                sock.close()
+                if time.time() > deadline:
+                    raise
+                time.sleep(1)
+
+    def _run_shard(self, exp_start, exp_end, config, wfile, rehanded=False):
+        metrics = ApiMetrics()
+        client = KruizeClient(self.kruize_url or config["kruize_url"], timeout=(60, 60),
+                              retry_policy=RetryPolicy(max_attempts=config["max_attempts"]),
+                              compression=config.get("compression"), metrics=metrics)
+        result_payloads = ResultPayloadFactory(config["result_json"], config["start_date"], config["minutes_jump"])
+        result_count = config["result_count"]
+        create_json = dict(config["create_json"])
+        stats = {"experiments": 0, "results": 0, "lost_results": 0, "elapsed_time": 0.0}
+        start_time = time.time()
+        last_stats_time = start_time
+        with client:
+            for i in range(exp_start, exp_end + 1):
+                experiment_name = "%s_%s" % (config["name"], i)
+                create_json["experiment_name"] = experiment_name
+                try:
+                    response = client.create_experiment([create_json])
+                    if response.status_code not in SUCCESS_STATUS_CODES:
+                        print("createExperiment %s failed with status code %s: %s" % (
+                            experiment_name, response.status_code, response.text))
+                        stats["lost_results"] += result_count
+                        continue
+                    response = client.update_results(result_payloads.bulk_body(experiment_name, 0, result_count))
+                    if response.status_code == 201 or response.replayed or (rehanded and _posted_before(response)):
+                        stats["results"] += result_count
+                    else:
+                        stats["lost_results"] += result_count
+                        print("updateResults %s failed with status code %s: %s" % (
+                            experiment_name, response.status_code, response.text))
+                    end_time = result_payloads.interval_end_time(result_count - 1)
+                    client.update_recommendations(experiment_name, None,
+                                                  end_time.strftime('%Y-%m-%dT%H:%M:%S.%fZ')[:-4] + 'Z')
+                except requests.exceptions.RequestException as e:
+                    stats["lost_results"] += result_count
+                    print("An error occurred while connecting to", e)
+                finally:
+                    stats["experiments"] += 1
+                    if time.time() - last_stats_time >= STATS_INTERVAL:
+                        stats["elapsed_time"] = time.time() - start_time
+                        _send_message(wfile, {"type": "stats", "stats": stats})
+                        last_stats_time = time.time()
+        stats["elapsed_time"] = time.time() - start_time
+        _send_message(wfile, {"type": "result", "stats": stats, "metrics": metrics.to_dict()})
@@ -1,19 +1,20 @@
-import csv
 import json
+import sys
+
+sys.path.append("../")
+from helpers.csv_cache import load_csv_columns
 
 def generate_datasource_json(csv_file, json_file):
     datasources = []
-    with open(csv_file, 'r', newline='') as csvfile:
-        reader = csv.DictReader(csvfile)
-        for row in reader:
-            data_source = {
-                "name": row['name'] if row['name'] != 'null' else "",
-                "provider": row['provider'] if row['provider'] != 'null' else "",
-                "serviceName": row['serviceName'] if row['serviceName'] != 'null' else "",
-                "namespace": row['namespace'] if row['namespace'] != 'null' else "",
-                "url": row['url'] if row['url'] != 'null' else ""
-            }
-            datasources.append(data_source)
+    for row in load_csv_columns(csv_file).rows(['name', 'provider', 'serviceName', 'namespace', 'url'], text=True):
+        data_source = {
+            "name": row['name'] if row['name'] != 'null' else "",
+            "provider": row['provider'] if row['provider'] != 'null' else "",
+            "serviceName": row['serviceName'] if row['serviceName'] != 'null' else "",
+            "namespace": row['namespace'] if row['namespace'] != 'null' else "",
+            "url": row['url'] if row['url'] != 'null' else ""
+        }
+        datasources.append(data_source)
 
     with open(json_file, 'w') as jsonfile:
         json.dump(datasources, jsonfile, indent=4)
@@ -6,6 +6,8 @@ import datetime
 import random
 from datetime import datetime, timedelta, timezone
 from helpers.utils import *
+from helpers.csv_cache import load_csv_columns
+from helpers.packed_json_store import PackedJsonWriter
 
 total_exps = 10
 
@@ -127,224 +129,321 @@ def create_exp_jsons(split = False, split_count = 1, exp_json_dir = "/tmp/exp_js
     with open("/tmp/exp_complete.json", "w") as json_file:
         json.dump(complete_json_data, json_file, indent=4)
 
-def create_update_results_jsons(csv_file_path, split = False, split_count = 1, json_dir = "/tmp/result_jsons", total_exps = 10, num_res = None, new_timestamp = None):
-    # Define the list that will hold the final JSON data
-    complete_json_data = []
-    single_row_json_data = []
-    multi_row_json_data = []
-
-    # Create an empty list to hold the deployments
-    mebibyte = 1048576
-
-    isExist = os.path.exists(json_dir)
-    if not isExist:
-        os.mkdir(json_dir)
-
-    i = 1
-    exp_num = 0
-    type_index = 0
-    j = 0
-    data_interval = 15
-
-    if new_timestamp != None:
-        interval_start_time = new_timestamp
-    else:
-        interval_start_time = get_datetime()
-    
-    # Open the CSV file
-    if num_res == None:
-        num_res = get_num_lines_in_csv(csv_file_path)
-        num_res = num_res - 1
-        print(f"Number of results = {num_res}")
-
-    row_counter = 0
-    with open(csv_file_path, 'r') as csvfile:
-        # Create a CSV reader object
-        csvreader = csv.DictReader(csvfile)
-
-        for row in csvreader:
-            type_index = 0
-            container_metrics = []
-
-            if row["cpu_request_avg_container"]:
-                container_metrics.append({
-                    "name": "cpuRequest",
-                    "results": {
-                        "aggregation_info": {
-                            "sum": float(row["cpu_request_sum_container"]),
-                            "avg": float(row["cpu_request_avg_container"]),
-                            "format": "cores"
-                        }
-                    }
-                })
-
-            if row["cpu_limit_avg_container"]:
-                container_metrics.append({
-                    "name" : "cpuLimit",
-                    "results": {
-                        "aggregation_info": {
-                            "sum": float(row["cpu_limit_sum_container"]),
-                            "avg": float(row["cpu_limit_avg_container"]),
-                            "format": "cores"
-                        }
-                    }
-                })
-
-            if row["cpu_throttle_max_container"]:
-                container_metrics.append({
-                    "name" : "cpuThrottle",
-                    "results": {
-                        "aggregation_info": {
-                            "sum": float(row["cpu_throttle_sum_container"]),
-                            "max": float(row["cpu_throttle_max_container"]),
-                            "avg": float(row["cpu_throttle_avg_container"]),
-                            "format": "cores"
-                        }
-                    }
-                })
-
-            container_metrics.append({
-                "name" : "cpuUsage",
-                "results": {
-                    "aggregation_info": {
-                        "sum": float(row["cpu_usage_sum_container"]),
-                        "min": float(row["cpu_usage_min_container"]),
-                        "max": float(row["cpu_usage_max_container"]),
-                        "avg": float(row["cpu_usage_avg_container"]),
-                        "format": "cores"
-                    }
+# Orders of the results yielded by iter_update_results: all the experiments of an interval before the next interval,
+# or all the intervals of an experiment before the next experiment
+TIME_MAJOR = "time"
+EXPERIMENT_MAJOR = "experiment"
+
+data_interval = 15
+mebibyte = 1048576
+
+
+# Description: This function returns the container metrics of a csv row, read from the column cache with numbers as
+# floats and empty cells as None
+# Input Parameters: dict of the csv row
+def _container_metrics(row):
+    container_metrics = []
+
+    if row["cpu_request_avg_container"] is not None:
+        container_metrics.append({
+            "name": "cpuRequest",
+            "results": {
+                "aggregation_info": {
+                    "sum": float(row["cpu_request_sum_container"]),
+                    "avg": float(row["cpu_request_avg_container"]),
+                    "format": "cores"
                 }
-            })
-
-            if row["mem_request_avg_container"]:
-                container_metrics.append({
-                    "name" : "memoryRequest",
-                    "results": {
-                        "aggregation_info": {
-                            "sum": float(row["mem_request_sum_container"])/mebibyte,
-                            "avg": float(row["mem_request_avg_container"])/mebibyte,
-                            "format": "MiB"
-                        }
-                    }
-                })
-
-            if row["mem_limit_avg_container"]:
-                container_metrics.append({
-                    "name" : "memoryLimit",
-                    "results": {
-                        "aggregation_info": {
-                            "sum": float(row["mem_limit_sum_container"])/mebibyte,
-                            "avg": float(row["mem_limit_avg_container"])/mebibyte,
-                            "format": "MiB"
-                        }
-                    }
-                })
-
-            container_metrics.append({
-                "name" : "memoryUsage",
-                "results": {
-                    "aggregation_info": {
-                            "min": float(row["mem_usage_min_container"])/mebibyte,
-                            "max": float(row["mem_usage_max_container"])/mebibyte,
-                            "sum": float(row["mem_usage_sum_container"])/mebibyte,
-                            "avg": float(row["mem_usage_avg_container"])/mebibyte,
-                            "format": "MiB"
-                        }
-                    }
-                })
-
-            container_metrics.append({
-                "name" : "memoryRSS",
-                "results": {
-                    "aggregation_info": {
-                        "min": float(row["mem_rss_min_container"])/mebibyte,
-                        "max": float(row["mem_rss_max_container"])/mebibyte,
-                        "sum": float(row["mem_rss_sum_container"])/mebibyte,
-                        "avg": float(row["mem_rss_avg_container"])/mebibyte,
-                        "format": "MiB"
-                    }
+            }
+        })
+
+    if row["cpu_limit_avg_container"] is not None:
+        container_metrics.append({
+            "name" : "cpuLimit",
+            "results": {
+                "aggregation_info": {
+                    "sum": float(row["cpu_limit_sum_container"]),
+                    "avg": float(row["cpu_limit_avg_container"]),
+                    "format": "cores"
                 }
-            })
-
-            for exp_num in range(total_exps):
-                # Create a list to hold the containers
-                containers = []
-
-                # Create a dictionary to hold the container information
-                container1 = {
-                    "container_image_name": container_image_name + "_" + str(exp_num),
-                    "container_name": container_name + "_" + str(exp_num),
-                    "metrics": container_metrics
+            }
+        })
+
+    if row["cpu_throttle_max_container"] is not None:
+        container_metrics.append({
+            "name" : "cpuThrottle",
+            "results": {
+                "aggregation_info": {
+                    "sum": float(row["cpu_throttle_sum_container"]),
+                    "max": float(row["cpu_throttle_max_container"]),
+                    "avg": float(row["cpu_throttle_avg_container"]),
+                    "format": "cores"
                 }
-
-                containers.append(container1)
-
-                container2 = {
-                    "container_image_name": db_container_image_name + "_" + str(exp_num),
-                    "container_name": db_container_name + "_" + str(exp_num),
-                    "metrics": container_metrics
+            }
+        })
+
+    container_metrics.append({
+        "name" : "cpuUsage",
+        "results": {
+            "aggregation_info": {
+                "sum": float(row["cpu_usage_sum_container"]),
+                "min": float(row["cpu_usage_min_container"]),
+                "max": float(row["cpu_usage_max_container"]),
+                "avg": float(row["cpu_usage_avg_container"]),
+                "format": "cores"
+            }
+        }
+    })
+
+    if row["mem_request_avg_container"] is not None:
+        container_metrics.append({
+            "name" : "memoryRequest",
+            "results": {
+                "aggregation_info": {
+                    "sum": float(row["mem_request_sum_container"])/mebibyte,
+                    "avg": float(row["mem_request_avg_container"])/mebibyte,
+                    "format": "MiB"
                 }
-            
-                containers.append(container2)
-
-                # Create a dictionary to hold the deployment information
-                kubernetes_objects = [{
-                    "type": kubernetes_object_type[type_index],
-                    "name": kubernetes_object_name + "_" + str(exp_num),
-                    "namespace": kubernetes_object_namespace + "_" + str(exp_num),
-                    "containers": containers
-                }]
-          
-                interval_end_time = increment_timestamp_by_given_mins(interval_start_time, data_interval)
-         
-                # Create a dictionary to hold the experiment data
-                update_results = {
-                    "version": "v2.0",
-                    "experiment_name": exp_name + "_" + str(exp_num),
-                    "interval_start_time": interval_start_time,
-                    "interval_end_time": interval_end_time,
-                    "kubernetes_objects": kubernetes_objects
+            }
+        })
+
+    if row["mem_limit_avg_container"] is not None:
+        container_metrics.append({
+            "name" : "memoryLimit",
+            "results": {
+                "aggregation_info": {
+                    "sum": float(row["mem_limit_sum_container"])/mebibyte,
+                    "avg": float(row["mem_limit_avg_container"])/mebibyte,
+                    "format": "MiB"
+                }
+            }
+        })
+
+    container_metrics.append({
+        "name" : "memoryUsage",
+        "results": {
+            "aggregation_info": {
+                    "min": float(row["mem_usage_min_container"])/mebibyte,
+                    "max": float(row["mem_usage_max_container"])/mebibyte,
+                    "sum": float(row["mem_usage_sum_container"])/mebibyte,
+                    "avg": float(row["mem_usage_avg_container"])/mebibyte,
+                    "format": "MiB"
                 }
-       
-                complete_json_data.append(update_results)
-                if split == True:
-                    if i % split_count != 0:
-                        multi_row_json_data.append(update_results)
-                        i += 1
-                    else:
-                        multi_row_json_data.append(update_results)
-                        result_json_file = json_dir + "/result_split" + str(j) + ".json"
-                        with open(result_json_file, "w") as json_file:
-                            json.dump(multi_row_json_data, json_file, indent=4)
-
-                        multi_row_json_data = []
-                        j += 1
-                        i += 1
-
-                    if i % 12 == 0:
-                        interval_start_time = interval_end_time
-
-                else:
-                    single_row_json_data.append(update_results)
-                    # Write the final JSON data to the output file
-                    result_json_file = json_dir + "/result_" + str(exp_num) + "_" + str(j) + ".json"
-                    with open(result_json_file, "w") as json_file:
-                        json.dump(single_row_json_data, json_file, indent=4)
-
-                    single_row_json_data = []
-
-                if type_index < num_obj_types-1:
-                    type_index += 1
-                else:
-                    type_index = 0
+            }
+        })
+
+    container_metrics.append({
+        "name" : "memoryRSS",
+        "results": {
+            "aggregation_info": {
+                "min": float(row["mem_rss_min_container"])/mebibyte,
+                "max": float(row["mem_rss_max_container"])/mebibyte,
+                "sum": float(row["mem_rss_sum_container"])/mebibyte,
+                "avg": float(row["mem_rss_avg_container"])/mebibyte,
+                "format": "MiB"
+            }
+        }
+    })
+
+    return container_metrics
+
+
+def _update_results(exp_num, container_metrics, interval_start_time, interval_end_time):
+    # Create a list to hold the containers
+    containers = []
+
+    # Create a dictionary to hold the container information
+    container1 = {
+        "container_image_name": container_image_name + "_" + str(exp_num),
+        "container_name": container_name + "_" + str(exp_num),
+        "metrics": container_metrics
+    }
+
+    containers.append(container1)
+
+    container2 = {
+        "container_image_name": db_container_image_name + "_" + str(exp_num),
+        "container_name": db_container_name + "_" + str(exp_num),
+        "metrics": container_metrics
+    }
+
+    containers.append(container2)
+
+    # Create a dictionary to hold the deployment information, the object types cycle as in create_exp_jsons
+    kubernetes_objects = [{
+        "type": kubernetes_object_type[exp_num % num_obj_types],
+        "name": kubernetes_object_name + "_" + str(exp_num),
+        "namespace": kubernetes_object_namespace + "_" + str(exp_num),
+        "containers": containers
+    }]
+
+    # Create a dictionary to hold the experiment data
+    return {
+        "version": "v2.0",
+        "experiment_name": exp_name + "_" + str(exp_num),
+        "interval_start_time": interval_start_time,
+        "interval_end_time": interval_end_time,
+        "kubernetes_objects": kubernetes_objects
+    }
+
+
+# Description: This function yields the metrics of the first num_res rows of the csv with their 15 minutes interval,
+# as (res_num, interval_start_time, interval_end_time, container_metrics), from the column cache of the csv
+# Input Parameters: metrics csv, number of results, start time of the first interval
+def _iter_intervals(csv_file_path, num_res, interval_start_time):
+    columns = load_csv_columns(csv_file_path)
+    for res_num, row in enumerate(columns.rows(stop=num_res)):
+        interval_end_time = increment_timestamp_by_given_mins(interval_start_time, data_interval)
+        yield res_num, interval_start_time, interval_end_time, _container_metrics(row)
+        interval_start_time = interval_end_time
+
+
+class ResultJsonFileSink:
+    """
+    Writes the results of iter_update_results to json files: result_<exp>_<res>.json holding a
+    single result, or with split result_split<n>.json holding split_count results. The results
+    are also streamed to complete_json_file if set.
+    """
+
+    def __init__(self, json_dir="/tmp/result_jsons", split=False, split_count=1, complete_json_file=None):
+        self.json_dir = json_dir
+        self.split = split
+        self.split_count = split_count
+        self.split_results = []
+        self.split_file_count = 0
+        self.complete_json = None
+        self.complete_count = 0
+        if not os.path.exists(json_dir):
+            os.mkdir(json_dir)
+        if complete_json_file is not None:
+            self.complete_json = open(complete_json_file, "w")
+            self.complete_json.write("[")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, exp_num, res_num, update_results):
+        if self.complete_json is not None:
+            # Same layout as json.dump(results, indent=4), one result at a time
+            result = json.dumps(update_results, indent=4).replace("\n", "\n    ")
+            self.complete_json.write(("," if self.complete_count else "") + "\n    " + result)
+            self.complete_count += 1
+
+        if self.split:
+            self.split_results.append(update_results)
+            if len(self.split_results) >= self.split_count:
+                self._write_split()
+        else:
+            result_json_file = self.json_dir + "/result_" + str(exp_num) + "_" + str(res_num) + ".json"
+            with open(result_json_file, "w") as json_file:
+                json.dump([update_results], json_file, indent=4)
+
+    def _write_split(self):
+        result_json_file = self.json_dir + "/result_split" + str(self.split_file_count) + ".json"
+        with open(result_json_file, "w") as json_file:
+            json.dump(self.split_results, json_file, indent=4)
+        self.split_results = []
+        self.split_file_count += 1
+
+    def close(self):
+        if self.split_results:
+            self._write_split()
+        if self.complete_json is not None:
+            self.complete_json.write("\n]" if self.complete_count else "]")
+            self.complete_json.close()
+            self.complete_json = None
+
+
+# Description: This function yields (exp_num, res_num, interval_start_time, interval_end_time, container_metrics)
+# with the per experiment metrics of a SyntheticMetricsEngine, computed an interval (or an experiment) at a time
+# Input Parameters: SyntheticMetricsEngine, number of experiments, number of results (all the engine ones if None),
+# start time of the first interval, TIME_MAJOR or EXPERIMENT_MAJOR
+def _iter_synthetic_results(engine, total_exps, num_res, interval_start_time, order):
+    if total_exps > engine.total_exps:
+        raise ValueError("The metrics engine has %s experiments, %s requested" % (engine.total_exps, total_exps))
+    num_res = engine.num_res if num_res is None else min(num_res, engine.num_res)
+    interval_times = []
+    for res_num in range(num_res):
+        interval_end_time = increment_timestamp_by_given_mins(interval_start_time, data_interval)
+        interval_times.append((interval_start_time, interval_end_time))
+        interval_start_time = interval_end_time
+
+    if order == TIME_MAJOR:
+        for res_num in range(num_res):
+            interval_metrics = engine.interval_metrics(res_num)
+            for exp_num in range(total_exps):
+                yield (exp_num, res_num) + interval_times[res_num] + (interval_metrics[exp_num],)
+    else:
+        for exp_num in range(total_exps):
+            experiment_metrics = engine.experiment_metrics(exp_num)
+            for res_num in range(num_res):
+                yield (exp_num, res_num) + interval_times[res_num] + (experiment_metrics[res_num],)
 
-            j += 1
-            interval_start_time = interval_end_time
-            if row_counter < num_res-1:
-                row_counter += 1
-            else:
-                break
 
-    # Write the final JSON data to the output file
-    with open("/tmp/complete_results.json", "w") as json_file:
-        json.dump(complete_json_data, json_file, indent=4)
+def _num_results(csv_file_path, num_res):
+    if num_res == None:
+        num_res = get_num_lines_in_csv(csv_file_path)
+        num_res = num_res - 1
+        print(f"Number of results = {num_res}")
+    return num_res
+
+
+# Description: This function yields the updateResults jsons of total_exps experiments for the first num_res rows of
+# the metrics csv, one result at a time, so they can be posted (for example with BulkResultsWriter.add_all) or
+# written by a sink without holding them all in memory. Time major order builds the metrics of one csv row at a
+# time, experiment major order keeps the metrics of the num_res rows (not the results) in memory. Every experiment
+# gets the metrics of the csv rows, unless a SyntheticMetricsEngine (helpers/synthetic_metrics.py) built from the
+# csv gives each experiment its own variant of them
+# Input Parameters: metrics csv, number of experiments, number of results (all the csv rows if None), start time of
+# the first interval (now if None), TIME_MAJOR or EXPERIMENT_MAJOR, sink whose write(exp_num, res_num, result) is
+# called for every result, SyntheticMetricsEngine of at least total_exps experiments or None
+def iter_update_results(csv_file_path, total_exps=10, num_res=None, new_timestamp=None, order=TIME_MAJOR, sink=None,
+                        engine=None):
+    if new_timestamp != None:
+        interval_start_time = new_timestamp
+    else:
+        interval_start_time = get_datetime()
+
+    if order not in [TIME_MAJOR, EXPERIMENT_MAJOR]:
+        raise ValueError("Unknown order %s, expected %s or %s" % (order, TIME_MAJOR, EXPERIMENT_MAJOR))
+    if engine is not None:
+        results = _iter_synthetic_results(engine, total_exps, num_res, interval_start_time, order)
+    else:
+        num_res = _num_results(csv_file_path, num_res)
+        intervals = _iter_intervals(csv_file_path, num_res, interval_start_time)
+        if order == TIME_MAJOR:
+            results = ((exp_num,) + interval for interval in intervals for exp_num in range(total_exps))
+        else:
+            intervals = list(intervals)
+            results = ((exp_num,) + interval for exp_num in range(total_exps) for interval in intervals)
+
+    for exp_num, res_num, interval_start_time, interval_end_time, container_metrics in results:
+        update_results = _update_results(exp_num, container_metrics, interval_start_time, interval_end_time)
+        if sink is not None:
+            sink.write(exp_num, res_num, update_results)
+        yield update_results
+
+
+def create_update_results_jsons(csv_file_path, split = False, split_count = 1, json_dir = "/tmp/result_jsons", total_exps = 10, num_res = None, new_timestamp = None, complete_json_file = "/tmp/complete_results.json", engine = None):
+    with ResultJsonFileSink(json_dir, split, split_count, complete_json_file) as sink:
+        for update_results in iter_update_results(csv_file_path, total_exps, num_res, new_timestamp, TIME_MAJOR, sink,
+                                                  engine):
+            pass
+
+
+# Description: This function writes the updateResults jsons to a packed store instead of a file per result, read them
+# with PackedJsonReader(store_dir).get(exp_num, res_num). Returns the number of results per experiment
+# Input Parameters: metrics csv, store directory, number of experiments, number of results (all the csv rows if
+# None), start time of the first interval (now if None), SyntheticMetricsEngine or None
+def create_packed_update_results(csv_file_path, store_dir = "/tmp/result_store", total_exps = 10, num_res = None, new_timestamp = None, engine = None):
+    if engine is not None:
+        num_res = engine.num_res if num_res is None else min(num_res, engine.num_res)
+    else:
+        num_res = _num_results(csv_file_path, num_res)
+    with PackedJsonWriter(store_dir, total_exps, num_res) as sink:
+        for update_results in iter_update_results(csv_file_path, total_exps, num_res, new_timestamp, TIME_MAJOR, sink,
+                                                  engine):
+            pass
+    return num_res
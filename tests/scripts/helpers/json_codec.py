@@ -0,0 +1,98 @@
+"""
+Copyright (c) 2024, 2024 Red Hat, IBM Corporation and others.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import json
+import os
+
+# Environment variable selecting the json codec, one of SUPPORTED_CODECS or "auto"
+JSON_CODEC_ENV = "KRUIZE_JSON_CODEC"
+STDLIB_CODEC = "json"
+ORJSON_CODEC = "orjson"
+MSGSPEC_CODEC = "msgspec"
+AUTO_CODEC = "auto"
+SUPPORTED_CODECS = [STDLIB_CODEC, ORJSON_CODEC, MSGSPEC_CODEC]
+
+
+class JsonCodec:
+    """
+    Serializes request payloads to bytes and parses response bodies. The stdlib json module is
+    always available, orjson and msgspec are used only when installed. Decoding errors of every
+    backend are raised as ValueError, like json.JSONDecodeError.
+    """
+
+    def __init__(self, name=STDLIB_CODEC):
+        if name == ORJSON_CODEC:
+            import orjson
+            self._dumps = orjson.dumps
+            self._loads = orjson.loads
+            self._decode_errors = (ValueError,)
+        elif name == MSGSPEC_CODEC:
+            import msgspec
+            self._dumps = msgspec.json.encode
+            self._loads = msgspec.json.decode
+            self._decode_errors = (ValueError, msgspec.DecodeError)
+        elif name == STDLIB_CODEC:
+            self._dumps = lambda obj: json.dumps(obj, separators=(',', ':')).encode('utf-8')
+            self._loads = json.loads
+            self._decode_errors = (ValueError,)
+        else:
+            raise ValueError("Unsupported json codec %s, supported: %s" % (name, SUPPORTED_CODECS))
+        self.name = name
+
+    def dumps(self, obj):
+        return self._dumps(obj)
+
+    def loads(self, data):
+        try:
+            return self._loads(data)
+        except self._decode_errors as e:
+            raise ValueError(str(e)) from e
+
+
+# Description: This function returns the codec with the given name, "auto" picks the fastest installed one
+# Input Parameters: codec name
+def get_codec(name):
+    if name != AUTO_CODEC:
+        return JsonCodec(name)
+    for candidate in [ORJSON_CODEC, MSGSPEC_CODEC]:
+        try:
+            return JsonCodec(candidate)
+        except ImportError:
+            continue
+    return JsonCodec(STDLIB_CODEC)
+
+
+_codec = get_codec(os.environ.get(JSON_CODEC_ENV, STDLIB_CODEC))
+
+
+# Description: This function selects the codec used by the Kruize clients and the load tools
+# Input Parameters: codec name, one of SUPPORTED_CODECS or "auto"
+def set_codec(name):
+    global _codec
+    _codec = get_codec(name)
+    return _codec
+
+
+def codec_name():
+    return _codec.name
+
+
+def dumps(obj):
+    return _codec.dumps(obj)
+
+
+def loads(data):
+    return _codec.loads(data)
@@ -0,0 +1,135 @@
+"""
+Copyright (c) 2024, 2024 Red Hat, IBM Corporation and others.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import codecs
+import json
+import re
+
+_WHITESPACE = re.compile(r'\s*')
+# Characters that may follow a complete top level array element
+_ELEMENT_DELIMITERS = ' \t\r\n,]'
+
+READ_CHUNK_SIZE = 1024 * 1024
+
+
+# Description: This function incrementally decodes a top level json array and yields one element at a time,
+# only the element currently being read is held in memory. An element that does not decode yet is retried
+# once the buffered data has doubled, which keeps the total decoding work linear in the document size.
+# Input Parameters: iterable of bytes chunks holding the json document
+def iter_json_array(chunks):
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    json_decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    retry_len = 0
+    opened = False
+    chunks = iter(chunks)
+    eof = False
+
+    while not eof:
+        chunk = next(chunks, None)
+        if chunk is None:
+            eof = True
+        else:
+            buffer += decoder.decode(chunk)
+            if len(buffer) - pos < retry_len:
+                continue
+
+        while True:
+            pos = _WHITESPACE.match(buffer, pos).end()
+            if pos == len(buffer):
+                break
+            c = buffer[pos]
+            if not opened:
+                if c != '[':
+                    raise ValueError("Expected a json array, found '%s'" % c)
+                opened = True
+                pos += 1
+                continue
+            if c == ',':
+                pos += 1
+                continue
+            if c == ']':
+                return
+
+            try:
+                element, end = json_decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                end = None
+            # A number is only complete once a delimiter follows it, '12' may still continue as '12.5'
+            if end is not None and c not in '{["' and not eof and \
+                    (end == len(buffer) or buffer[end] not in _ELEMENT_DELIMITERS):
+                end = None
+            if end is None:
+                if eof:
+                    raise ValueError("Invalid or truncated json array element at offset %s" % pos)
+                retry_len = 2 * (len(buffer) - pos)
+                break
+            yield element
+            retry_len = 0
+            pos = end
+
+        buffer = buffer[pos:]
+        pos = 0
+
+    raise ValueError("Truncated json array")
+
+
+# Description: This function yields the elements of the json array stored in the given file one at a time
+# Input Parameters: json file name
+def iter_json_array_file(filename):
+    with open(filename, "rb") as f:
+        yield from iter_json_array(iter(lambda: f.read(READ_CHUNK_SIZE), b""))
+
+
+# Description: This function writes the given elements as a json array without building the list in memory
+# Input Parameters: json file name, iterable of elements
+def write_json_array_to_file(filename, elements):
+    count = 0
+    with open(filename, "w") as f:
+        f.write("[")
+        for element in elements:
+            if count:
+                f.write(",")
+            f.write("\n")
+            json.dump(element, f, indent=4)
+            count += 1
+        f.write("\n]\n")
+    return count
+
+
+# Description: This function compares two json array files element by element in constant memory
+# Input Parameters: json file names
+def compare_json_array_files(json_file1, json_file2):
+    sentinel = object()
+    elements1 = iter_json_array_file(json_file1)
+    elements2 = iter_json_array_file(json_file2)
+    count = 0
+    while True:
+        element1 = next(elements1, sentinel)
+        element2 = next(elements2, sentinel)
+        if element1 is sentinel and element2 is sentinel:
+            break
+        if element1 != element2:
+            print(f"The two JSON files differ at element {count}!")
+            return False
+        count += 1
+
+    if count == 0:
+        print(f"JSON files are empty! Check the files {json_file1} and {json_file2}")
+        return False
+    print("The two JSON files are identical!")
+    return True
@@ -0,0 +1,127 @@
+"""
+Copyright (c) 2024, 2024 Red Hat, IBM Corporation and others.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import json
+import pickle
+import re
+
+# Private use characters marking the substitution slots in the compiled template text
+_SLOT_BASE = 0xE000
+_MAX_SLOTS = 0x1900
+_SLOT_PATTERN = re.compile("([%s-%s])" % (chr(_SLOT_BASE), chr(_SLOT_BASE + _MAX_SLOTS - 1)))
+
+
+class JsonTemplate:
+    """
+    A json text compiled for a sequence of str.replace(find, replacement(i)) passes, rendered for
+    any i without redoing the passes nor parsing the json. The passes are run once at compile
+    time with a slot character as replacement, so a later find matches the same text as in the
+    sequential replaces. render() joins the literal parts with the slot values, render_dict()
+    unpickles the parsed template and sets the slot values at their precomputed paths. A later
+    find may match text produced by an earlier replacement, in that case the template has to be
+    created with compiled=False and the passes are run on every render.
+    """
+
+    def __init__(self, text, replacements, compiled=True):
+        """
+        replacements: (find, function returning the replacement of find for i) in replace order
+        """
+        self.replacements = [replacement for _, replacement in replacements]
+        self._pickled = None
+        self._string_slots = None
+        if not compiled:
+            self._text = text
+            self._finds = [find for find, _ in replacements]
+            self._parts = None
+            return
+        if _SLOT_PATTERN.search(text):
+            raise ValueError("The template contains characters reserved for the substitution slots")
+        if len(replacements) > _MAX_SLOTS:
+            raise ValueError("Too many replacements, %s at most" % _MAX_SLOTS)
+        for slot, (find, _) in enumerate(replacements):
+            text = text.replace(find, chr(_SLOT_BASE + slot))
+
+        # Even items are literal text, odd items slot numbers
+        self._parts = _SLOT_PATTERN.split(text)
+        for index in range(1, len(self._parts), 2):
+            self._parts[index] = ord(self._parts[index]) - _SLOT_BASE
+
+        # Paths of the json strings holding slots, None if a slot is outside of a json string value
+        try:
+            data = json.loads(text)
+        except ValueError:
+            return
+        string_slots = []
+        if self._find_string_slots(data, [], string_slots):
+            self._pickled = pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+            self._string_slots = string_slots
+
+    def _find_string_slots(self, node, path, string_slots):
+        # Returns False if a dict key holds a slot
+        if isinstance(node, dict):
+            items = node.items()
+        elif isinstance(node, list):
+            items = enumerate(node)
+        else:
+            return True
+        for key, value in items:
+            if isinstance(key, str) and _SLOT_PATTERN.search(key):
+                return False
+            if isinstance(value, str):
+                if _SLOT_PATTERN.search(value):
+                    parts = _SLOT_PATTERN.split(value)
+                    for index in range(1, len(parts), 2):
+                        parts[index] = ord(parts[index]) - _SLOT_BASE
+                    string_slots.append((path + [key], parts))
+            elif not self._find_string_slots(value, path + [key], string_slots):
+                return False
+        return True
+
+    def _values(self, i):
+        return [replacement(i) for replacement in self.replacements]
+
+    @staticmethod
+    def _join(parts, values):
+        return "".join([values[part] if index % 2 else part for index, part in enumerate(parts)])
+
+    def render(self, i):
+        """
+        Returns the text of the template for i
+        """
+        if self._parts is None:
+            text = self._text
+            for find, value in zip(self._finds, self._values(i)):
+                text = text.replace(find, value)
+            return text
+        return self._join(self._parts, self._values(i))
+
+    def render_bytes(self, i):
+        return self.render(i).encode('utf-8')
+
+    def render_dict(self, i):
+        """
+        Returns the json document of the template for i, a new object on every call
+        """
+        if self._pickled is None:
+            return json.loads(self.render(i))
+        values = self._values(i)
+        data = pickle.loads(self._pickled)
+        for path, parts in self._string_slots:
+            node = data
+            for key in path[:-1]:
+                node = node[key]
+            node[path[-1]] = self._join(parts, values)
+        return data
@@ -14,12 +14,353 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 
+import gzip
 import json
+import os
 import subprocess
+import threading
+import time
 
 import requests
+from requests.adapters import HTTPAdapter
+
+from helpers import json_codec
+from helpers.json_stream import iter_json_array
+from helpers.retry_policy import is_idempotent_replay
+from helpers.traffic_capture import get_env_capture
+
+URL = None
+
+# Default number of keep-alive connections kept open per client
+DEFAULT_POOL_SIZE = 10
+# Default (connect, read) timeout in seconds, None waits forever
+DEFAULT_TIMEOUT = None
+# Size of the socket reads used when streaming list responses
+STREAM_CHUNK_SIZE = 256 * 1024
+
+# Content-Encoding values accepted by the Kruize updateResults API for compressed request bodies
+GZIP_CONTENT_ENCODING = "gzip"
+SUPPORTED_CONTENT_ENCODINGS = [GZIP_CONTENT_ENCODING]
+# gzip level used for compressed updateResults payloads, the repetitive bulk JSON compresses well at low levels
+DEFAULT_COMPRESS_LEVEL = 6
+
+# Environment variable with the Kruize URL to use, skips endpoint discovery when set
+KRUIZE_URL_ENV = "KRUIZE_URL"
+# Environment variables with an optional file caching discovered URLs across test runs and its TTL in seconds
+KRUIZE_URL_CACHE_ENV = "KRUIZE_URL_CACHE"
+KRUIZE_URL_CACHE_TTL_ENV = "KRUIZE_URL_CACHE_TTL"
+DEFAULT_URL_CACHE_TTL = 600
+# Timeout in seconds of the health probe that validates a cached URL
+HEALTH_PROBE_TIMEOUT = 2
+
+
+class KruizeClient:
+    """
+    Kruize REST API client backed by a pooled keep-alive session, so that
+    consecutive calls reuse TCP connections instead of opening a new one per request.
+    With compression set, updateResults payloads are sent with that Content-Encoding and
+    the raw and compressed byte counts are accumulated to measure the savings. With metrics set
+    (an ApiMetrics), the latency, status, response size and retries of every call are recorded.
+    Every request is appended to capture (a TrafficCapture), by default the one of KRUIZE_TRAFFIC_CAPTURE.
+    """
+
+    def __init__(self, url, pool_size=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT, retry_policy=None,
+                 compression=None, compress_level=DEFAULT_COMPRESS_LEVEL, metrics=None, capture=None):
+        if compression is not None and compression not in SUPPORTED_CONTENT_ENCODINGS:
+            raise ValueError("Unsupported compression %s, supported: %s" % (compression, SUPPORTED_CONTENT_ENCODINGS))
+        self.url = url
+        self.timeout = timeout
+        self.retry_policy = retry_policy
+        self.metrics = metrics
+        # capture=False disables the capture of KRUIZE_TRAFFIC_CAPTURE
+        self.capture = get_env_capture() if capture is None else (capture or None)
+        self.compression = compression
+        self.compress_level = compress_level
+        self.raw_bytes = 0
+        self.compressed_bytes = 0
+        self.compress_time = 0.0
+        self._stats_lock = threading.Lock()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.session.close()
+
+    def request(self, method, path, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        _encode_json_body(kwargs)
+        if self.metrics is None and self.capture is None:
+            return self._send(method, path, **kwargs)
+
+        start_time = time.time()
+        try:
+            response = self._send(method, path, **kwargs)
+        except requests.exceptions.RequestException as e:
+            if self.metrics is not None:
+                self.metrics.record(_api_name(path), method, None, time.time() - start_time,
+                                    retries=getattr(e, 'retries', 0))
+            if self.capture is not None:
+                self.capture.record(start_time, method, path, kwargs, None)
+            raise
+        # Streamed responses are timed up to the headers, their size is taken from Content-Length
+        if self.metrics is not None:
+            self.metrics.record(_api_name(path), method, response.status_code, time.time() - start_time,
+                                _response_size(response, kwargs.get('stream', False)), getattr(response, 'retries', 0))
+        if self.capture is not None:
+            self.capture.record(start_time, method, path, kwargs, response.status_code)
+        return response
+
+    def _send(self, method, path, **kwargs):
+        if self.retry_policy is None:
+            return self.session.request(method, self.url + path, **kwargs)
+        return self._request_with_retries(method, path, **kwargs)
+
+    def _request_with_retries(self, method, path, **kwargs):
+        """
+        Retries connection errors, timeouts and the policy's retryable status codes. The returned
+        response carries the number of retries and whether it was accepted as an idempotent replay.
+        """
+        policy = self.retry_policy
+        api = _api_name(path)
+        attempt = 1
+        start_time = time.time()
+        first_attempt_time = None
+        while True:
+            try:
+                response = self.session.request(method, self.url + path, **kwargs)
+                error = None
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                response = None
+                error = e
+            if first_attempt_time is None:
+                first_attempt_time = time.time() - start_time
+
+            replayed = False
+            if response is not None and attempt > 1 and response.status_code >= 400:
+                replayed = is_idempotent_replay(api, response.status_code, _response_json(response))
+
+            retryable = error is not None or (not replayed and policy.should_retry_status(response.status_code))
+            if not retryable or not policy.can_retry(method, attempt):
+                retry_time = time.time() - start_time - first_attempt_time
+                policy.stats.record(api, attempt - 1, first_attempt_time, retry_time, replayed, retryable)
+                if error is not None:
+                    error.retries = attempt - 1
+                    raise error
+                response.retries = attempt - 1
+                response.replayed = replayed
+                return response
+
+            time.sleep(policy.backoff(attempt))
+            attempt += 1
+
+    def create_experiment(self, input_json, invalid_header=False):
+        headers = {'content-type': 'application/xml'} if invalid_header else None
+        return self.request("POST", "/createExperiment", json=input_json, headers=headers)
+
+    def update_results(self, result_json):
+        """
+        Posts the results, either as a list or as an already serialized json body in bytes
+        """
+        if self.compression is not None:
+            headers = {'Content-Type': 'application/json', 'Content-Encoding': self.compression}
+            return self.request("POST", "/updateResults", data=self._compress(result_json), headers=headers)
+        if isinstance(result_json, bytes):
+            return self.request("POST", "/updateResults", data=result_json,
+                                headers={'Content-Type': 'application/json'})
+        return self.request("POST", "/updateResults", json=result_json)
+
+    def _compress(self, result_json):
+        start_time = time.time()
+        body = result_json if isinstance(result_json, bytes) else json_codec.dumps(result_json)
+        compressed_body = gzip.compress(body, compresslevel=self.compress_level)
+        with self._stats_lock:
+            self.compress_time += time.time() - start_time
+            self.raw_bytes += len(body)
+            self.compressed_bytes += len(compressed_body)
+        return compressed_body
+
+    def print_compression_summary(self):
+        if self.compression is None or not self.raw_bytes:
+            return
+        print("updateResults %s compression: raw bytes : %s  compressed bytes : %s  ratio : %.2f  "
+              "compress time : %.2fs" % (self.compression, self.raw_bytes, self.compressed_bytes,
+                                         self.raw_bytes / self.compressed_bytes, self.compress_time))
+
+    def update_recommendations(self, experiment_name, startTime, endTime):
+        return self.request("POST", _update_recommendations_path(experiment_name, startTime, endTime))
+
+    def list_recommendations(self, experiment_name=None, latest=None, monitoring_end_time=None):
+        params = _list_recommendations_params(experiment_name, latest, monitoring_end_time)
+        return self.request("GET", "/listRecommendations", params=params)
+
+    def delete_experiment(self, experiment_name, invalid_header=False):
+        delete_json = [{
+            "experiment_name": experiment_name
+        }]
+        headers = {'content-type': 'application/xml'} if invalid_header else None
+        return self.request("DELETE", "/createExperiment", json=delete_json, headers=headers)
+
+    def create_performance_profile(self, perf_profile_json):
+        return self.request("POST", "/createPerformanceProfile", json=perf_profile_json)
+
+    def list_experiments(self, results=None, recommendations=None, latest=None, experiment_name=None):
+        return self.request("GET", "/listExperiments" + _query_string(
+            _list_experiments_params(results, recommendations, latest, experiment_name)))
+
+    def iter_experiments(self, results=None, recommendations=None, latest=None, experiment_name=None):
+        """
+        Streams listExperiments, yielding one experiment at a time as it is decoded from the socket
+        """
+        return self._iter_list("/listExperiments" + _query_string(
+            _list_experiments_params(results, recommendations, latest, experiment_name)))
+
+    def iter_recommendations(self, experiment_name=None, latest=None, monitoring_end_time=None):
+        """
+        Streams listRecommendations, yielding the recommendations of one experiment at a time
+        """
+        params = _list_recommendations_params(experiment_name, latest, monitoring_end_time)
+        return self._iter_list("/listRecommendations", params=params)
+
+    def _iter_list(self, path, **kwargs):
+        with self.request("GET", path, stream=True, **kwargs) as response:
+            response.raise_for_status()
+            yield from iter_json_array(response.iter_content(chunk_size=STREAM_CHUNK_SIZE))
+
+    def list_datasources(self, name=None):
+        query_params = {}
+        if name is not None:
+            query_params['name'] = name
+
+        return self.request("GET", "/datasources" + _query_string(query_params))
+
+    def import_metadata(self, input_json, invalid_header=False):
+        headers = {'content-type': 'application/xml'} if invalid_header else None
+        return self.request("POST", "/dsmetadata", json=input_json, headers=headers)
+
+    def delete_metadata(self, input_json, invalid_header=False):
+        headers = {'content-type': 'application/xml'} if invalid_header else None
+        return self.request("DELETE", "/dsmetadata", json=input_json, headers=headers)
+
+    def list_metadata(self, datasource=None, cluster_name=None, namespace=None, verbose=None):
+        return self.request("GET", "/dsmetadata" + _query_string(
+            _metadata_query_params(datasource, cluster_name, namespace, verbose)))
+
+
+def _api_name(path):
+    return path.lstrip("/").split("?")[0]
+
+
+def _response_size(response, stream):
+    if stream:
+        return int(response.headers.get('Content-Length', 0))
+    return len(response.content)
+
+
+def _response_json(response):
+    try:
+        return json_codec.loads(response.content)
+    except ValueError:
+        return None
+
+
+def _encode_json_body(kwargs):
+    """
+    Serializes the json= payload of a request with the selected json codec. Like requests, the
+    json Content-Type is only set when the caller did not pass one (the invalid header tests do).
+    """
+    if kwargs.get('json') is None:
+        kwargs.pop('json', None)
+        return
+    kwargs['data'] = json_codec.dumps(kwargs.pop('json'))
+    headers = dict(kwargs.get('headers') or {})
+    if not any(key.lower() == 'content-type' for key in headers):
+        headers['Content-Type'] = 'application/json'
+    kwargs['headers'] = headers
+
+
+def _query_string(query_params):
+    query_string = "&".join(f"{key}={value}" for key, value in query_params.items())
+    if query_string:
+        return "?" + query_string
+    return ""
+
+
+def _update_recommendations_path(experiment_name, startTime, endTime):
+    queryString = "?"
+    if experiment_name:
+        queryString = queryString + "&experiment_name=%s" % (experiment_name)
+    if endTime:
+        queryString = queryString + "&interval_end_time=%s" % (endTime)
+    if startTime:
+        queryString = queryString + "&interval_start_time=%s" % (startTime)
+    return "/updateRecommendations?%s" % (queryString)
+
+
+def _list_experiments_params(results, recommendations, latest, experiment_name):
+    query_params = {}
+    if experiment_name is not None:
+        query_params['experiment_name'] = experiment_name
+    if latest is not None:
+        query_params['latest'] = latest
+    if results is not None:
+        query_params['results'] = results
+    if recommendations is not None:
+        query_params['recommendations'] = recommendations
+    return query_params
+
+
+def _list_recommendations_params(experiment_name, latest, monitoring_end_time):
+    params = {}
+    if experiment_name is not None:
+        params['experiment_name'] = experiment_name
+    if latest is not None:
+        params['latest'] = latest
+    elif monitoring_end_time is not None:
+        params['monitoring_end_time'] = monitoring_end_time
+    return params
+
+
+def _metadata_query_params(datasource, cluster_name, namespace, verbose):
+    query_params = {}
+    if datasource is not None:
+        query_params['datasource'] = datasource
+        if cluster_name is not None:
+            query_params['cluster_name'] = cluster_name
+        if namespace is not None:
+            query_params['namespace'] = namespace
+        if verbose is not None:
+            query_params['verbose'] = verbose
+    return query_params
+
+
+_default_client = None
+
 
+# Description: This function returns the shared client used by the module level API functions, it is
+# recreated whenever form_kruize_url points the tests at a different Kruize URL
+def get_default_client():
+    global _default_client
 
+    if _default_client is None or _default_client.url != URL:
+        if _default_client is not None:
+            _default_client.close()
+        _default_client = KruizeClient(URL)
+    return _default_client
+
+
+# Description: This function sets the Kruize URL used by the tests. The URL is taken from SERVER_IP or the
+# KRUIZE_URL environment variable if given, else it is discovered from the cluster once and cached in memory and,
+# when KRUIZE_URL_CACHE names a file, on disk for KRUIZE_URL_CACHE_TTL seconds. A cached URL is only reused
+# while the Kruize health probe answers on it, otherwise it is discovered again
+# Input Parameters: cluster type, optional kruize server ip (and port)
 def form_kruize_url(cluster_type, SERVER_IP=None):
     global URL
 
@@ -28,6 +369,52 @@ def form_kruize_url(cluster_type, SERVER_IP=None):
         print("\nKRUIZE AUTOTUNE URL = ", URL)
         return
 
+    env_url = os.environ.get(KRUIZE_URL_ENV)
+    if env_url:
+        URL = env_url.rstrip("/")
+        print("\nKRUIZE AUTOTUNE URL = ", URL)
+        return
+
+    url = _discovered_urls.get(cluster_type) or _read_url_cache(cluster_type)
+    if url is not None and not probe_kruize_url(url):
+        print("Kruize is not reachable at the cached URL %s, discovering it again" % url)
+        invalidate_kruize_url(cluster_type)
+        url = None
+
+    if url is None:
+        url = _discover_kruize_url(cluster_type)
+        if url is not None:
+            _discovered_urls[cluster_type] = url
+            _write_url_cache(cluster_type, url)
+
+    if url is not None:
+        URL = url
+    print("\nKRUIZE AUTOTUNE URL = ", URL)
+
+
+# Description: This function checks that Kruize answers its health endpoint on the given URL
+# Input Parameters: kruize url, probe timeout in seconds
+def probe_kruize_url(url, timeout=HEALTH_PROBE_TIMEOUT):
+    try:
+        response = requests.get(url + "/health", timeout=timeout)
+    except requests.exceptions.RequestException:
+        return False
+    return response.status_code == requests.codes.ok
+
+
+# Description: This function drops the cached Kruize URL of the given cluster type from memory and from the disk cache
+# Input Parameters: cluster type
+def invalidate_kruize_url(cluster_type):
+    _discovered_urls.pop(cluster_type, None)
+    cache = _load_url_cache()
+    if cache.pop(cluster_type, None) is not None:
+        _store_url_cache(cache)
+
+
+_discovered_urls = {}
+
+
+def _discover_kruize_url(cluster_type):
     if (cluster_type == "minikube"):
         port = subprocess.run(
             ['kubectl -n monitoring get svc kruize --no-headers -o=custom-columns=PORT:.spec.ports[*].nodePort'],
@@ -37,7 +424,7 @@ def form_kruize_url(cluster_type, SERVER_IP=None):
 
         ip = subprocess.run(['minikube ip'], shell=True, stdout=subprocess.PIPE)
         SERVER_IP = ip.stdout.decode('utf-8').strip('\n')
-        URL = "http://" + str(SERVER_IP) + ":" + str(AUTOTUNE_PORT)
+        return "http://" + str(SERVER_IP) + ":" + str(AUTOTUNE_PORT)
 
     elif (cluster_type == "openshift"):
 
@@ -47,8 +434,49 @@ def form_kruize_url(cluster_type, SERVER_IP=None):
             stdout=subprocess.PIPE)
         SERVER_IP = ip.stdout.decode('utf-8').strip('\n')
         print("IP = ", SERVER_IP)
-        URL = "http://" + str(SERVER_IP)
-    print("\nKRUIZE AUTOTUNE URL = ", URL)
+        return "http://" + str(SERVER_IP)
+    return None
+
+
+def _load_url_cache():
+    cache_file = os.environ.get(KRUIZE_URL_CACHE_ENV)
+    if not cache_file:
+        return {}
+    try:
+        with open(cache_file, "r") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return cache if isinstance(cache, dict) else {}
+
+
+def _store_url_cache(cache):
+    cache_file = os.environ.get(KRUIZE_URL_CACHE_ENV)
+    if not cache_file:
+        return
+    tmp_file = cache_file + ".tmp"
+    try:
+        with open(tmp_file, "w") as f:
+            json.dump(cache, f)
+        os.replace(tmp_file, cache_file)
+    except OSError as e:
+        print("Unable to write the Kruize URL cache %s: %s" % (cache_file, e))
+
+
+def _read_url_cache(cluster_type):
+    entry = _load_url_cache().get(cluster_type)
+    if not isinstance(entry, dict):
+        return None
+    ttl = float(os.environ.get(KRUIZE_URL_CACHE_TTL_ENV, DEFAULT_URL_CACHE_TTL))
+    if time.time() - entry.get("timestamp", 0) > ttl:
+        return None
+    return entry.get("url")
+
+
+def _write_url_cache(cluster_type, url):
+    cache = _load_url_cache()
+    cache[cluster_type] = {"url": url, "timestamp": time.time()}
+    _store_url_cache(cache)
 
 
 # Description: This function validates the input json and posts the experiment using createExperiment API to Kruize Autotune
@@ -67,14 +495,18 @@ def create_experiment(input_json_file, invalid_header=False):
     url = URL + "/createExperiment"
     print("URL = ", url)
 
-    headers = {'content-type': 'application/xml'}
     if invalid_header:
         print("Invalid header")
-        response = requests.post(url, json=input_json, headers=headers)
-    else:
-        response = requests.post(url, json=input_json)
+    response = get_default_client().create_experiment(input_json, invalid_header)
 
     print("Response status code = ", response.status_code)
+    print_json_response(response)
+    return response
+
+
+# Description: This function pretty prints the json response, falling back to the raw text if it is not valid json
+# Input Parameters: response
+def print_json_response(response):
     try:
         # Parse the response content as JSON into a Python dictionary
         response_json = response.json()
@@ -92,7 +524,6 @@ def create_experiment(input_json_file, invalid_header=False):
     except json.JSONDecodeError:
         print("Response content is not valid JSON.")
         print(response.text)  # Print the response text as-is
-    return response
 
 
 # Description: This function validates the result json and posts the experiment results using updateResults API to Kruize Autotune
@@ -110,7 +541,7 @@ def update_results(result_json_file, logging=True):
     url = URL + "/updateResults"
     print("URL = ", url)
 
-    response = requests.post(url, json=result_json)
+    response = get_default_client().update_results(result_json)
     print("Response status code = ", response.status_code)
     print(response.text)
     return response
@@ -121,17 +552,9 @@ def update_recommendations(experiment_name, startTime, endTime):
     print("\n************************************************************")
     print("\nUpdating the recommendation \n for %s for dates Start-time: %s and End-time: %s..." % (
         experiment_name, startTime, endTime))
-    queryString = "?"
-    if experiment_name:
-        queryString = queryString + "&experiment_name=%s" % (experiment_name)
-    if endTime:
-        queryString = queryString + "&interval_end_time=%s" % (endTime)
-    if startTime:
-        queryString = queryString + "&interval_start_time=%s" % (startTime)
 
-    url = URL + "/updateRecommendations?%s" % (queryString)
-    print("URL = ", url)
-    response = requests.post(url, )
+    response = get_default_client().update_recommendations(experiment_name, startTime, endTime)
+    print("URL = ", response.url)
     print("Response status code = ", response.status_code)
     print(response.text)
     print("\n************************************************************")
@@ -141,28 +564,12 @@ def update_recommendations(experiment_name, startTime, endTime):
 # Description: This function obtains the recommendations from Kruize Autotune using listRecommendations API
 # Input Parameters: experiment name, flag indicating latest result and monitoring end time
 def list_recommendations(experiment_name=None, latest=None, monitoring_end_time=None):
-    PARAMS = ""
     print("\nListing the recommendations...")
     url = URL + "/listRecommendations"
     print("URL = ", url)
 
-    if experiment_name == None:
-        if latest == None and monitoring_end_time == None:
-            response = requests.get(url)
-        elif latest != None:
-            PARAMS = {'latest': latest}
-        elif monitoring_end_time != None:
-            PARAMS = {'monitoring_end_time': monitoring_end_time}
-    else:
-        if latest == None and monitoring_end_time == None:
-            PARAMS = {'experiment_name': experiment_name}
-        elif latest != None:
-            PARAMS = {'experiment_name': experiment_name, 'latest': latest}
-        elif monitoring_end_time != None:
-            PARAMS = {'experiment_name': experiment_name, 'monitoring_end_time': monitoring_end_time}
-
-    print("PARAMS = ", PARAMS)
-    response = requests.get(url=url, params=PARAMS)
+    response = get_default_client().list_recommendations(experiment_name, latest, monitoring_end_time)
+    print("PARAMS = ", _list_recommendations_params(experiment_name, latest, monitoring_end_time))
 
     print("Response status code = ", response.status_code)
     print("\n************************************************************")
@@ -183,16 +590,9 @@ def delete_experiment(input_json_file, invalid_header=False):
 
     experiment_name = input_json[0]['experiment_name']
 
-    delete_json = [{
-        "experiment_name": experiment_name
-    }]
-
-    headers = {'content-type': 'application/xml'}
     if invalid_header:
         print("Invalid header")
-        response = requests.delete(url, json=delete_json, headers=headers)
-    else:
-        response = requests.delete(url, json=delete_json)
+    response = get_default_client().delete_experiment(experiment_name, invalid_header)
 
     print(response)
     print("Response status code = ", response.status_code)
@@ -209,7 +609,7 @@ def create_performance_profile(perf_profile_json_file):
     url = URL + "/createPerformanceProfile"
     print("URL = ", url)
 
-    response = requests.post(url, json=perf_profile_json)
+    response = get_default_client().create_performance_profile(perf_profile_json)
     print("Response status code = ", response.status_code)
     print(response.text)
     return response
@@ -219,24 +619,9 @@ def create_performance_profile(perf_profile_json_file):
 # Input Parameters: None
 def list_experiments(results=None, recommendations=None, latest=None, experiment_name=None):
     print("\nListing the experiments...")
-    query_params = {}
 
-    if experiment_name is not None:
-        query_params['experiment_name'] = experiment_name
-    if latest is not None:
-        query_params['latest'] = latest
-    if results is not None:
-        query_params['results'] = results
-    if recommendations is not None:
-        query_params['recommendations'] = recommendations
-
-    query_string = "&".join(f"{key}={value}" for key, value in query_params.items())
-
-    url = URL + "/listExperiments"
-    if query_string:
-        url += "?" + query_string
-    print("URL = ", url)
-    response = requests.get(url)
+    response = get_default_client().list_experiments(results, recommendations, latest, experiment_name)
+    print("URL = ", response.url)
     print("Response status code = ", response.status_code)
     return response
 
@@ -245,20 +630,11 @@ def list_experiments(results=None, recommendations=None, latest=None, experiment
 # Input Parameters: None
 def list_datasources(name=None):
     print("\nListing the datasources...")
-    query_params = {}
-
-    if name is not None:
-        query_params['name'] = name
-
-    query_string = "&".join(f"{key}={value}" for key, value in query_params.items())
 
-    url = URL + "/datasources"
-    if query_string:
-        url += "?" + query_string
-    print("URL = ", url)
-    response = requests.get(url)
+    response = get_default_client().list_datasources(name)
+    print("URL = ", response.url)
 
-    print("PARAMS = ", query_params)
+    print("PARAMS = ", {'name': name} if name is not None else {})
     print("Response status code = ", response.status_code)
     print("\n************************************************************")
     print(response.text)
@@ -282,31 +658,12 @@ def import_metadata(input_json_file, invalid_header=False):
     url = URL + "/dsmetadata"
     print("URL = ", url)
 
-    headers = {'content-type': 'application/xml'}
     if invalid_header:
         print("Invalid header")
-        response = requests.post(url, json=input_json, headers=headers)
-    else:
-        response = requests.post(url, json=input_json)
+    response = get_default_client().import_metadata(input_json, invalid_header)
 
     print("Response status code = ", response.status_code)
-    try:
-        # Parse the response content as JSON into a Python dictionary
-        response_json = response.json()
-
-        # Check if the response_json is a valid JSON object or array
-        if isinstance(response_json, (dict, list)):
-            # Convert the response_json back to a JSON-formatted string with double quotes and pretty print it
-            pretty_response_json_str = json.dumps(response_json, indent=4)
-
-            # Print the JSON string
-            print(pretty_response_json_str)
-        else:
-            print("Invalid JSON format in the response.")
-            print(response.text)  # Print the response text as-is
-    except json.JSONDecodeError:
-        print("Response content is not valid JSON.")
-        print(response.text)  # Print the response text as-is
+    print_json_response(response)
     return response
 
 
@@ -321,12 +678,9 @@ def delete_metadata(input_json_file, invalid_header=False):
     url = URL + "/dsmetadata"
     print("URL = ", url)
 
-    headers = {'content-type': 'application/xml'}
     if invalid_header:
         print("Invalid header")
-        response = requests.delete(url, json=input_json, headers=headers)
-    else:
-        response = requests.delete(url, json=input_json)
+    response = get_default_client().delete_metadata(input_json, invalid_header)
 
     print(response)
     print("Response status code = ", response.status_code)
@@ -338,25 +692,9 @@ def delete_metadata(input_json_file, invalid_header=False):
 def list_metadata(datasource=None, cluster_name=None, namespace=None, verbose=None, logging=True):
     print("\nListing the metadata...")
 
-    query_params = {}
-
-    if datasource is not None:
-        query_params['datasource'] = datasource
-        if cluster_name is not None:
-            query_params['cluster_name'] = cluster_name
-        if namespace is not None:
-            query_params['namespace'] = namespace
-        if verbose is not None:
-            query_params['verbose'] = verbose
-
-    query_string = "&".join(f"{key}={value}" for key, value in query_params.items())
-
-    url = URL + "/dsmetadata"
-    if query_string:
-        url += "?" + query_string
-    print("URL = ", url)
-    print("PARAMS = ", query_params)
-    response = requests.get(url)
+    response = get_default_client().list_metadata(datasource, cluster_name, namespace, verbose)
+    print("URL = ", response.url)
+    print("PARAMS = ", _metadata_query_params(datasource, cluster_name, namespace, verbose))
 
     print("Response status code = ", response.status_code)
     if logging:
@@ -0,0 +1,126 @@
+"""
+Copyright (c) 2024, 2024 Red Hat, IBM Corporation and others.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import asyncio
+import time
+
+import aiohttp
+
+from helpers import json_codec
+from helpers.kruize import _api_name, _encode_json_body, _list_experiments_params, _list_recommendations_params, \
+    _query_string, _update_recommendations_path
+from helpers.traffic_capture import get_env_capture
+
+# Default maximum number of requests in flight per client
+DEFAULT_MAX_IN_FLIGHT = 100
+# Default total timeout in seconds for a single request
+DEFAULT_TIMEOUT = 60
+
+
+class AsyncResponse:
+    """
+    Fully read response of an AsyncKruizeClient call, exposing the subset of
+    requests.Response used by the tests and the load tools
+    """
+
+    def __init__(self, status_code, content, url):
+        self.status_code = status_code
+        self.content = content
+        self.url = url
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8')
+
+    def json(self):
+        return json_codec.loads(self.content)
+
+
+class AsyncKruizeClient:
+    """
+    asyncio Kruize REST API client, a single instance can keep up to max_in_flight
+    requests outstanding over one shared connection pool. With metrics set (an ApiMetrics),
+    every call is recorded, timed from when it gets an in-flight slot. Every request is appended to
+    capture (a TrafficCapture), by default the one of KRUIZE_TRAFFIC_CAPTURE
+    """
+
+    def __init__(self, url, max_in_flight=DEFAULT_MAX_IN_FLIGHT, timeout=DEFAULT_TIMEOUT, metrics=None, capture=None):
+        self.url = url
+        self.metrics = metrics
+        # capture=False disables the capture of KRUIZE_TRAFFIC_CAPTURE
+        self.capture = get_env_capture() if capture is None else (capture or None)
+        self.max_in_flight = max_in_flight
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.semaphore = None
+        self.session = None
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def open(self):
+        # The semaphore and session are bound to the running event loop, so they are created here
+        self.semaphore = asyncio.Semaphore(self.max_in_flight)
+        connector = aiohttp.TCPConnector(limit=self.max_in_flight)
+        self.session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def request(self, method, path, **kwargs):
+        _encode_json_body(kwargs)
+        async with self.semaphore:
+            start_time = time.time()
+            try:
+                async with self.session.request(method, self.url + path, **kwargs) as response:
+                    content = await response.read()
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                if self.metrics is not None:
+                    self.metrics.record(_api_name(path), method, None, time.time() - start_time)
+                if self.capture is not None:
+                    self.capture.record(start_time, method, path, kwargs, None)
+                raise
+            if self.metrics is not None:
+                self.metrics.record(_api_name(path), method, response.status, time.time() - start_time, len(content))
+            if self.capture is not None:
+                self.capture.record(start_time, method, path, kwargs, response.status)
+            return AsyncResponse(response.status, content, str(response.url))
+
+    async def create_performance_profile(self, perf_profile_json):
+        return await self.request("POST", "/createPerformanceProfile", json=perf_profile_json)
+
+    async def create_experiment(self, input_json):
+        return await self.request("POST", "/createExperiment", json=input_json)
+
+    async def update_results(self, result_json):
+        return await self.request("POST", "/updateResults", json=result_json)
+
+    async def update_recommendations(self, experiment_name, startTime, endTime):
+        return await self.request("POST", _update_recommendations_path(experiment_name, startTime, endTime))
+
+    async def list_recommendations(self, experiment_name=None, latest=None, monitoring_end_time=None):
+        params = _list_recommendations_params(experiment_name, latest, monitoring_end_time)
+        return await self.request("GET", "/listRecommendations", params=params)
+
+    async def list_experiments(self, results=None, recommendations=None, latest=None, experiment_name=None):
+        return await self.request("GET", "/listExperiments" + _query_string(
+            _list_experiments_params(results, recommendations, latest, experiment_name)))
+
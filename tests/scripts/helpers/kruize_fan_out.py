@@ -0,0 +1,95 @@
+"""
+Copyright (c) 2024, 2024 Red Hat, IBM Corporation and others.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from helpers.kruize import DEFAULT_POOL_SIZE, _response_json
+from helpers.utils import SUCCESS_200_STATUS_CODE
+
+LIST_RECOMMENDATIONS_API = "listRecommendations"
+LIST_EXPERIMENTS_API = "listExperiments"
+
+
+class FanOutResult:
+    """
+    Merged outcome of a fan-out listing: the listed object of every experiment keyed by
+    experiment name, the latency of each per-experiment call and the calls that failed
+    """
+
+    def __init__(self, api):
+        self.api = api
+        self.results = {}
+        self.latencies = {}
+        self.errors = {}
+        self.elapsed_time = 0.0
+
+    def print_summary(self):
+        latencies = sorted(self.latencies.values())
+        print("%s fan-out: experiments : %s  failed : %s  elapsed time : %.2fs" % (
+            self.api, len(self.results), len(self.errors), self.elapsed_time))
+        if latencies:
+            print("per call latency: min : %.3fs  p50 : %.3fs  p99 : %.3fs  max : %.3fs" % (
+                latencies[0], _percentile(latencies, 50), _percentile(latencies, 99), latencies[-1]))
+        for experiment_name, error in sorted(self.errors.items()):
+            print(f"{self.api} failed for {experiment_name}: {error}")
+
+
+# Description: This function lists the given experiments with one listRecommendations or listExperiments call per
+# experiment, issued concurrently by a pool of workers sharing the client's connection pool, and merges the responses
+# Input Parameters: KruizeClient, experiment names, api (listRecommendations or listExperiments), number of workers,
+# query parameters of the list api other than experiment_name
+def fan_out_list(client, experiment_names, api=LIST_RECOMMENDATIONS_API, workers=DEFAULT_POOL_SIZE, **params):
+    if api == LIST_RECOMMENDATIONS_API:
+        list_call = client.list_recommendations
+    elif api == LIST_EXPERIMENTS_API:
+        list_call = client.list_experiments
+    else:
+        raise ValueError("Unsupported api for fan-out listing: %s" % api)
+
+    def list_experiment(experiment_name):
+        start_time = time.time()
+        try:
+            response = list_call(experiment_name=experiment_name, **params)
+        except requests.exceptions.RequestException as e:
+            return experiment_name, time.time() - start_time, None, str(e)
+
+        latency = time.time() - start_time
+        response_json = _response_json(response)
+        if response.status_code != SUCCESS_200_STATUS_CODE or not isinstance(response_json, list):
+            message = response_json.get('message') if isinstance(response_json, dict) else response.text
+            return experiment_name, latency, None, "%s %s" % (response.status_code, message)
+        return experiment_name, latency, response_json, None
+
+    fan_out = FanOutResult(api)
+    start_time = time.time()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for experiment_name, latency, listed, error in executor.map(list_experiment, experiment_names):
+            fan_out.latencies[experiment_name] = latency
+            if error is not None:
+                fan_out.errors[experiment_name] = error
+                continue
+            for element in listed:
+                fan_out.results[element.get('experiment_name', experiment_name)] = element
+    fan_out.elapsed_time = time.time() - start_time
+    return fan_out
+
+
+def _percentile(sorted_values, percentile):
+    index = min(len(sorted_values) - 1, int(round(percentile / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
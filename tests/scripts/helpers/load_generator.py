@@ -0,0 +1,165 @@
+"""
+Copyright (c) 2024, 2024 Red Hat, IBM Corporation and others.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import asyncio
+import datetime
+import random
+
+import aiohttp
+
+from helpers.api_metrics import ApiMetrics
+
+DATE_FORMAT = '%Y-%m-%dT%H:%M:%S.%fZ'
+CONSTANT_ARRIVAL = "constant"
+POISSON_ARRIVAL = "poisson"
+ARRIVAL_PROCESSES = [CONSTANT_ARRIVAL, POISSON_ARRIVAL]
+
+
+# Description: This function yields the send time offsets in seconds of an open-loop schedule, evenly spaced for a
+# constant arrival process or with exponentially distributed gaps for a Poisson arrival process
+# Input Parameters: requests per second, arrival process, random seed
+def arrival_offsets(rate, arrival=CONSTANT_ARRIVAL, seed=None):
+    if rate <= 0:
+        raise ValueError("The request rate must be positive, got %s" % rate)
+    if arrival not in ARRIVAL_PROCESSES:
+        raise ValueError("Unsupported arrival process %s, supported: %s" % (arrival, ARRIVAL_PROCESSES))
+
+    rng = random.Random(seed)
+    offset = 0.0
+    while True:
+        yield offset
+        offset += 1 / rate if arrival == CONSTANT_ARRIVAL else rng.expovariate(rate)
+
+
+class ExperimentWorkload:
+    """
+    ROS like request sequence over num_exps experiments, served round robin. Each experiment is
+    created first, then gets updateResults posts of bulk_size intervals moving forward in time,
+    with an updateRecommendations after every recommendation_every posts (0 disables them).
+    """
+
+    def __init__(self, name_prefix, num_exps, create_json, result_json, start_date, minutes_jump=15, bulk_size=1,
+                 recommendation_every=0):
+        self.create_json = create_json
+        self.result_json = result_json
+        self.start_date = datetime.datetime.strptime(start_date, DATE_FORMAT)
+        self.minutes_jump = minutes_jump
+        self.bulk_size = bulk_size
+        self.recommendation_every = recommendation_every
+        self.experiment_names = ["%s_%s" % (name_prefix, i) for i in range(1, num_exps + 1)]
+        self._sequences = [self._requests(experiment_name) for experiment_name in self.experiment_names]
+        self._next = 0
+
+    def next_request(self):
+        """
+        Returns the experiment name and the next (api, method, call) of the next experiment in turn,
+        call is a coroutine function taking the AsyncKruizeClient
+        """
+        index = self._next % len(self._sequences)
+        self._next += 1
+        return self.experiment_names[index], next(self._sequences[index])
+
+    def _requests(self, experiment_name):
+        create_json = dict(self.create_json, experiment_name=experiment_name)
+        yield "createExperiment", "POST", lambda client: client.create_experiment([create_json])
+
+        interval_end_time = self.start_date
+        posts = 0
+        while True:
+            bulk_data = []
+            for _ in range(self.bulk_size):
+                interval_start_time = interval_end_time
+                interval_end_time = interval_start_time + datetime.timedelta(minutes=self.minutes_jump)
+                bulk_data.append(dict(self.result_json, experiment_name=experiment_name,
+                                      interval_start_time=interval_start_time.strftime(DATE_FORMAT),
+                                      interval_end_time=interval_end_time.strftime(DATE_FORMAT)))
+            yield "updateResults", "POST", lambda client, bulk_data=bulk_data: client.update_results(bulk_data)
+
+            posts += 1
+            if self.recommendation_every and posts % self.recommendation_every == 0:
+                end_time = interval_end_time.strftime(DATE_FORMAT)[:-4] + 'Z'
+                yield "updateRecommendations", "POST", lambda client, end_time=end_time: \
+                    client.update_recommendations(experiment_name, None, end_time)
+
+
+class OpenLoopLoadGenerator:
+    """
+    Sends the workload's requests at the scheduled arrival times whatever the response times are,
+    so the offered load does not drop when Kruize slows down. Latencies in corrected are measured
+    from the scheduled send time, which corrects for coordinated omission: a request delayed by a
+    slow predecessor of the same experiment or by the in-flight limit is charged for the wait. The
+    client's own metrics keep the service time of the calls.
+    """
+
+    def __init__(self, client, workload, rate, duration, arrival=CONSTANT_ARRIVAL, seed=None):
+        self.client = client
+        self.workload = workload
+        self.rate = rate
+        self.duration = duration
+        self.arrival = arrival
+        self.seed = seed
+        self.corrected = ApiMetrics()
+        self.sent_count = 0
+        self.max_schedule_lag = 0.0
+        self.send_time = 0.0
+        self.elapsed_time = 0.0
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        start_time = loop.time()
+        # The last request of every experiment, the next one of the same experiment waits for it
+        previous = {}
+        tasks = set()
+        for offset in arrival_offsets(self.rate, self.arrival, self.seed):
+            if offset >= self.duration:
+                break
+            delay = start_time + offset - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                self.max_schedule_lag = max(self.max_schedule_lag, -delay)
+
+            experiment_name, (api, method, call) = self.workload.next_request()
+            task = asyncio.ensure_future(self._send(api, method, call, start_time + offset,
+                                                    previous.get(experiment_name)))
+            previous[experiment_name] = task
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+            self.sent_count += 1
+
+        self.send_time = loop.time() - start_time
+        await asyncio.gather(*tasks)
+        self.elapsed_time = loop.time() - start_time
+
+    async def _send(self, api, method, call, scheduled_time, previous):
+        if previous is not None:
+            await previous
+        loop = asyncio.get_running_loop()
+        try:
+            response = await call(self.client)
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            self.corrected.record(api, method, None, loop.time() - scheduled_time)
+            return
+        self.corrected.record(api, method, response.status_code, loop.time() - scheduled_time, len(response.content))
+
+    def print_summary(self):
+        print("Offered rate : %s/s (%s)  sent : %s  send rate : %.2f/s  max schedule lag : %.3fs  "
+              "elapsed time : %.2fs  completion rate : %.2f/s" % (
+                  self.rate, self.arrival, self.sent_count, self.sent_count / self.send_time if self.send_time else 0.0,
+                  self.max_schedule_lag, self.elapsed_time,
+                  self.sent_count / self.elapsed_time if self.elapsed_time else 0.0))
+        print("Latency from the scheduled send time (coordinated omission corrected):")
+        self.corrected.print_summary()
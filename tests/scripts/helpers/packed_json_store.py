@@ -0,0 +1,159 @@
+"""
+Copyright (c) 2024, 2024 Red Hat, IBM Corporation and others.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import os
+import struct
+
+from helpers import json_codec
+
+# Index file: magic and the (rows, columns) shape, then one record per (row, column) in row major order
+INDEX_FILE = "index.bin"
+INDEX_MAGIC = b"KRUIZEPJS1\n"
+INDEX_HEADER = struct.Struct("<II")
+# Index record: segment number, offset and length of the json line in the segment, a length of 0 is a missing entry
+INDEX_RECORD = struct.Struct("<IQI")
+SEGMENT_FORMAT = "segment_%05d.jsonl"
+# Segments are rolled over past this size
+DEFAULT_SEGMENT_BYTES = 256 * 1024 * 1024
+
+
+def _segment_file(directory, segment):
+    return os.path.join(directory, SEGMENT_FORMAT % segment)
+
+
+class PackedJsonWriter:
+    """
+    Packs the json documents of a (rows, columns) grid, for example (experiments, results), into
+    a few JSONL segment files instead of a file per document. The offset of every document is
+    written at a fixed position of the index file, so the reader finds any document with one
+    index read and one segment read. Has the write(row, column, data) / close() interface of the
+    iter_update_results sinks.
+    """
+
+    def __init__(self, directory, rows, columns, segment_bytes=DEFAULT_SEGMENT_BYTES):
+        self.directory = directory
+        self.rows = rows
+        self.columns = columns
+        self.segment_bytes = segment_bytes
+        self.count = 0
+        os.makedirs(directory, exist_ok=True)
+        self._index_fd = os.open(os.path.join(directory, INDEX_FILE), os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        os.write(self._index_fd, INDEX_MAGIC + INDEX_HEADER.pack(rows, columns))
+        # Missing entries read as zeroed records of the sparse index
+        os.ftruncate(self._index_fd, len(INDEX_MAGIC) + INDEX_HEADER.size + rows * columns * INDEX_RECORD.size)
+        self._segment = -1
+        self._segment_file = None
+        self._offset = 0
+        self._next_segment()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _next_segment(self):
+        if self._segment_file is not None:
+            self._segment_file.close()
+        self._segment += 1
+        self._segment_file = open(_segment_file(self.directory, self._segment), "wb")
+        self._offset = 0
+
+    def write(self, row, column, data):
+        """
+        Stores data, a json serializable object or already serialized json bytes, at (row, column)
+        """
+        if not (0 <= row < self.rows and 0 <= column < self.columns):
+            raise IndexError("(%s, %s) is outside of the (%s, %s) store" % (row, column, self.rows, self.columns))
+        if not isinstance(data, bytes):
+            data = json_codec.dumps(data)
+        if self._offset and self._offset + len(data) + 1 > self.segment_bytes:
+            self._next_segment()
+        self._segment_file.write(data + b"\n")
+        os.pwrite(self._index_fd, INDEX_RECORD.pack(self._segment, self._offset, len(data)),
+                  len(INDEX_MAGIC) + INDEX_HEADER.size + (row * self.columns + column) * INDEX_RECORD.size)
+        self._offset += len(data) + 1
+        self.count += 1
+
+    def close(self):
+        if self._segment_file is not None:
+            self._segment_file.close()
+            self._segment_file = None
+            os.close(self._index_fd)
+
+
+class PackedJsonReader:
+    """
+    Reads the documents of a PackedJsonWriter store by (row, column) with positioned reads, no
+    directory listing nor file per document
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._index_fd = os.open(os.path.join(directory, INDEX_FILE), os.O_RDONLY)
+        header = os.pread(self._index_fd, len(INDEX_MAGIC) + INDEX_HEADER.size, 0)
+        if header[:len(INDEX_MAGIC)] != INDEX_MAGIC:
+            os.close(self._index_fd)
+            raise ValueError("%s is not a packed json store" % directory)
+        self.rows, self.columns = INDEX_HEADER.unpack(header[len(INDEX_MAGIC):])
+        self._segment_fds = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def get_bytes(self, row, column):
+        """
+        Returns the serialized json stored at (row, column), None if nothing was stored there
+        """
+        if not (0 <= row < self.rows and 0 <= column < self.columns):
+            raise IndexError("(%s, %s) is outside of the (%s, %s) store" % (row, column, self.rows, self.columns))
+        record = os.pread(self._index_fd, INDEX_RECORD.size,
+                          len(INDEX_MAGIC) + INDEX_HEADER.size + (row * self.columns + column) * INDEX_RECORD.size)
+        segment, offset, length = INDEX_RECORD.unpack(record)
+        if length == 0:
+            return None
+        fd = self._segment_fds.get(segment)
+        if fd is None:
+            fd = os.open(_segment_file(self.directory, segment), os.O_RDONLY)
+            self._segment_fds[segment] = fd
+        return os.pread(fd, length, offset)
+
+    def get(self, row, column):
+        """
+        Returns the json document stored at (row, column), None if nothing was stored there
+        """
+        data = self.get_bytes(row, column)
+        return None if data is None else json_codec.loads(data)
+
+    def iter_row(self, row):
+        """
+        Yields the (column, document) pairs stored in the row, in column order
+        """
+        for column in range(self.columns):
+            document = self.get(row, column)
+            if document is not None:
+                yield column, document
+
+    def close(self):
+        for fd in self._segment_fds.values():
+            os.close(fd)
+        self._segment_fds = {}
+        if self._index_fd is not None:
+            os.close(self._index_fd)
+            self._index_fd = None
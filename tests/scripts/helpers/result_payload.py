@@ -0,0 +1,108 @@
+"""
+Copyright (c) 2024, 2024 Red Hat, IBM Corporation and others.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import calendar
+import datetime
+
+from helpers import json_codec
+
+DATE_FORMAT = '%Y-%m-%dT%H:%M:%S.%fZ'
+SECONDS_PER_DAY = 86400
+# Placeholders of the spliced fields in the serialized template, in the order of SPLICED_FIELDS
+SPLICED_FIELDS = ["experiment_name", "interval_start_time", "interval_end_time"]
+_PLACEHOLDERS = ["@@kruize_%s@@" % field for field in SPLICED_FIELDS]
+
+
+class ResultPayloadFactory:
+    """
+    Builds updateResults bodies from a results.json like template. The template is serialized once,
+    then only the experiment name and the interval times are spliced into the serialized bytes. The
+    intervals are minutes_jump minutes long from start_date, their times are computed as integer
+    epoch seconds and formatted like DATE_FORMAT from per day and per time of day caches.
+    """
+
+    def __init__(self, result_json, start_date, minutes_jump):
+        template = dict(result_json, **dict(zip(SPLICED_FIELDS, _PLACEHOLDERS)))
+        serialized = json_codec.dumps(template)
+        # The template is cut around the quoted placeholders, in the order they appear in it
+        positions = sorted((serialized.index(b'"%s"' % placeholder.encode()), slot)
+                           for slot, placeholder in enumerate(_PLACEHOLDERS))
+        self._parts = []
+        self._slots = []
+        previous_end = 0
+        for position, slot in positions:
+            self._parts.append(serialized[previous_end:position])
+            self._slots.append(slot)
+            previous_end = position + len(_PLACEHOLDERS[slot]) + 2
+        self._parts.append(serialized[previous_end:])
+
+        start_date = datetime.datetime.strptime(start_date, DATE_FORMAT)
+        self.start_date = start_date
+        self.start_epoch = calendar.timegm(start_date.timetuple())
+        self.step = minutes_jump * 60
+        self._fraction = ".%06dZ\"" % start_date.microsecond
+        self._days = {}
+        self._times_of_day = {}
+
+    def interval_end_time(self, index):
+        """
+        Returns the end of the index-th interval as a datetime, like the drivers pass to updateRecommendations
+        """
+        return self.start_date + datetime.timedelta(seconds=(index + 1) * self.step)
+
+    def intervals_ended_by(self, interval_end_time):
+        """
+        Returns the number of intervals ending at or before interval_end_time, in DATE_FORMAT
+        """
+        elapsed = datetime.datetime.strptime(interval_end_time, DATE_FORMAT) - self.start_date
+        return max(0, int(elapsed.total_seconds() // self.step))
+
+    def _timestamp(self, epoch):
+        day, time_of_day = divmod(epoch, SECONDS_PER_DAY)
+        day_prefix = self._days.get(day)
+        if day_prefix is None:
+            day_prefix = self._days[day] = '"%s' % datetime.date.fromordinal(
+                day + datetime.date(1970, 1, 1).toordinal()).isoformat()
+        time_suffix = self._times_of_day.get(time_of_day)
+        if time_suffix is None:
+            hours, rem = divmod(time_of_day, 3600)
+            time_suffix = self._times_of_day[time_of_day] = "T%02d:%02d:%02d%s" % (hours, rem // 60, rem % 60,
+                                                                                    self._fraction)
+        return (day_prefix + time_suffix).encode()
+
+    def result(self, experiment_name, index):
+        """
+        Returns the serialized result of the index-th interval of the experiment
+        """
+        return self._result(json_codec.dumps(experiment_name), index)
+
+    def _result(self, name, index):
+        start_epoch = self.start_epoch + index * self.step
+        values = (name, self._timestamp(start_epoch), self._timestamp(start_epoch + self.step))
+        parts = self._parts
+        body = [parts[0]]
+        for i, slot in enumerate(self._slots):
+            body.append(values[slot])
+            body.append(parts[i + 1])
+        return b"".join(body)
+
+    def bulk_body(self, experiment_name, first_index, count):
+        """
+        Returns the serialized updateResults body of count consecutive intervals of the experiment,
+        starting with the first_index-th one
+        """
+        name = json_codec.dumps(experiment_name)
+        return b"[" + b",".join(self._result(name, index) for index in range(first_index, first_index + count)) + b"]"
@@ -0,0 +1,88 @@
+"""
+Copyright (c) 2024, 2024 Red Hat, IBM Corporation and others.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import bisect
+import json
+import os
+
+
+class ResultsCheckpoint:
+    """
+    Last acknowledged interval_end_time of every experiment of a scale run, keyed by experiment
+    number. The drivers post experiments in order, so consecutive experiments mostly share the same
+    time and are kept as [first, last, interval_end_time] ranges, which keeps the file small. The
+    checkpoint is saved after every acknowledgement through a temporary file and a rename, so a
+    crash leaves the previous checkpoint in place.
+    """
+
+    def __init__(self, filename, name):
+        self.filename = filename
+        self.name = name
+        self.ranges = []
+
+    @classmethod
+    def load(cls, filename, name):
+        """
+        Returns the checkpoint saved in filename, or an empty one if there is none yet
+        """
+        checkpoint = cls(filename, name)
+        if not os.path.exists(filename):
+            return checkpoint
+        with open(filename, "r") as f:
+            data = json.load(f)
+        if data["name"] != name:
+            raise ValueError("Checkpoint %s is for experiments %s, not %s" % (filename, data["name"], name))
+        checkpoint.ranges = [list(experiment_range) for experiment_range in data["ranges"]]
+        return checkpoint
+
+    def _find(self, experiment):
+        index = bisect.bisect_right(self.ranges, [experiment, float("inf")]) - 1
+        if index >= 0 and self.ranges[index][0] <= experiment <= self.ranges[index][1]:
+            return index
+        return None
+
+    def last_end_time(self, experiment):
+        index = self._find(experiment)
+        return self.ranges[index][2] if index is not None else None
+
+    def acknowledge(self, experiment, interval_end_time):
+        index = self._find(experiment)
+        if index is None:
+            index = bisect.bisect_right(self.ranges, [experiment, float("inf")])
+            self.ranges.insert(index, [experiment, experiment, interval_end_time])
+        else:
+            first, last, end_time = self.ranges[index]
+            split = [[first, experiment - 1, end_time], [experiment, experiment, interval_end_time],
+                     [experiment + 1, last, end_time]]
+            split = [experiment_range for experiment_range in split if experiment_range[0] <= experiment_range[1]]
+            self.ranges[index:index + 1] = split
+            index += split.index([experiment, experiment, interval_end_time])
+        # Merge the experiment's range with its neighbours holding the same time
+        if index + 1 < len(self.ranges) and self._mergeable(self.ranges[index], self.ranges[index + 1]):
+            self.ranges[index][1] = self.ranges.pop(index + 1)[1]
+        if index > 0 and self._mergeable(self.ranges[index - 1], self.ranges[index]):
+            self.ranges[index - 1][1] = self.ranges.pop(index)[1]
+        self.save()
+
+    @staticmethod
+    def _mergeable(left, right):
+        return left[1] + 1 == right[0] and left[2] == right[2]
+
+    def save(self):
+        temp_filename = self.filename + ".tmp"
+        with open(temp_filename, "w") as f:
+            json.dump({"name": self.name, "ranges": self.ranges}, f)
+        os.replace(temp_filename, self.filename)
@@ -0,0 +1,123 @@
+"""
+Copyright (c) 2024, 2024 Red Hat, IBM Corporation and others.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import random
+import threading
+
+CONFLICT_STATUS_CODE = 409
+
+# APIs for which a 409 on a retried request means the earlier attempt was saved
+REPLAYABLE_CREATE_APIS = ["createExperiment", "createPerformanceProfile"]
+UPDATE_RESULTS_API = "updateResults"
+
+# Only DELETE is not safe to replay, Kruize answers a replayed delete with an error
+NON_IDEMPOTENT_METHODS = ["DELETE"]
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter. Retries are bounded per call by max_attempts and
+    per policy by a retry budget: at most budget_floor + retry_budget * requests retries overall,
+    so a saturated Kruize is not hit with an unbounded retry storm.
+    """
+
+    def __init__(self, max_attempts=5, backoff_base=0.5, backoff_max=30.0, retry_budget=0.2, budget_floor=10,
+                 retry_statuses=(429, 502, 503, 504)):
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_budget = retry_budget
+        self.budget_floor = budget_floor
+        self.retry_statuses = retry_statuses
+        self.stats = RetryStats()
+
+    def backoff(self, retry):
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** (retry - 1))))
+
+    def can_retry(self, method, attempt):
+        if method in NON_IDEMPOTENT_METHODS or attempt >= self.max_attempts:
+            return False
+        return self.stats.take_retry_token(self.budget_floor, self.retry_budget)
+
+    def should_retry_status(self, status_code):
+        return status_code in self.retry_statuses
+
+
+class RetryStats:
+    """
+    Per API retry accounting. Latency spent on retries (backoff waits and the repeated
+    attempts) is kept apart from the first attempt so that saturation shows up explicitly.
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.retries = 0
+        self.apis = {}
+        self._lock = threading.Lock()
+
+    def take_retry_token(self, budget_floor, retry_budget):
+        with self._lock:
+            if self.retries >= budget_floor + retry_budget * self.requests:
+                return False
+            self.retries += 1
+            return True
+
+    def record(self, api, retries, first_attempt_time, retry_time, replayed, gave_up):
+        with self._lock:
+            self.requests += 1
+            stats = self.apis.setdefault(api, {
+                "calls": 0, "retried_calls": 0, "retries": 0, "first_attempt_time": 0.0, "retry_time": 0.0,
+                "replayed": 0, "gave_up": 0
+            })
+            stats["calls"] += 1
+            stats["retries"] += retries
+            stats["first_attempt_time"] += first_attempt_time
+            stats["retry_time"] += retry_time
+            if retries:
+                stats["retried_calls"] += 1
+            if replayed:
+                stats["replayed"] += 1
+            if gave_up:
+                stats["gave_up"] += 1
+
+    def summary(self):
+        with self._lock:
+            return {api: dict(stats) for api, stats in self.apis.items()}
+
+    def print_summary(self):
+        for api, stats in sorted(self.summary().items()):
+            print("%s: calls : %s  retried calls : %s  retries : %s  replayed : %s  gave up : %s  "
+                  "first attempt time : %.2fs  retry time : %.2fs" % (
+                      api, stats["calls"], stats["retried_calls"], stats["retries"], stats["replayed"],
+                      stats["gave_up"], stats["first_attempt_time"], stats["retry_time"]))
+
+
+# Description: This function checks if the response of a retried request only failed because an earlier attempt
+# of the same request was already saved by Kruize, in which case the call is treated as successful
+# Input Parameters: api name, response status code, response json (None if the body is not json)
+def is_idempotent_replay(api, status_code, response_json):
+    if api in REPLAYABLE_CREATE_APIS:
+        return status_code == CONFLICT_STATUS_CODE
+
+    if api == UPDATE_RESULTS_API:
+        if status_code == CONFLICT_STATUS_CODE:
+            return True
+        if not isinstance(response_json, dict) or not response_json.get('data'):
+            return False
+        return all(error.get('httpcode') == CONFLICT_STATUS_CODE
+                   for failed_result in response_json['data'] for error in failed_result.get('errors', []))
+
+    return False
@@ -0,0 +1,81 @@
+"""
+Copyright (c) 2024, 2024 Red Hat, IBM Corporation and others.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+# Samples averaged per batch, MSER-5 uses batches of 5
+DEFAULT_WINDOW = 5
+
+
+def _mean(values):
+    return sum(values) / len(values)
+
+
+# Description: This function returns the index of the first steady state sample of a latency series with the MSER
+# (marginal standard error) rule, or None if the series does not settle. The series is averaged in batches of window
+# samples and truncated at the batch minimizing the variance of the remaining batch means divided by their squared
+# count: cutting a warmup batch lowers that variance more than it loses samples, cutting steady state batches does
+# not. The truncation is searched in the first half of the series, a minimum past it means the latency kept drifting
+# Input Parameters: latency samples in time order, samples per batch
+def warmup_end(values, window=DEFAULT_WINDOW):
+    if window <= 0:
+        return 0
+    batches = [_mean(values[i:i + window]) for i in range(0, len(values) - window + 1, window)]
+    if len(batches) < 4:
+        return None
+    best_batch = None
+    best_statistic = None
+    # Sums of the remaining batch means and of their squares, from the last batch backwards
+    total = 0.0
+    total_squares = 0.0
+    statistics = [None] * len(batches)
+    for d in range(len(batches) - 1, -1, -1):
+        total += batches[d]
+        total_squares += batches[d] ** 2
+        remaining = len(batches) - d
+        statistics[d] = (total_squares - total ** 2 / remaining) / remaining ** 2
+    for d in range(len(batches) // 2 + 1):
+        if best_statistic is None or statistics[d] < best_statistic:
+            best_batch = d
+            best_statistic = statistics[d]
+    if best_batch == len(batches) // 2:
+        return None
+    return best_batch * window
+
+
+# Description: This function splits a latency series in its warmup and steady state samples, a series that does not
+# settle is kept as steady state
+# Input Parameters: latency samples in time order, samples per batch
+def split_warmup(values, window=DEFAULT_WINDOW):
+    end = warmup_end(values, window)
+    if end is None:
+        return [], list(values)
+    return list(values[:end]), list(values[end:])
+
+
+def summarize(values):
+    """
+    Returns the count, mean, p50, p99 and max of the samples, None for an empty list
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    count = len(ordered)
+    return {
+        "count": count,
+        "mean": _mean(ordered),
+        "p50": ordered[(count - 1) // 2],
+        "p99": ordered[min(count - 1, int(count * 0.99))],
+        "max": ordered[-1]
+    }
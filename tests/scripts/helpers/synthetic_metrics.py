@@ -0,0 +1,211 @@
+"""
+Copyright (c) 2024, 2024 Red Hat, IBM Corporation and others.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import math
+
+import numpy as np
+
+from helpers.csv_cache import load_csv_columns
+
+mebibyte = 1048576
+# 15 minutes intervals per day, the period of the diurnal pattern
+INTERVALS_PER_DAY = 96
+
+# How the values of a metric vary between the experiments: the requests and limits are scaled per experiment, the
+# cpu usage follows the usage pattern and drops to zero when the experiment is idle, the memory follows a smoother
+# pattern and stays resident when idle
+CONFIG = 0
+CPU = 1
+MEMORY = 2
+
+# Metrics of the updateResults container json as (name, format, kind, aggregation checked, [(aggregation, csv
+# column)]) in the order generate_rm_jsons writes them. As in generate_rm_jsons, a metric is left out of an interval
+# when the csv cell of its checked aggregation is empty, the metrics without one are always present
+METRICS = [
+    ("cpuRequest", "cores", CONFIG, "avg", [("sum", "cpu_request_sum_container"),
+                                            ("avg", "cpu_request_avg_container")]),
+    ("cpuLimit", "cores", CONFIG, "avg", [("sum", "cpu_limit_sum_container"), ("avg", "cpu_limit_avg_container")]),
+    ("cpuThrottle", "cores", CPU, "max", [("sum", "cpu_throttle_sum_container"),
+                                          ("max", "cpu_throttle_max_container"),
+                                          ("avg", "cpu_throttle_avg_container")]),
+    ("cpuUsage", "cores", CPU, None, [("sum", "cpu_usage_sum_container"), ("min", "cpu_usage_min_container"),
+                                      ("max", "cpu_usage_max_container"), ("avg", "cpu_usage_avg_container")]),
+    ("memoryRequest", "MiB", CONFIG, "avg", [("sum", "mem_request_sum_container"),
+                                             ("avg", "mem_request_avg_container")]),
+    ("memoryLimit", "MiB", CONFIG, "avg", [("sum", "mem_limit_sum_container"),
+                                           ("avg", "mem_limit_avg_container")]),
+    ("memoryUsage", "MiB", MEMORY, None, [("min", "mem_usage_min_container"), ("max", "mem_usage_max_container"),
+                                          ("sum", "mem_usage_sum_container"), ("avg", "mem_usage_avg_container")]),
+    ("memoryRSS", "MiB", MEMORY, None, [("min", "mem_rss_min_container"), ("max", "mem_rss_max_container"),
+                                        ("sum", "mem_rss_sum_container"), ("avg", "mem_rss_avg_container")]),
+]
+
+
+# Description: This function returns the metric columns of the first num_res rows of a tfb_data.csv like file in a
+# (num_res, columns) float array, the memory columns in MiB and the empty cells as NaN. The columns are read from the
+# column cache of the csv
+# Input Parameters: metrics csv, number of rows (all if None)
+def load_metrics_csv(csv_file_path, num_res=None):
+    columns = [column for _, _, _, _, aggregations in METRICS for _, column in aggregations]
+    csv_columns = load_csv_columns(csv_file_path)
+    values = np.empty((min(csv_columns.num_rows, csv_columns.num_rows if num_res is None else num_res),
+                       len(columns)), dtype=np.float64)
+    for index, column in enumerate(columns):
+        values[:, index] = csv_columns.column(column)[:len(values)]
+        if column.startswith("mem_"):
+            values[:, index] /= mebibyte
+    return values
+
+
+# Streams of the hash below, every random quantity of the engine draws from its own stream
+SCALE_STREAM = 0
+PHASE_STREAM = 1
+CPU_NOISE_STREAMS = (2, 3)
+MEMORY_NOISE_STREAMS = (4, 5)
+IDLE_STREAM = 6
+
+
+def _mix(x):
+    # splitmix64 finalizer, x being a uint64 array
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+# Description: This function returns uniform values in (0, 1) hashed from the seed, stream, experiment and interval
+# numbers, so the value of any experiment interval is computed without generating the ones before it
+# Input Parameters: seed, stream, experiment numbers, interval numbers (arrays broadcast together)
+def hash_uniform(seed, stream, exps, intervals):
+    key = (seed + 0x9E3779B97F4A7C15 * (stream + 1)) & 0xFFFFFFFFFFFFFFFF
+    x = _mix(np.full(np.broadcast(exps, intervals).shape or (1,), key, dtype=np.uint64))
+    x = _mix(x ^ np.asarray(exps, dtype=np.uint64))
+    x = _mix(x ^ np.asarray(intervals, dtype=np.uint64))
+    return ((x >> np.uint64(11)).astype(np.float64) + 0.5) * 2.0 ** -53
+
+
+def _hash_lognormal(seed, streams, exps, intervals, sigma):
+    # Box-Muller transform of two uniform streams
+    u1 = hash_uniform(seed, streams[0], exps, intervals)
+    u2 = hash_uniform(seed, streams[1], exps, intervals)
+    return np.exp(sigma * np.sqrt(-2 * np.log(u1)) * np.cos(2 * math.pi * u2))
+
+
+class SyntheticMetricsEngine:
+    """
+    Derives total_exps different experiments from the metrics of tfb_data.csv. Every experiment
+    gets its own scale factor, a diurnal pattern with its own phase, seeded multiplicative noise
+    and idle episodes where its cpu usage is zero. Only the scale and phase of the experiments are
+    kept, the noise and idle episodes of an interval are hashed from the seed, the experiment and
+    the interval numbers when its metrics are requested, for all the experiments (or intervals) at once.
+    """
+
+    def __init__(self, csv_file_path, total_exps, num_res=None, seed=None, noise=0.1, scale_range=(0.25, 4.0),
+                 diurnal_amplitude=0.3, idle_probability=0.01, idle_length=8):
+        self.base = load_metrics_csv(csv_file_path, num_res)
+        self.total_exps = total_exps
+        self.num_res = len(self.base)
+        self.seed = int(np.random.SeedSequence().generate_state(1, np.uint64)[0]) if seed is None else seed
+        self.noise = noise
+        self.diurnal_amplitude = diurnal_amplitude
+        self.idle_probability = idle_probability
+        self.idle_length = idle_length
+
+        # Log uniform scale factors, as many experiments smaller as larger than the csv one
+        exps = np.arange(total_exps)
+        low, high = scale_range
+        self.scale = np.exp(math.log(low) + (math.log(high) - math.log(low)) *
+                            hash_uniform(self.seed, SCALE_STREAM, exps, 0))
+        self.phase = 2 * math.pi * hash_uniform(self.seed, PHASE_STREAM, exps, 0)
+
+        # (num_res, metrics) presence of the metrics in every interval
+        present = []
+        column = 0
+        for _, _, _, checked, aggregations in METRICS:
+            checked_column = column + [aggregation for aggregation, _ in aggregations].index(checked) if checked else None
+            present.append(np.ones(self.num_res, dtype=bool) if checked_column is None else
+                           ~np.isnan(self.base[:, checked_column]))
+            column += len(aggregations)
+        self._present_metrics = np.stack(present, axis=1)
+
+        kinds = [kind for _, _, kind, _, aggregations in METRICS for _ in aggregations]
+        self._config_columns = np.array([kind == CONFIG for kind in kinds])
+        self._cpu_columns = np.array([kind == CPU for kind in kinds])
+        self._memory_columns = np.array([kind == MEMORY for kind in kinds])
+
+    def idle(self, exps, intervals):
+        """
+        Returns whether the experiments are idle in the intervals, an idle episode starting at t
+        covers the intervals [t, t + idle_length)
+        """
+        exps, intervals = np.broadcast_arrays(exps, intervals)
+        idle = np.zeros(exps.shape, dtype=bool)
+        for offset in range(self.idle_length):
+            starts = intervals - offset
+            idle |= (starts >= 0) & (hash_uniform(self.seed, IDLE_STREAM, exps, np.maximum(starts, 0)).reshape(
+                exps.shape) < self.idle_probability)
+        return idle
+
+    def _factors(self, exps, intervals):
+        # (len, columns) multipliers of the base values, exps or intervals being a single index
+        shape = np.broadcast(exps, intervals).shape
+        scale = np.broadcast_to(self.scale[exps], shape)
+        day_angle = 2 * math.pi * np.asarray(intervals) / INTERVALS_PER_DAY + self.phase[exps]
+        cpu_noise = _hash_lognormal(self.seed, CPU_NOISE_STREAMS, exps, intervals, self.noise).reshape(shape)
+        memory_noise = _hash_lognormal(self.seed, MEMORY_NOISE_STREAMS, exps, intervals, self.noise / 2).reshape(shape)
+
+        factors = np.empty(shape + (len(self._cpu_columns),))
+        factors[..., self._config_columns] = scale[..., np.newaxis]
+        factors[..., self._cpu_columns] = (scale * (1 + self.diurnal_amplitude * np.sin(day_angle)) * cpu_noise *
+                                           ~self.idle(exps, intervals))[..., np.newaxis]
+        factors[..., self._memory_columns] = (scale * (1 + self.diurnal_amplitude / 2 * np.sin(day_angle)) *
+                                              memory_noise)[..., np.newaxis]
+        return factors
+
+    def _layout(self, res_num):
+        # (name, format, aggregations, first column, last column) of the metrics present in the interval
+        layout = []
+        column = 0
+        for (name, metric_format, _, _, aggregations), present in zip(METRICS, self._present_metrics[res_num]):
+            if present:
+                layout.append((name, metric_format, [aggregation for aggregation, _ in aggregations], column,
+                               column + len(aggregations)))
+            column += len(aggregations)
+        return layout
+
+    @staticmethod
+    def _container_metrics(values, layout):
+        # values: list of the column values of an experiment interval
+        return [{"name": name, "results": {"aggregation_info": dict(zip(aggregations, values[first:last]),
+                                                                    format=metric_format)}}
+                for name, metric_format, aggregations, first, last in layout]
+
+    def interval_metrics(self, res_num):
+        """
+        Returns the container metrics of every experiment for the interval res_num
+        """
+        exps = np.arange(self.total_exps)
+        values = np.nan_to_num(self.base[res_num] * self._factors(exps, res_num)).tolist()
+        layout = self._layout(res_num)
+        return [self._container_metrics(exp_values, layout) for exp_values in values]
+
+    def experiment_metrics(self, exp_num):
+        """
+        Returns the container metrics of every interval of the experiment exp_num
+        """
+        intervals = np.arange(self.num_res)
+        values = np.nan_to_num(self.base * self._factors(exp_num, intervals)).tolist()
+        return [self._container_metrics(res_values, self._layout(res_num))
+                for res_num, res_values in enumerate(values)]
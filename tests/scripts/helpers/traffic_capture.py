@@ -0,0 +1,174 @@
+"""
+Copyright (c) 2024, 2024 Red Hat, IBM Corporation and others.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import atexit
+import os
+import re
+import struct
+import threading
+import zlib
+from urllib.parse import parse_qs, urlencode
+
+# Environment variable with the capture file the Kruize clients append their requests to
+TRAFFIC_CAPTURE_ENV = "KRUIZE_TRAFFIC_CAPTURE"
+CAPTURE_MAGIC = b"KRUIZECAP1\n"
+# Record header: send time, response status (-1 on connection errors), flags, then the lengths of the method, path,
+# content type, query and body that follow it
+RECORD_HEADER = struct.Struct("<dhBBHHII")
+# The body was compressed with zlib by the capture
+ZLIB_BODY_FLAG = 1
+# The body was sent gzip compressed (Content-Encoding: gzip) and is stored as sent
+GZIP_BODY_FLAG = 2
+ERROR_STATUS = -1
+# zlib level of the stored bodies, bulk results compress well at low levels
+CAPTURE_COMPRESS_LEVEL = 1
+EXPERIMENT_NAME_PATTERN = re.compile(rb'"experiment_name"\s*:\s*"((?:[^"\\]|\\.)*)"')
+
+
+class CapturedRequest:
+    """
+    A request read from a capture file, the body is decompressed when it is read
+    """
+
+    def __init__(self, time, status_code, flags, method, path, content_type, query, stored_body):
+        self.time = time
+        self.status_code = status_code
+        self.flags = flags
+        self.method = method
+        self.path = path
+        self.content_type = content_type
+        self.query = query
+        self.stored_body = stored_body
+
+    @property
+    def content_encoding(self):
+        return "gzip" if self.flags & GZIP_BODY_FLAG else None
+
+    def body(self):
+        """
+        Returns the body as it was sent, gzip compressed when content_encoding is gzip
+        """
+        if self.flags & ZLIB_BODY_FLAG:
+            return zlib.decompress(self.stored_body)
+        return self.stored_body
+
+    def experiment_name(self):
+        """
+        Returns the experiment the request is about, from the experiment_name query parameter or
+        the first experiment_name of the json body, or None
+        """
+        names = parse_qs(self.query).get("experiment_name")
+        if names:
+            return names[0]
+        body = self.body()
+        if self.flags & GZIP_BODY_FLAG:
+            body = zlib.decompress(body, 16 + zlib.MAX_WBITS)
+        match = EXPERIMENT_NAME_PATTERN.search(body)
+        return match.group(1).decode('utf-8') if match else None
+
+
+class TrafficCapture:
+    """
+    Append-only capture of the requests sent by the Kruize clients. Every record is written with a
+    single write on a file opened in append mode, so the threads and forked processes of a driver
+    can share a capture without interleaving their records.
+    """
+
+    def __init__(self, filename, compress_level=CAPTURE_COMPRESS_LEVEL):
+        self.filename = filename
+        self.compress_level = compress_level
+        self._fd = os.open(filename, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._lock = threading.Lock()
+        if os.fstat(self._fd).st_size == 0:
+            os.write(self._fd, CAPTURE_MAGIC)
+
+    def record(self, send_time, method, path, kwargs, status_code):
+        """
+        Appends a request sent with the requests / aiohttp keyword arguments kwargs (params, data
+        and headers are captured), status_code is None if no response was received
+        """
+        path, _, query = path.partition("?")
+        params = kwargs.get("params")
+        if params:
+            query = "&".join(part for part in [query, urlencode(params)] if part)
+        body = kwargs.get("data") or b""
+        if isinstance(body, dict):
+            body = urlencode(body)
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        headers = {key.lower(): value for key, value in (kwargs.get("headers") or {}).items()}
+        content_type = headers.get("content-type", "")
+        if headers.get("content-encoding") == "gzip":
+            flags = GZIP_BODY_FLAG
+        elif body:
+            flags = ZLIB_BODY_FLAG
+            body = zlib.compress(body, self.compress_level)
+        else:
+            flags = 0
+        fields = [method.encode('utf-8'), path.encode('utf-8'), content_type.encode('utf-8'), query.encode('utf-8')]
+        header = RECORD_HEADER.pack(send_time, ERROR_STATUS if status_code is None else status_code, flags,
+                                    *[len(field) for field in fields], len(body))
+        with self._lock:
+            if self._fd is not None:
+                os.write(self._fd, b"".join([header] + fields + [body]))
+
+    def close(self):
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+
+_env_capture = None
+_env_capture_lock = threading.Lock()
+
+
+# Description: This function returns the capture of the file named by KRUIZE_TRAFFIC_CAPTURE, shared by all the
+# clients of the process and closed at exit, or None when the variable is not set
+def get_env_capture():
+    global _env_capture
+    filename = os.environ.get(TRAFFIC_CAPTURE_ENV)
+    if not filename:
+        return None
+    with _env_capture_lock:
+        if _env_capture is None or _env_capture.filename != filename:
+            _env_capture = TrafficCapture(filename)
+            atexit.register(_env_capture.close)
+        return _env_capture
+
+
+# Description: This function yields the requests of a capture file in the order they were written. A record
+# truncated by a crash of the capturing process ends the capture
+# Input Parameters: capture file
+def read_capture(filename):
+    with open(filename, "rb") as f:
+        if f.read(len(CAPTURE_MAGIC)) != CAPTURE_MAGIC:
+            raise ValueError("%s is not a Kruize traffic capture" % filename)
+        while True:
+            header = f.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                return
+            send_time, status_code, flags, *lengths = RECORD_HEADER.unpack(header)
+            data = f.read(sum(lengths))
+            if len(data) < sum(lengths):
+                return
+            fields = []
+            position = 0
+            for length in lengths:
+                fields.append(data[position:position + length])
+                position += length
+            method, path, content_type, query = [field.decode('utf-8') for field in fields[:4]]
+            yield CapturedRequest(send_time, status_code, flags, method, path, content_type, query, fields[4])
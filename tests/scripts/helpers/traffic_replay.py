@@ -0,0 +1,103 @@
+"""
+Copyright (c) 2024, 2024 Red Hat, IBM Corporation and others.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import asyncio
+
+import aiohttp
+
+from helpers.kruize import _api_name
+
+
+class TrafficReplayer:
+    """
+    Reissues captured requests with an AsyncKruizeClient, speed times faster than they were
+    captured (1 replays in real time, None as fast as possible). The requests of an experiment
+    are sent one after the other in capture order. Writes without an experiment, such as
+    createPerformanceProfile, are barriers: they wait for the requests before them and the
+    requests after them wait for them.
+    """
+
+    def __init__(self, client, captured_requests, speed=1.0):
+        self.client = client
+        self.requests = sorted(captured_requests, key=lambda request: request.time)
+        self.speed = speed
+        self.sent_count = 0
+        self.error_count = 0
+        # Count of the replayed requests whose status differs from the captured one, per API
+        self.status_mismatches = {}
+        self.max_schedule_lag = 0.0
+        self.elapsed_time = 0.0
+
+    async def run(self):
+        if not self.requests:
+            return
+        loop = asyncio.get_running_loop()
+        start_time = loop.time()
+        capture_start_time = self.requests[0].time
+        previous = {}
+        barrier = None
+        tasks = set()
+        for request in self.requests:
+            if self.speed:
+                delay = start_time + (request.time - capture_start_time) / self.speed - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                else:
+                    self.max_schedule_lag = max(self.max_schedule_lag, -delay)
+
+            experiment_name = request.experiment_name()
+            if experiment_name is None and request.method != "GET":
+                waits = list(tasks)
+            else:
+                waits = [task for task in [previous.get(experiment_name), barrier] if task is not None]
+            task = asyncio.ensure_future(self._send(request, waits))
+            if experiment_name is not None:
+                previous[experiment_name] = task
+            elif request.method != "GET":
+                barrier = task
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        await asyncio.gather(*tasks)
+        self.elapsed_time = loop.time() - start_time
+
+    async def _send(self, request, waits):
+        for task in waits:
+            await task
+        headers = {}
+        if request.content_type:
+            headers['Content-Type'] = request.content_type
+        if request.content_encoding:
+            headers['Content-Encoding'] = request.content_encoding
+        path = request.path + ("?" + request.query if request.query else "")
+        self.sent_count += 1
+        try:
+            response = await self.client.request(request.method, path, data=request.body(), headers=headers)
+            status_code = response.status_code
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print("%s %s: an error occurred while connecting to %s" % (request.method, path, e))
+            self.error_count += 1
+            status_code = -1
+        if status_code != request.status_code:
+            api = _api_name(request.path)
+            self.status_mismatches[api] = self.status_mismatches.get(api, 0) + 1
+
+    def print_summary(self):
+        print("Replayed requests : %s  errors : %s  speed : %s  max schedule lag : %.3fs  elapsed time : %.2fs" % (
+            self.sent_count, self.error_count, "%sx" % self.speed if self.speed else "max", self.max_schedule_lag,
+            self.elapsed_time))
+        for api, count in sorted(self.status_mismatches.items()):
+            print("%s: %s responses with another status than captured" % (api, count))
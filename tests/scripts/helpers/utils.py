@@ -22,6 +22,8 @@ import time
 import math
 from datetime import datetime, timedelta
 from kubernetes import client, config
+from helpers.csv_cache import load_csv_columns
+from helpers.json_template import JsonTemplate
 
 SUCCESS_STATUS_CODE = 201
 SUCCESS_200_STATUS_CODE = 200
@@ -283,8 +285,11 @@ def generate_test_data(csvfile, test_data, api_name):
 
 
 def get_num_lines_in_csv(csv_filename):
-    reader = csv.reader(open(csv_filename))
-    num_lines = len(list(reader))
+    """
+    Returns the number of csv records including the header, from the column cache of the csv
+    (helpers/csv_cache.py)
+    """
+    num_lines = load_csv_columns(csv_filename).num_rows + 1
     print(num_lines)
     return num_lines
 
@@ -325,24 +330,79 @@ def read_test_data_from_csv(csv_file):
     return test_data
 
 
-def update_metrics_json(find_arr, json_file, filename, i, update_metrics,update_timestamps=False ):
-    with open(json_file, 'r') as file:
-        data = file.read()
+# Timestamps of the json templates replaced by increment_timestamp(timestamp, i) when update_timestamps is set
+TEMPLATE_TIMESTAMPS = ["2022-01-23T18:25:43.511Z", "2022-01-23T18:40:43.570Z"]
 
-    for find in find_arr:
-        replace = find + "_" + str(i)
-        data = data.replace(find, replace)
+# Compiled json templates, by (file, size, modification time, finds, update_timestamps)
+_json_templates = {}
 
-    if update_timestamps == True:
-        find = "2022-01-23T18:25:43.511Z"
-        replace = increment_timestamp(find, i)
-        data = data.replace(find, replace)
 
-        find = "2022-01-23T18:40:43.570Z"
-        replace = increment_timestamp(find, i)
-        data = data.replace(find, replace)
+def _timestamp_replacement(timestamp):
+    # increment_timestamp(timestamp, i) with the timestamp parsed once
+    input_date = datetime.strptime(timestamp, "%Y-%m-%dT%H:%M:%S.%fZ")
+    return lambda i: (input_date + timedelta(minutes=50 * i + 3600)).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + 'Z'
+
 
-    data = json.loads(data)
+def _find_spans(text, find):
+    # (start, end) of every occurrence of find in text, overlapping ones included
+    spans = []
+    start = text.find(find)
+    while start != -1 and find:
+        spans.append((start, start + len(find)))
+        start = text.find(find, start + 1)
+    return spans
+
+
+# Description: This function checks if a later find could match the text of an earlier replacement, its _<i> suffix
+# (or incremented timestamp) included, in which case the replacements have to be made one after the other: the later
+# find holds an earlier find, a "_" or a digit, or it overlaps an occurrence of an earlier find in the text
+# Input Parameters: template text, finds in replace order
+def _replacements_cascade(text, finds):
+    for index, find in enumerate(finds):
+        if index == 0:
+            continue
+        earlier_finds = finds[:index]
+        if re.search(r"[_\d]", find) or any(earlier in find for earlier in earlier_finds):
+            return True
+        spans = _find_spans(text, find)
+        for earlier in earlier_finds:
+            for earlier_start, earlier_end in _find_spans(text, earlier):
+                if any(start < earlier_end and earlier_start < end for start, end in spans):
+                    return True
+    return False
+
+
+def get_json_template(find_arr, json_file, update_timestamps=False):
+    """
+    Returns the template of json_file compiled for generate_json(find_arr, json_file, ..., i,
+    update_timestamps): every find is suffixed with _<i>, then the TEMPLATE_TIMESTAMPS are
+    incremented by i steps. The file is read and compiled once per process
+    """
+    stat = os.stat(json_file)
+    key = (os.path.abspath(json_file), stat.st_size, stat.st_mtime_ns, tuple(find_arr), update_timestamps)
+    template = _json_templates.get(key)
+    if template is None:
+        with open(json_file, 'r') as file:
+            data = file.read()
+        replacements = [(find, lambda i, find=find: find + "_" + str(i)) for find in find_arr]
+        if update_timestamps == True:
+            replacements += [(timestamp, _timestamp_replacement(timestamp)) for timestamp in TEMPLATE_TIMESTAMPS]
+        # When a later find could match the text of an earlier replacement, the replacements are made one after the
+        # other on every render
+        template = None
+        if not _replacements_cascade(data, [find for find, _ in replacements]):
+            try:
+                template = JsonTemplate(data, replacements)
+            except ValueError:
+                pass
+        if template is None:
+            template = JsonTemplate(data, replacements, compiled=False)
+        _json_templates[key] = template
+    return template
+
+
+def update_metrics_json(find_arr, json_file, filename, i, update_metrics,update_timestamps=False ):
+    data = get_json_template(find_arr, json_file, update_timestamps).render_dict(i)
 
     if update_metrics != None:
         containers = data[0]['kubernetes_objects'][0]['containers']
@@ -360,21 +420,7 @@ def update_metrics_json(find_arr, json_file, filename, i, update_metrics,update_
 
 
 def generate_json(find_arr, json_file, filename, i, update_timestamps=False):
-    with open(json_file, 'r') as file:
-        data = file.read()
-
-    for find in find_arr:
-        replace = find + "_" + str(i)
-        data = data.replace(find, replace)
-
-    if update_timestamps == True:
-        find = "2022-01-23T18:25:43.511Z"
-        replace = increment_timestamp(find, i)
-        data = data.replace(find, replace)
-
-        find = "2022-01-23T18:40:43.570Z"
-        replace = increment_timestamp(find, i)
-        data = data.replace(find, replace)
+    data = get_json_template(find_arr, json_file, update_timestamps).render(i)
 
     with open(filename, 'w') as file:
         file.write(data)
@@ -0,0 +1,244 @@
+"""
+Copyright (c) 2024, 2024 Red Hat, IBM Corporation and others.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import copy
+import json
+import random
+import threading
+import time
+
+import requests
+
+from helpers.result_payload import DATE_FORMAT, ResultPayloadFactory
+
+UPDATE_RESULTS = "updateResults"
+UPDATE_RECOMMENDATIONS = "updateRecommendations"
+LIST_RECOMMENDATIONS = "listRecommendations"
+LIST_EXPERIMENTS = "listExperiments"
+SCENARIO_APIS = [UPDATE_RESULTS, UPDATE_RECOMMENDATIONS, LIST_RECOMMENDATIONS, LIST_EXPERIMENTS]
+
+# A scenario describes the experiment population, the time window the results move through and
+# the traffic sent for every experiment once it is created, either:
+#  - steps: the APIs called in order, repeated until all the intervals of the experiment are posted
+#  - mix: the weights of the APIs picked at random, until all the intervals are posted or the
+#    duration elapsed
+# Every step or mix entry can set bulk_size (updateResults) and latest (listRecommendations).
+BUILTIN_SCENARIOS = {
+    # quickTestScalability.py: every result posted alone, followed by its updateRecommendations
+    "quickTest": {
+        "experiments": {"count": 10, "name_prefix": "quicktest", "containers": 2},
+        "intervals": {"start_date": "2023-01-01T00:00:00.000Z", "minutes_jump": 15, "count": 96},
+        "users": 1,
+        "think_time": 0,
+        "steps": [{"api": UPDATE_RESULTS, "bulk_size": 1}, {"api": UPDATE_RECOMMENDATIONS}]
+    },
+    # rosSimulationScalabilityTest.py: a day of results in one bulk post, then one updateRecommendations
+    "rosSimulation": {
+        "experiments": {"count": 10, "name_prefix": "rossim", "containers": 2},
+        "intervals": {"start_date": "2023-01-01T00:00:00.000Z", "minutes_jump": 15, "count": 96},
+        "users": 1,
+        "think_time": 0,
+        "steps": [{"api": UPDATE_RESULTS, "bulk_size": 96}, {"api": UPDATE_RECOMMENDATIONS}]
+    },
+    # Production like ROS traffic: mostly result uploads, latest recommendation reads and a few listExperiments
+    "rosMixed": {
+        "experiments": {"count": 100, "name_prefix": "rosmixed", "containers": 2},
+        "intervals": {"start_date": "2023-01-01T00:00:00.000Z", "minutes_jump": 15, "count": 96},
+        "users": 10,
+        "think_time": 0.1,
+        "mix": {
+            UPDATE_RESULTS: {"weight": 60, "bulk_size": 4},
+            UPDATE_RECOMMENDATIONS: {"weight": 10},
+            LIST_RECOMMENDATIONS: {"weight": 25, "latest": True},
+            LIST_EXPERIMENTS: {"weight": 5}
+        }
+    }
+}
+
+
+# Description: This function loads a scenario, either a built-in one by name or a .json / .yaml / .yml file, and
+# validates it
+# Input Parameters: built-in scenario name or scenario file
+def load_scenario(scenario):
+    if scenario in BUILTIN_SCENARIOS:
+        data = copy.deepcopy(BUILTIN_SCENARIOS[scenario])
+    elif scenario.endswith((".yaml", ".yml")):
+        import yaml
+        with open(scenario, "r") as f:
+            data = yaml.safe_load(f)
+    else:
+        with open(scenario, "r") as f:
+            data = json.load(f)
+    data.setdefault("name", scenario)
+    validate_scenario(data)
+    return data
+
+
+def validate_scenario(scenario):
+    if ("steps" in scenario) == ("mix" in scenario):
+        raise ValueError("Scenario %s needs either steps or mix" % scenario.get("name"))
+    entries = scenario.get("steps") or [dict(entry, api=api) for api, entry in scenario["mix"].items()]
+    for entry in entries:
+        if entry["api"] not in SCENARIO_APIS:
+            raise ValueError("Unsupported api %s in scenario %s, supported: %s" % (entry["api"], scenario.get("name"),
+                                                                                    SCENARIO_APIS))
+    for field in ["experiments", "intervals"]:
+        if field not in scenario:
+            raise ValueError("Scenario %s has no %s" % (scenario.get("name"), field))
+    # The users stop once all the intervals are posted, without updateResults only a duration stops them
+    posts_results = any(entry["api"] == UPDATE_RESULTS and ("steps" in scenario or entry.get("weight", 1) > 0)
+                        for entry in entries)
+    if not posts_results and not scenario.get("duration"):
+        raise ValueError("Scenario %s never calls %s, it needs a duration" % (scenario.get("name"), UPDATE_RESULTS))
+
+
+# Description: This function returns a copy of a createExperiment or results json with the given number of
+# containers, cycling through the containers of the template and numbering their names
+# Input Parameters: createExperiment or results json, container count
+def with_containers(input_json, container_count):
+    input_json = copy.deepcopy(input_json)
+    for kubernetes_object in input_json["kubernetes_objects"]:
+        templates = kubernetes_object["containers"]
+        containers = []
+        for i in range(container_count):
+            container = copy.deepcopy(templates[i % len(templates)])
+            container["container_name"] = "tfb-server-%s" % i
+            containers.append(container)
+        kubernetes_object["containers"] = containers
+    return input_json
+
+
+class ScenarioExperiment:
+    """
+    An experiment of the scenario, the number of its intervals posted so far and of the steps it ran
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.posted = 0
+        self.step = 0
+
+
+class ScenarioDriver:
+    """
+    Runs a scenario with a KruizeClient. The experiments are split between users threads, each
+    user creates its experiments then sends their traffic with think_time seconds between requests,
+    so the requests of an experiment are always sent in order.
+    """
+
+    def __init__(self, client, scenario, create_json, result_json, seed=None):
+        self.client = client
+        self.scenario = scenario
+        experiments = scenario["experiments"]
+        intervals = scenario["intervals"]
+        containers = experiments.get("containers")
+        self.create_json = with_containers(create_json, containers) if containers else create_json
+        self.result_payloads = ResultPayloadFactory(with_containers(result_json, containers) if containers
+                                                    else result_json, intervals["start_date"],
+                                                    intervals["minutes_jump"])
+        self.interval_count = intervals["count"]
+        self.users = scenario.get("users", 1)
+        self.think_time = scenario.get("think_time", 0)
+        self.duration = scenario.get("duration")
+        self.experiments = [ScenarioExperiment("%s_%s" % (experiments.get("name_prefix", scenario["name"]), i))
+                            for i in range(1, experiments["count"] + 1)]
+        self.seed = seed
+        self.sent_count = 0
+        self.error_count = 0
+        self.elapsed_time = 0.0
+        self._lock = threading.Lock()
+
+    def run(self):
+        start_time = time.time()
+        deadline = start_time + self.duration if self.duration else None
+        threads = [threading.Thread(target=self._run_user, args=(user, deadline)) for user in range(self.users)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.elapsed_time = time.time() - start_time
+
+    def _run_user(self, user, deadline):
+        rng = random.Random(None if self.seed is None else self.seed + user)
+        experiments = self.experiments[user::self.users]
+        for experiment in experiments:
+            self._send("createExperiment", lambda: self.client.create_experiment(
+                [dict(self.create_json, experiment_name=experiment.name)]))
+
+        active = [experiment for experiment in experiments if self._active(experiment)]
+        while active and (deadline is None or time.time() < deadline):
+            if "steps" in self.scenario:
+                experiment = active[0]
+                entry = self.scenario["steps"][experiment.step % len(self.scenario["steps"])]
+                experiment.step += 1
+            else:
+                experiment = rng.choice(active)
+                entry = self._pick(rng)
+            self._call(experiment, entry)
+            active = [experiment for experiment in active if self._active(experiment)]
+            if self.think_time:
+                time.sleep(self.think_time)
+
+    def _active(self, experiment):
+        # An experiment with steps finishes the round of steps in which its last interval was posted
+        if "steps" in self.scenario and experiment.step % len(self.scenario["steps"]):
+            return True
+        return experiment.posted < self.interval_count
+
+    def _pick(self, rng):
+        mix = self.scenario["mix"]
+        apis = list(mix)
+        api = rng.choices(apis, weights=[mix[api].get("weight", 1) for api in apis])[0]
+        return dict(mix[api], api=api)
+
+    def _call(self, experiment, entry):
+        api = entry["api"]
+        if api == UPDATE_RESULTS:
+            count = min(entry.get("bulk_size", 1), self.interval_count - experiment.posted)
+            body = self.result_payloads.bulk_body(experiment.name, experiment.posted, count)
+            experiment.posted += count
+            self._send(api, lambda: self.client.update_results(body))
+        elif api == UPDATE_RECOMMENDATIONS:
+            # Recommendations are generated up to the last posted interval
+            if experiment.posted:
+                end_time = self.result_payloads.interval_end_time(experiment.posted - 1).strftime(DATE_FORMAT)
+                self._send(api, lambda: self.client.update_recommendations(experiment.name, None,
+                                                                           end_time[:-4] + 'Z'))
+        elif api == LIST_RECOMMENDATIONS:
+            self._send(api, lambda: self.client.list_recommendations(experiment.name, entry.get("latest")))
+        elif api == LIST_EXPERIMENTS:
+            self._send(api, lambda: self.client.list_experiments(experiment_name=experiment.name))
+
+    def _send(self, api, call):
+        try:
+            response = call()
+            failed = response.status_code >= 400 and response.status_code != 409
+            if failed:
+                print("%s failed with status code %s: %s" % (api, response.status_code, response.text))
+        except requests.exceptions.RequestException as e:
+            failed = True
+            print("%s: an error occurred while connecting to %s" % (api, e))
+        with self._lock:
+            self.sent_count += 1
+            self.error_count += failed
+
+    def print_summary(self):
+        print("Scenario : %s  experiments : %s  users : %s  requests : %s  errors : %s  throughput : %.2f/s" % (
+            self.scenario["name"], len(self.experiments), self.users, self.sent_count, self.error_count,
+            self.sent_count / self.elapsed_time if self.elapsed_time else 0.0))
+        hours, rem = divmod(self.elapsed_time, 3600)
+        minutes, seconds = divmod(rem, 60)
+        print("Time elapsed: {:0>2}:{:0>2}:{:05.2f}".format(int(hours), int(minutes), seconds))
@@ -17,13 +17,67 @@
 import argparse
 import copy
 import datetime
+import heapq
 import json
 import multiprocessing
+import os
+import queue
 import time
-from multiprocessing import Manager
 
 import requests
 
+# A postResult worker sends its completed result dates to the recommendation process in batches, once this many
+# results are completed or RESULT_FLUSH_INTERVAL seconds have passed since its last batch
+RESULT_FLUSH_COUNT = 50
+RESULT_FLUSH_INTERVAL = 0.1
+# The recommendation process stops waiting for the results of an experiment once no batch arrived for this many seconds
+RESULT_WAIT_TIMEOUT = 300
+
+
+class ResultWatermark:
+    """
+    Tracks the contiguous prefix of an experiment's result dates that completed. Dates completed out
+    of order wait in a heap until every earlier date completed, so each one is handled in O(log n).
+    """
+
+    def __init__(self, resultDates):
+        self.resultDates = sorted(resultDates)
+        self.position = 0
+        self.completedHeap = []
+
+    def complete(self, resultDate):
+        """
+        Records a completed result date and returns the dates the watermark moved past, in order
+        """
+        heapq.heappush(self.completedHeap, resultDate)
+        passedDates = []
+        while self.completedHeap and not self.done():
+            if self.completedHeap[0] < self.resultDates[self.position]:
+                # Dates already passed or not expected
+                heapq.heappop(self.completedHeap)
+            elif self.completedHeap[0] == self.resultDates[self.position]:
+                passedDates.append(heapq.heappop(self.completedHeap))
+                self.position += 1
+            else:
+                break
+        return passedDates
+
+    def done(self):
+        return self.position == len(self.resultDates)
+
+
+# Description: This function returns the state set in __main__ that the pool and recommendation processes use. The
+# processes get it through initWorker, they do not inherit it under the spawn start method (macOS / Windows default)
+def workerState():
+    names = ['args', 'data', 'createdata', 'headers', 'timeout', 'updateExpURL', 'createProfileURL',
+             'updateRecommendationURL', 'profile_json_payload', 'expcount', 'totalResultsCount',
+             'completedExperimentCount', 'completedResultsCount', 'completedRecommendationCount', 'completedResultsQueue']
+    return {name: globals()[name] for name in names}
+
+
+def initWorker(state):
+    globals().update(state)
+
 
 def postResultsInBulk(expName, bulkData):
     json_payload = json.dumps(bulkData)
@@ -34,8 +88,8 @@ def postResultsInBulk(expName, bulkData):
         if response.status_code == 201:
             print(
                 f"progress {expName} :  ExperimentCount : %s/%s   Results Count : %s/%s  Recommendation count : %s" % (
-                    completedExperimentCount.value, expcount, len(totalResultDates), len(totalResultDates),
-                    len(completedRecommendation)), end="\r")
+                    completedExperimentCount.value, expcount, totalResultsCount, totalResultsCount,
+                    completedRecommendationCount.value), end="\r")
             pass
         else:
             print(f'Request failed with status code {response.status_code}: {response.text}')
@@ -61,8 +115,8 @@ def postResult(expName, startDate, endDate):
         if response.status_code == 201:
             print(
                 f"progress {expName} :  ExperimentCount : %s/%s   Results Count : %s/%s  Recommendation count : %s" % (
-                    completedExperimentCount.value, expcount, len(completedResultDatesList), len(totalResultDates),
-                    len(completedRecommendation)), end="\r")
+                    completedExperimentCount.value, expcount, completedResultsCount.value, totalResultsCount,
+                    completedRecommendationCount.value), end="\r")
             pass
         else:
             print(f'Request failed with status code {response.status_code}: {response.text}')
@@ -71,8 +125,41 @@ def postResult(expName, startDate, endDate):
         print('Timeout occurred while connecting to')
     except requests.exceptions.RequestException as e:
         print('An error occurred while connecting to', e)
-    finally:
-        completedResultDatesList.append(datetime.datetime.strptime(endDate, '%Y-%m-%dT%H:%M:%S.%fZ'))
+
+
+def postResultBatch(timeDeltaBatch):
+    # Completed dates are accumulated locally and merged in batches, instead of one IPC round-trip per result
+    completedDates = []
+    lastFlushTime = time.time()
+    for expName, startDate, endDate in timeDeltaBatch:
+        postResult(expName, startDate, endDate)
+        completedDates.append((endDate, time.time()))
+        if len(completedDates) >= RESULT_FLUSH_COUNT or time.time() - lastFlushTime >= RESULT_FLUSH_INTERVAL:
+            flushCompletedResults(completedDates)
+            completedDates = []
+            lastFlushTime = time.time()
+    flushCompletedResults(completedDates)
+
+
+def flushCompletedResults(completedDates):
+    if not completedDates:
+        return
+    with completedResultsCount.get_lock():
+        completedResultsCount.value += len(completedDates)
+    if completedResultsQueue is not None:
+        completedResultsQueue.put(completedDates)
+
+
+def postResultsInParallel(timeDeltaList, num_processes):
+    # Every worker gets every num_processes-th interval, so the results complete roughly in date order
+    num_processes = num_processes or os.cpu_count()
+    batches = [timeDeltaList[i::num_processes] for i in range(num_processes)]
+    # The pool is terminated if a worker fails, instead of leaving its processes behind
+    with multiprocessing.Pool(processes=num_processes, initializer=initWorker, initargs=(workerState(),)) as pool:
+        pool.map(postResultBatch, batches, chunksize=1)
+        # Close the pool and wait for the processes to finish
+        pool.close()
+        pool.join()
 
 
 def updateRecommendation(experiment_name, endDate):
@@ -86,8 +173,8 @@ def updateRecommendation(experiment_name, endDate):
         if response.status_code == 201:
             print(
                 f"progress {experiment_name} :  ExperimentCount : %s/%s   Results Count : %s/%s  Recommendation count : %s" % (
-                    completedExperimentCount.value, expcount, len(completedResultDatesList), len(totalResultDates),
-                    len(completedRecommendation)), end="\r")
+                    completedExperimentCount.value, expcount, completedResultsCount.value, totalResultsCount,
+                    completedRecommendationCount.value), end="\r")
         else:
             if args.debug: print(
                 f'{payloadRecommendationURL} Request failed with status code {response.status_code}: {response.text}')
@@ -97,43 +184,47 @@ def updateRecommendation(experiment_name, endDate):
     except requests.exceptions.RequestException as e:
         print('updateRecommendation Timeout occurred while connecting to', e)
     finally:
-        completedRecommendation.append(endDate)
+        with completedRecommendationCount.get_lock():
+            completedRecommendationCount.value += 1
 
 
-def updateRecommendationInBulk():
-    pendingRecommendation = list(set(totalResultDates).difference(completedRecommendation))
-    recommendationDataList = []
-    for i_end_date in pendingRecommendation:
-        recommendationDataList.append((createdata['experiment_name'], i_end_date))
-    updateRecommendation(recommendationDataList)
+def validateRecommendation(state, experiment_name, resultDates):
+    initWorker(state)
+    # Waits for the dates completed by the postResult workers and generates the recommendation of a date as soon as
+    # the results of all the dates up to it completed. A None batch marks the end of the posting of the experiment
+    watermark = ResultWatermark(resultDates)
+    completedTimes = {}
+    timesToRecommendation = []
+    while not watermark.done():
+        try:
+            completedDates = completedResultsQueue.get(timeout=RESULT_WAIT_TIMEOUT)
+        except queue.Empty:
+            print("No results completed for %s in %s seconds, stop waiting" % (experiment_name, RESULT_WAIT_TIMEOUT))
+            break
+        if completedDates is None:
+            print("Results of %s finished before the recommendation of %s dates" % (
+                experiment_name, len(watermark.resultDates) - watermark.position))
+            break
+        for endDate, completedTime in completedDates:
+            completedDate = datetime.datetime.strptime(endDate, '%Y-%m-%dT%H:%M:%S.%fZ')
+            completedTimes[completedDate] = completedTime
+            for recommendationDate in watermark.complete(completedDate):
+                if args.debug: print("You can generate recommendation for completedDate %s" % (recommendationDate))
+                updateRecommendation(experiment_name, recommendationDate)
+                timesToRecommendation.append(time.time() - completedTimes.pop(recommendationDate))
+    printTimeToRecommendation(experiment_name, timesToRecommendation)
 
 
-def validateRecommendation():
-    totalResultDates.sort()
-    completedResultDatesList.sort()
-    while len(completedRecommendation) < len(totalResultDates):
-        if (len(totalResultDates) == len(completedResultDatesList)):
-            updateRecommendationInBulk()
-            break
-        else:
-            for completedDate in completedResultDatesList:
-                if completedDate not in completedRecommendation:
-                    subTotalResulutDates = totalResultDates[:totalResultDates.index(completedDate)]
-                    if (all(x in completedResultDatesList for x in subTotalResulutDates)):
-                        if args.debug: print(
-                            "You can generate recommendation for completedDate %s \n due to subTotalResulutDates %s  \n are subset of completedResultSet %s" % (
-                                completedDate, subTotalResulutDates, completedResultDatesList))
-                        updateRecommendation(createdata['experiment_name'], completedDate)
-                        if (len(totalResultDates) == len(completedResultDatesList)):
-                            updateRecommendationInBulk()
-                            break
-                    else:
-                        if args.debug: print(
-                            "You CANNOT generate recommendation for completedDate %s \n due to subTotalResulutDates %s  \n are not subset of completedResultSet %s" % (
-                                completedDate, subTotalResulutDates, completedResultDatesList))
-                        pass
-                    if args.debug: print('*************************')
-            time.sleep(1)
+# Description: This function prints the time from the completion of a result to its recommendation, which includes
+# the wait for the results of the earlier dates
+def printTimeToRecommendation(experiment_name, timesToRecommendation):
+    if not timesToRecommendation:
+        return
+    timesToRecommendation.sort()
+    count = len(timesToRecommendation)
+    print("\n%s time to recommendation :  avg : %.3fs  p50 : %.3fs  p99 : %.3fs  max : %.3fs" % (
+        experiment_name, sum(timesToRecommendation) / count, timesToRecommendation[(count - 1) // 2],
+        timesToRecommendation[min(count - 1, int(count * 0.99))], timesToRecommendation[-1]))
 
 
 def loadData():
@@ -147,7 +238,8 @@ def recommendationPool(totalResultDates, num_processes):
     recommendationDataList = []
     for i_end_date in totalResultDates:
         recommendationDataList.append((createdata['experiment_name'], i_end_date))
-    recommenderPool = multiprocessing.Pool(processes=num_processes)
+    num_processes = num_processes or os.cpu_count()
+    recommenderPool = multiprocessing.Pool(processes=num_processes, initializer=initWorker, initargs=(workerState(),))
     # Start the parallel execution
     recommenderPool.starmap(updateRecommendation, recommendationDataList)
     # Close the pool and wait for the processes to finish
@@ -225,14 +317,14 @@ if __name__ == "__main__":
     else:
         print(f'Request failed with status code {response.status_code}: {response.text}')
 
-    # Create a shared list using multiprocessing.Manager()
-    manager = Manager()
-    completedResultDatesList = manager.list()
-    totalResultDates = manager.list()
-    completedResultDatesList = manager.list()
-    completedRecommendation = manager.list()
-    completedExperimentCount = manager.Value(int, 0)
-    completedResultsCount = manager.Value(int, 0)
+    # Progress counters live in shared memory, the worker processes update them without a manager process
+    totalResultsCount = 0
+    completedExperimentCount = multiprocessing.Value('i', 0)
+    completedResultsCount = multiprocessing.Value('i', 0)
+    completedRecommendationCount = multiprocessing.Value('i', 0)
+    # Batches of completed result dates sent by the postResult workers to the recommendation process, a new queue is
+    # created for every experiment so a failed experiment cannot leave its dates to the next one
+    completedResultsQueue = None
 
     start_time = time.time()
     for i in range(1, expcount + 1):
@@ -249,6 +341,7 @@ if __name__ == "__main__":
                 print('Create experiment_name %s Request successful!' % (experiment_name))
                 completedExperimentCount.value = completedExperimentCount.value + 1
                 timeDeltaList = []
+                experimentResultDates = []
                 bulkdata = []
                 for j in range(rescount):
                     interval_start_time = datetime.datetime.strptime(data['interval_end_time'], '%Y-%m-%dT%H:%M:%S.%fZ')
@@ -258,7 +351,8 @@ if __name__ == "__main__":
                     data['interval_end_time'] = interval_end_time.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
                     timeDeltaList.append((experiment_name, interval_start_time.strftime('%Y-%m-%dT%H:%M:%S.%fZ'),
                                           interval_end_time.strftime('%Y-%m-%dT%H:%M:%S.%fZ')))
-                    totalResultDates.append(interval_end_time)
+                    totalResultsCount += 1
+                    experimentResultDates.append(interval_end_time)
 
                     data['experiment_name'] = experiment_name
                     data['interval_start_time'] = interval_start_time.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
@@ -270,32 +364,29 @@ if __name__ == "__main__":
                 if args.postresults and args.generaterecommendation:
                     if args.bulk:
                         postResultsInBulk(experiment_name, bulkdata)
-                        completedResultDatesList = totalResultDates
-                        recommendationDataList = []
-                        for i_end_date in totalResultDates:
+                        completedResultsCount.value += len(bulkdata)
+                        for i_end_date in experimentResultDates:
                             updateRecommendation(experiment_name, i_end_date, )
                     else:
                         # Create a pool of processes
-                        recommendationProcess = multiprocessing.Process(target=validateRecommendation)
+                        completedResultsQueue = multiprocessing.Queue()
+                        recommendationProcess = multiprocessing.Process(target=validateRecommendation,
+                                                                        args=(workerState(), experiment_name,
+                                                                              experimentResultDates))
                         recommendationProcess.start()
-                        num_processes = args.parallelresultcount
-                        # Start the parallel execution
-                        pool = multiprocessing.Pool(processes=num_processes)
-                        pool.starmap(postResult, timeDeltaList)
-                        recommendationProcess.join()
-                        # Close the pool and wait for the processes to finish
-                        pool.close()
-                        pool.join()
+                        try:
+                            postResultsInParallel(timeDeltaList, args.parallelresultcount)
+                        except BaseException:
+                            recommendationProcess.terminate()
+                            raise
+                        finally:
+                            completedResultsQueue.put(None)
+                            recommendationProcess.join()
+                            completedResultsQueue = None
                 elif args.postresults:
-                    num_processes = args.parallelresultcount
-                    pool = multiprocessing.Pool(processes=num_processes)
-                    # Start the parallel execution
-                    pool.starmap(postResult, timeDeltaList)
-                    # Close the pool and wait for the processes to finish
-                    pool.close()
-                    pool.join()
+                    postResultsInParallel(timeDeltaList, args.parallelresultcount)
                 elif args.generaterecommendation:
-                    recommendationPool(totalResultDates, args.parallelresultcount)
+                    recommendationPool(experimentResultDates, args.parallelresultcount)
                     # recommendationDataList = []
                     # for i_end_date in totalResultDates:
                     #     recommendationDataList.append((createdata['experiment_name'], i_end_date))
@@ -319,8 +410,8 @@ if __name__ == "__main__":
 
     print(
         'Request successful!  completed  :  ExperimentCount : %s/%s   Results Count : %s/%s  Recommendation count : %s' % (
-            completedExperimentCount.value, expcount, len(completedResultDatesList), len(totalResultDates),
-            len(completedRecommendation)))
+            completedExperimentCount.value, expcount, completedResultsCount.value, totalResultsCount,
+            completedRecommendationCount.value))
     elapsed_time = time.time() - start_time
     hours, rem = divmod(elapsed_time, 3600)
     minutes, seconds = divmod(rem, 60)
@@ -18,10 +18,27 @@ import sys, getopt
 import json
 import os
 import time
+
+import requests
 sys.path.append("../../")
 from helpers.kruize import *
+from helpers.bulk_results_writer import BulkResultsWriter
+from helpers.json_stream import write_json_array_to_file, compare_json_array_files
+from helpers.packed_json_store import PackedJsonReader, PackedJsonWriter
 from helpers.utils import *
 from helpers.generate_rm_jsons import *
+from helpers.synthetic_metrics import SyntheticMetricsEngine
+
+# Description: This function streams the elements returned by a list API into the given json file, the response
+# is never held in memory as a whole. Exits the test if the list API fails
+# Input Parameters: api name, iterator over the list response, json file name
+def save_list_response(api, elements, json_file):
+    try:
+        write_json_array_to_file(json_file, elements)
+    except (requests.exceptions.RequestException, ValueError) as e:
+        print(f"{api} failed! {e}")
+        sys.exit(1)
+
 
 def main(argv):
     cluster_type = "minikube"
@@ -29,15 +46,17 @@ def main(argv):
     iterations = 2
     num_exps = 1
     failed = 0
+    # Seed of the synthetic metrics, every experiment posts the same csv metrics if None
+    synthetic_seed = None
     try:
-        opts, args = getopt.getopt(argv,"h:c:a:u:r:d:")
+        opts, args = getopt.getopt(argv,"h:c:a:u:r:d:s:")
     except getopt.GetoptError:
-        print("kruize_pod_restart_test.py -c <cluster type> -a <openshift kruize route> -u <no. of experiments> -d <no. of iterations to test restart (default - 2> -r <results dir>")
+        print("kruize_pod_restart_test.py -c <cluster type> -a <openshift kruize route> -u <no. of experiments> -d <no. of iterations to test restart (default - 2> -r <results dir> -s <seed of per experiment synthetic metrics>")
         print("Note: -a option is required only on openshift when kruize service is exposed")
         sys.exit(2)
     for opt, arg in opts:
         if opt == '-h':
-            print("kruize_pod_restart_test.py -c <cluster type> -a <openshift kruize route> -u <no. of experiments> -d <no. of iterations to test restart(default - 2> -r <results dir>")
+            print("kruize_pod_restart_test.py -c <cluster type> -a <openshift kruize route> -u <no. of experiments> -d <no. of iterations to test restart(default - 2> -r <results dir> -s <seed of per experiment synthetic metrics>")
             sys.exit(0)
         elif opt == '-c':
             cluster_type = arg
@@ -49,6 +68,8 @@ def main(argv):
             results_dir = arg
         elif opt == '-d':
             iterations = int(arg)
+        elif opt == '-s':
+            synthetic_seed = int(arg)
         
 
     print(f"Cluster type = {cluster_type}")
@@ -76,6 +97,12 @@ def main(argv):
     # Post 100 results
     num_res = 100
 
+    # With a seed, every experiment gets its own variant of the csv metrics
+    engine = None
+    if synthetic_seed is not None:
+        print(f"Synthetic metrics seed = {synthetic_seed}")
+        engine = SyntheticMetricsEngine(csv_filename, num_exps, num_res, seed=synthetic_seed)
+
     for i in range(1, iterations+1):
         print("\n*************************")
         print(f"Iteration {i}...")
@@ -92,44 +119,57 @@ def main(argv):
 
         if i == 1:
             new_timestamp = None
-            create_update_results_jsons(csv_filename, split, split_count, result_json_dir, num_exps, num_res, new_timestamp)
+            create_packed_update_results(csv_filename, result_json_dir, num_exps, num_res, new_timestamp, engine)
             start_ts = get_datetime()
         else:
             # Increment the time by 1505 mins for the next set of data timestamps
             new_timestamp = increment_timestamp_by_given_mins(start_ts, 1505)
             start_ts = new_timestamp
-            create_update_results_jsons(csv_filename, split, split_count, result_json_dir, num_exps, num_res, new_timestamp)
+            create_packed_update_results(csv_filename, result_json_dir, num_exps, num_res, new_timestamp, engine)
 
+        # The recommendations are packed in a store, read them with PackedJsonReader(reco_json_dir).get(res_num, exp_num)
         reco_json_dir = results_dir + "/reco_jsons" + "_iter" + str(i)
-        os.mkdir(reco_json_dir)
-        for res_num in range(num_res):
-            for exp_num in range(num_exps):
-                # create the experiment and post it
-                create_exp_json_file = exp_json_dir + "/create_exp_" + str(exp_num) + ".json"
-                create_experiment(create_exp_json_file)
-                
-                # Obtain the experiment name
-                json_data = json.load(open(create_exp_json_file))
-
-                experiment_name = json_data[0]['experiment_name']
-                print(f"experiment_name = {experiment_name}")
+        reco_store = PackedJsonWriter(reco_json_dir, num_res, num_exps)
 
-                json_file = result_json_dir + "/result_" + str(exp_num) + "_" + str(res_num) + ".json"
+        # create the experiments and post them
+        experiment_names = []
+        for exp_num in range(num_exps):
+            create_exp_json_file = exp_json_dir + "/create_exp_" + str(exp_num) + ".json"
+            create_experiment(create_exp_json_file)
 
-                update_results(json_file)
+            # Obtain the experiment name
+            json_data = json.load(open(create_exp_json_file))
+            experiment_names.append(json_data[0]['experiment_name'])
+
+        writer = BulkResultsWriter(get_default_client())
+        result_store = PackedJsonReader(result_json_dir)
+        for res_num in range(num_res):
+            # Post the results of all the experiments for this interval in bulk
+            interval_end_times = []
+            failed_results = []
+            for exp_num in range(num_exps):
+                update_results = result_store.get(exp_num, res_num)
+                failed_results.extend(writer.add(update_results))
 
                 # Obtain the monitoring end time
-                json_data = json.load(open(json_file))
-                interval_end_time = json_data[0]['interval_end_time']
+                interval_end_times.append(update_results['interval_end_time'])
+
+            failed_results.extend(writer.flush())
+            for failed_result in failed_results:
+                print(f"updateResults failed for {failed_result['experiment_name']} - {failed_result['interval_end_time']}: {failed_result['errors']}")
 
-                # sleep for a while before fetching recommendations for the experiments
-                #time.sleep(1)
+            for exp_num in range(num_exps):
+                experiment_name = experiment_names[exp_num]
+                print(f"experiment_name = {experiment_name}")
+                interval_end_time = interval_end_times[exp_num]
 
                 # Fetch the recommendations for all the experiments
                 latest = None
                 reco = update_recommendations(experiment_name, latest, interval_end_time)
-                filename = reco_json_dir + '/update_reco_' + str(res_num) + '_' +  str(exp_num) + '.json'
-                write_json_data_to_file(filename, reco.json())
+                reco_store.write(res_num, exp_num, reco.json())
+
+        result_store.close()
+        reco_store.close()
 
         # Fetch listExperiments
         list_exp_json_file_before = list_exp_json_dir + "/list_exp_json_before_" + str(i) + ".json"
@@ -138,28 +178,17 @@ def main(argv):
         recommendations = "true"
         latest = "false"
         experiment_name = None
-        response = list_experiments(results, recommendations, latest, experiment_name)
-        if response.status_code == SUCCESS_200_STATUS_CODE:
-           list_exp_json = response.json()
-        else:
-            print(f"listExperiments failed!")
-            failed = 1
-            sys.exit(1)
-
-        write_json_data_to_file(list_exp_json_file_before, list_exp_json)
+        client = get_default_client()
+        save_list_response("listExperiments", client.iter_experiments(results, recommendations, latest, experiment_name),
+                           list_exp_json_file_before)
 
         # Fetch the recommendations for all the experiments
         experiment_name = None
         latest = "false"
         interval_end_time = None
-        response = list_recommendations(experiment_name, latest, interval_end_time)
-        if response.status_code == SUCCESS_200_STATUS_CODE:
-            list_reco_json_file_before = list_reco_json_dir + '/list_reco_json_before_' + str(i) + '.json'
-            write_json_data_to_file(list_reco_json_file_before, response.json())
-        else:
-            print(f"listRecommendations for experiment name - ${experiment_name} failed!")
-            failed = 1
-            sys.exit(1)
+        list_reco_json_file_before = list_reco_json_dir + '/list_reco_json_before_' + str(i) + '.json'
+        save_list_response("listRecommendations", client.iter_recommendations(experiment_name, latest, interval_end_time),
+                           list_reco_json_file_before)
 
         # Delete the kruize pod
         delete_kruize_pod(namespace)
@@ -178,35 +207,26 @@ def main(argv):
 
         # Fetch listExperiments
         list_exp_json_file_after = list_exp_json_dir + "/list_exp_json_after_" + str(i) + ".json"
+        # assign params to be passed in listExp
         results = "true"
         recommendations = "true"
         latest = "false"
         experiment_name = None
-        response = list_experiments(results, recommendations, latest, experiment_name)
-        if response.status_code == SUCCESS_200_STATUS_CODE:
-            list_exp_json = response.json()
-        else:
-            print(f"listExperiments failed!")
-            failed = 1
-            sys.exit(1)
-
-        write_json_data_to_file(list_exp_json_file_after, list_exp_json)
+        client = get_default_client()
+        save_list_response("listExperiments", client.iter_experiments(results, recommendations, latest, experiment_name),
+                           list_exp_json_file_after)
 
         # Fetch the recommendations for all the experiments
+        experiment_name = None
         latest = "false"
         interval_end_time = None
-        response = list_recommendations(experiment_name, latest, interval_end_time)
-        if response.status_code == SUCCESS_200_STATUS_CODE:
-            list_reco_json_file_after = list_reco_json_dir + '/list_reco_json_after_' + str(i) + '.json'
-            write_json_data_to_file(list_reco_json_file_after, response.json())
-        else:
-            print(f"listRecommendations for experiment name - ${experiment_name} failed")
-            failed = 1
-            sys.exit(1)
+        list_reco_json_file_after = list_reco_json_dir + '/list_reco_json_after_' + str(i) + '.json'
+        save_list_response("listRecommendations", client.iter_recommendations(experiment_name, latest, interval_end_time),
+                           list_reco_json_file_after)
 
 
         # Compare the listExperiments before and after kruize pod restart
-        result = compare_json_files(list_exp_json_file_before, list_exp_json_file_after)
+        result = compare_json_array_files(list_exp_json_file_before, list_exp_json_file_after)
         if result == True:
             print("Passed! listExperiments before and after kruize pod restart are same!")
         else:
@@ -214,7 +234,7 @@ def main(argv):
             print("Failed! listExperiments before and after kruize pod restart are not same!")
 
         # Compare the listRecommendations before and after kruize pod restart
-        result = compare_json_files(list_reco_json_file_before, list_reco_json_file_after)
+        result = compare_json_array_files(list_reco_json_file_before, list_reco_json_file_after)
         if result == True:
             print("Passed! listRecommendations before and after kruize pod restart are same!")
         else:
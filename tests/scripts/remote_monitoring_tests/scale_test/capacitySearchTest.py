@@ -0,0 +1,76 @@
+"""
+Copyright (c) 2024, 2024 Red Hat, IBM Corporation and others.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+# Capacity search: steps the open-loop offered load up until an API breaks its latency or error rate SLO and reports
+# the maximum sustainable rate per API.
+#
+# python3 capacitySearchTest.py --ip <kruize ip> --port <kruize port> --count 1000 --startrate 10 --steprate 10 \
+#     --maxrate 500 --window 60 --slop99 2 --sloerrorrate 0.01 [--prometheusurl <url> --prometheustoken <token>]
+
+import argparse
+import asyncio
+import sys
+
+sys.path.append("../../")
+from helpers.capacity_search import CapacitySearch, KruizeResourceMonitor
+from helpers.kruize_async import AsyncKruizeClient
+from helpers.load_generator import ExperimentWorkload
+from openLoopLoadTest import add_load_arguments, kruize_url, loadData
+
+
+async def main(args):
+    data, createdata, profile_data = loadData()
+    workload = ExperimentWorkload(args.name, args.count, createdata, data, args.startdate, args.minutesjump,
+                                  args.bulksize, args.recommendationevery)
+    monitor = None
+    if args.prometheusurl:
+        limits = {"kruize_cpu_max": args.cpulimit, "kruize_memory": args.memorylimit}
+        monitor = KruizeResourceMonitor(args.prometheusurl, args.prometheustoken, limits)
+
+    async with AsyncKruizeClient(kruize_url(args.ip, args.port), max_in_flight=args.maxinflight) as client:
+        response = await client.create_performance_profile(profile_data)
+        print("createPerformanceProfile status code : %s" % (response.status_code))
+
+        search = CapacitySearch(client, workload, args.startrate, args.steprate, args.maxrate, args.window,
+                                args.slop99, args.sloerrorrate, min_windows=args.minwindows,
+                                max_windows=args.maxwindows, stability_tolerance=args.tolerance,
+                                arrival=args.arrival, seed=args.seed, resource_monitor=monitor)
+        await search.run()
+
+    search.print_report()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    add_load_arguments(parser)
+    parser.add_argument('--startrate', type=float, default=10, help='specify the offered rate of the first step')
+    parser.add_argument('--steprate', type=float, default=10, help='specify the offered rate increase per step')
+    parser.add_argument('--maxrate', type=float, default=1000, help='specify the highest offered rate to try')
+    parser.add_argument('--window', type=float, default=60, help='specify the duration in seconds of a step window')
+    parser.add_argument('--minwindows', type=int, default=2, help='specify the minimum number of windows per step')
+    parser.add_argument('--maxwindows', type=int, default=5, help='specify the maximum number of windows per step')
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help='specify the relative p99 change between two windows below which latency is stable')
+    parser.add_argument('--slop99', type=float, default=1.0, help='specify the p99 latency SLO in seconds')
+    parser.add_argument('--sloerrorrate', type=float, default=0.01, help='specify the error rate SLO, as a fraction')
+    parser.add_argument('--prometheusurl', type=str, default=None,
+                        help='specify the Prometheus query API url, e.g. http://<server>:9090/api/v1/query')
+    parser.add_argument('--prometheustoken', type=str, default=None, help='specify the Prometheus bearer token')
+    parser.add_argument('--cpulimit', type=float, default=None,
+                        help='specify the kruize CPU limit in cores, if not reported by kube-state-metrics')
+    parser.add_argument('--memorylimit', type=float, default=None,
+                        help='specify the kruize memory limit in bytes, if not reported by kube-state-metrics')
+    asyncio.run(main(parser.parse_args()))
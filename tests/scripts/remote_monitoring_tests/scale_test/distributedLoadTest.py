@@ -0,0 +1,118 @@
+"""
+Copyright (c) 2024, 2024 Red Hat, IBM Corporation and others.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+# Distributed load test: a coordinator splits the experiment range in shards and hands them out to workers, which can
+# run on several hosts, then merges their latency metrics.
+#
+# python3 distributedLoadTest.py coordinator --listen 0.0.0.0:9100 --ip <kruize ip> --port <kruize port> --name dist \
+#     --count 1,10000,96 --shardsize 100 [--localworkers 4]
+# python3 distributedLoadTest.py worker --coordinator <coordinator host>:9100
+#
+# --count comma separated first experiment, last experiment and number of results per experiment
+# --listen / --coordinator <host>:<port> or unix:<socket path>
+# --localworkers start that many worker processes on this host as well
+
+import argparse
+import multiprocessing
+import sys
+
+sys.path.append("../../")
+from helpers.distributed_load import LoadCoordinator, LoadWorker, split_shards
+from helpers.kruize import KruizeClient
+from openLoopLoadTest import kruize_url, loadData
+
+
+def runWorker(coordinatorAddress, kruizeURL):
+    LoadWorker(coordinatorAddress, kruize_url=kruizeURL).run()
+
+
+def coordinator(args):
+    data, createdata, profile_data = loadData()
+    expstart, expend, rescount = [int(value) for value in args.count.split(',')]
+    config = {
+        "kruize_url": kruize_url(args.ip, args.port),
+        "name": args.name,
+        "result_count": rescount,
+        "start_date": args.startdate,
+        "minutes_jump": args.minutesjump,
+        "max_attempts": args.maxattempts,
+        "compression": args.compression,
+        "create_json": createdata,
+        "result_json": data
+    }
+    with KruizeClient(config["kruize_url"]) as client:
+        response = client.create_performance_profile(profile_data)
+        print("createPerformanceProfile status code : %s" % (response.status_code))
+
+    loadCoordinator = LoadCoordinator(args.listen, config, split_shards(expstart, expend, args.shardsize))
+    loadCoordinator.start()
+    workers = [multiprocessing.Process(target=runWorker, args=(args.listen, None)) for _ in range(args.localworkers)]
+    for worker in workers:
+        worker.start()
+    loadCoordinator.wait(args.progressinterval)
+    for worker in workers:
+        worker.join()
+
+    loadCoordinator.print_summary()
+    if args.latencyfile:
+        loadCoordinator.metrics.write_csv(args.latencyfile + ".csv")
+        loadCoordinator.metrics.write_json(args.latencyfile + ".json")
+
+
+def worker(args):
+    runWorker(args.coordinator, kruize_url(args.ip, args.port) if args.ip else None)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest='mode', required=True)
+
+    coordinatorParser = subparsers.add_parser('coordinator', help='split the experiments and merge the results')
+    coordinatorParser.add_argument('--listen', type=str, required=True,
+                                   help='specify the address to listen on, <host>:<port> or unix:<socket path>')
+    coordinatorParser.add_argument('--ip', type=str, required=True, help='specify kruize ip')
+    coordinatorParser.add_argument('--port', type=int, default=0, help='specify kruize port')
+    coordinatorParser.add_argument('--name', type=str, default='dist', help='specify experiment name prefix')
+    coordinatorParser.add_argument('--count', type=str, required=True,
+                                   help='specify the first experiment, last experiment and number of results per experiment, separated by commas.')
+    coordinatorParser.add_argument('--shardsize', type=int, default=100,
+                                   help='specify the number of experiments handed out to a worker at a time')
+    coordinatorParser.add_argument('--startdate', type=str, default='2023-01-01T00:00:00.000Z',
+                                   help='Specify start date and time in  "%%Y-%%m-%%dT%%H:%%M:%%S.%%fZ" format.')
+    coordinatorParser.add_argument('--minutesjump', type=int, default=15,
+                                   help='specify the time difference between the start time and end time of the interval.')
+    coordinatorParser.add_argument('--maxattempts', type=int, default=5,
+                                   help='specify the maximum number of attempts for a request that times out or is rejected as overloaded.')
+    coordinatorParser.add_argument('--compression', type=str, choices=['gzip'], default=None,
+                                   help='specify the Content-Encoding used to compress the bulk updateResults payloads.')
+    coordinatorParser.add_argument('--localworkers', type=int, default=0,
+                                   help='specify the number of worker processes to start on this host')
+    coordinatorParser.add_argument('--progressinterval', type=float, default=10,
+                                   help='specify the seconds between progress lines')
+    coordinatorParser.add_argument('--latencyfile', type=str, default=None,
+                                   help='specify the file prefix to write the merged per API latency summary to, as <prefix>.csv and <prefix>.json.')
+    coordinatorParser.set_defaults(func=coordinator)
+
+    workerParser = subparsers.add_parser('worker', help='run the shards handed out by a coordinator')
+    workerParser.add_argument('--coordinator', type=str, required=True,
+                              help='specify the coordinator address, <host>:<port> or unix:<socket path>')
+    workerParser.add_argument('--ip', type=str, default=None,
+                              help='specify kruize ip, if it differs from the one given to the coordinator')
+    workerParser.add_argument('--port', type=int, default=0, help='specify kruize port')
+    workerParser.set_defaults(func=worker)
+
+    args = parser.parse_args()
+    args.func(args)
@@ -0,0 +1,99 @@
+"""
+Copyright (c) 2024, 2024 Red Hat, IBM Corporation and others.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+# Open-loop load test: requests are sent at a fixed rate, independent of Kruize response times.
+#
+# python3 openLoopLoadTest.py --ip <kruize ip> --port <kruize port> --name openloop --count 1000 --rate 50 --duration 300
+#
+# --count number of experiments, requests go round robin over them: createExperiment first, then updateResults
+# --rate requests per second, --arrival constant or poisson
+# --recommendationevery send updateRecommendations after every N updateResults of an experiment (0 disables)
+
+import argparse
+import asyncio
+import json
+import sys
+
+sys.path.append("../../")
+from helpers.api_metrics import ApiMetrics
+from helpers.kruize_async import AsyncKruizeClient, DEFAULT_MAX_IN_FLIGHT
+from helpers.load_generator import ARRIVAL_PROCESSES, CONSTANT_ARRIVAL, ExperimentWorkload, OpenLoopLoadGenerator
+
+
+def loadData():
+    with open("./json_files/create_exp.json", "r") as json_file:
+        createdata = json.load(json_file)
+    with open("./json_files/results.json", "r") as json_file:
+        data = json.load(json_file)
+    with open("./json_files/profile.json", "r") as json_file:
+        profile_data = json.load(json_file)
+    return data, createdata, profile_data
+
+
+def kruize_url(ip, port):
+    if port:
+        return 'http://%s:%s' % (ip, port)
+    return 'http://%s' % (ip)
+
+
+def add_load_arguments(parser):
+    parser.add_argument('--ip', type=str, required=True, help='specify kruize ip')
+    parser.add_argument('--port', type=int, default=0, help='specify kruize port')
+    parser.add_argument('--name', type=str, default='openloop', help='specify experiment name prefix')
+    parser.add_argument('--count', type=int, default=100, help='specify the number of experiments')
+    parser.add_argument('--arrival', type=str, choices=ARRIVAL_PROCESSES, default=CONSTANT_ARRIVAL,
+                        help='specify the arrival process of the requests')
+    parser.add_argument('--seed', type=int, default=None, help='specify the random seed of the poisson arrivals')
+    parser.add_argument('--startdate', type=str, default='2023-01-01T00:00:00.000Z',
+                        help='Specify start date and time in  "%%Y-%%m-%%dT%%H:%%M:%%S.%%fZ" format.')
+    parser.add_argument('--minutesjump', type=int, default=15,
+                        help='specify the time difference between the start time and end time of the interval.')
+    parser.add_argument('--bulksize', type=int, default=1, help='specify the number of results per updateResults')
+    parser.add_argument('--recommendationevery', type=int, default=0,
+                        help='specify the number of updateResults per experiment between updateRecommendations')
+    parser.add_argument('--maxinflight', type=int, default=DEFAULT_MAX_IN_FLIGHT,
+                        help='specify the maximum number of requests in flight')
+    parser.add_argument('--latencyfile', type=str, default=None,
+                        help='specify the file prefix to write the per API latency summary to, as <prefix>.csv and <prefix>.json.')
+
+
+async def main(args):
+    data, createdata, profile_data = loadData()
+    workload = ExperimentWorkload(args.name, args.count, createdata, data, args.startdate, args.minutesjump,
+                                  args.bulksize, args.recommendationevery)
+    serviceMetrics = ApiMetrics()
+    async with AsyncKruizeClient(kruize_url(args.ip, args.port), max_in_flight=args.maxinflight,
+                                 metrics=serviceMetrics) as client:
+        response = await client.create_performance_profile(profile_data)
+        print("createPerformanceProfile status code : %s" % (response.status_code))
+
+        generator = OpenLoopLoadGenerator(client, workload, args.rate, args.duration, args.arrival, args.seed)
+        await generator.run()
+
+    generator.print_summary()
+    print("Service time (from the send of the request):")
+    serviceMetrics.print_summary()
+    if args.latencyfile:
+        generator.corrected.write_csv(args.latencyfile + ".csv")
+        generator.corrected.write_json(args.latencyfile + ".json")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    add_load_arguments(parser)
+    parser.add_argument('--rate', type=float, required=True, help='specify the requests per second to send')
+    parser.add_argument('--duration', type=float, required=True, help='specify the test duration in seconds')
+    asyncio.run(main(parser.parse_args()))
@@ -18,6 +18,10 @@ import csv
 import os
 import argparse
 import re
+import sys
+
+sys.path.append("../../")
+from helpers.steady_state import DEFAULT_WINDOW, warmup_end
 
 def find_max_exec_time(exec_file):
     # Define the pattern to match
@@ -47,7 +51,7 @@ def find_max_exec_time(exec_file):
 
     print(f"Execution time - {max_time_str}")
 
-def compute_max_avg(csv_file, column_name):
+def compute_max_avg(csv_file, column_name, first_row=0, last_row=None):
     # Initialize max value to infinity
     max_value = float('-inf')
     total_sum = 0
@@ -55,7 +59,10 @@ def compute_max_avg(csv_file, column_name):
 
     with open(csv_file, mode='r') as file:
         reader = csv.DictReader(file)
-        for row in reader:
+        for index, row in enumerate(reader):
+            # Only the rows in [first_row, last_row) are considered
+            if index < first_row or (last_row is not None and index >= last_row):
+                continue
             value_str = row[column_name].strip()
             if value_str:  # Check if the value is not empty
                 value = float(value_str)
@@ -71,6 +78,56 @@ def compute_max_avg(csv_file, column_name):
     return max_value, avg_value
 
 
+# Description: This function returns the number of warmup rows of the metrics csv, the rows before the per call
+# update results latency settles. The latency of the first minutes (JVM warmup, empty caches, first partitions)
+# otherwise skews the averages of a run
+# Input Parameters: metrics csv file, samples averaged per batch
+def find_warmup_rows(csv_file, window):
+    values = []
+    with open(csv_file, mode='r') as file:
+        reader = csv.DictReader(file)
+        for row in reader:
+            value_str = row['updateResultsPerCall_success'].strip()
+            values.append(float(value_str) if value_str else None)
+
+    if window <= 0:
+        return 0, len(values)
+    # Rows without a value yet, before the first update results call, are part of the warmup
+    first_value = next((index for index, value in enumerate(values) if value is not None), len(values))
+    samples = [value for value in values[first_value:] if value is not None]
+    end = warmup_end(samples, window)
+    if end is None:
+        return 0, len(values)
+    # Row index of the first steady state sample
+    seen = 0
+    for index in range(first_value, len(values)):
+        if values[index] is not None:
+            if seen == end:
+                return index, len(values)
+            seen += 1
+    return len(values), len(values)
+
+
+def print_latency(label, csv_file, column_name, count_column_name, warmup_rows):
+    phases = [("", warmup_rows, None)]
+    if warmup_rows > 0:
+        phases.append((" (warmup)", 0, warmup_rows))
+    for phase, first_row, last_row in phases:
+        max_val, avg_val = compute_max_avg(csv_file, column_name, first_row, last_row)
+        if count_column_name is not None:
+            count_max_val, count_avg_val = compute_max_avg(csv_file, count_column_name, first_row, last_row)
+            if max_val is None or count_max_val is None:
+                max_val = None
+            else:
+                max_val, avg_val = max_val / count_max_val, avg_val / count_avg_val
+        if max_val is not None and avg_val is not None:
+            max_val = round(max_val, 2)
+            avg_val = round(avg_val, 2)
+            print(f"{label} Latency Max / Avg value{phase}: {max_val} / {avg_val}")
+        else:
+            print(f"No valid values found in the specified column - {count_column_name or column_name}")
+
+
 def find_file_with_value(directory, column_name, target_value):
     matching_file = ""
 
@@ -89,6 +146,8 @@ def find_file_with_value(directory, column_name, target_value):
 parser = argparse.ArgumentParser()
 parser.add_argument('-d', type=str, help='csv directory path', required=True)
 parser.add_argument('-r', type=str, help='Total results count', required=True)
+parser.add_argument('-w', type=int, default=DEFAULT_WINDOW,
+                    help='Samples averaged per batch to detect the end of warmup, 0 disables the detection')
 
 args = parser.parse_args()
 
@@ -109,49 +168,16 @@ else:
 
 csv_file_path = directory_path + '/' + csv_file_path
 
-column_name_to_parse = 'updateRecommendationsPerCall_success'
-
-max_val, avg_val = compute_max_avg(csv_file_path, column_name_to_parse)
-if max_val is not None and avg_val is not None:
-    max_val = round(max_val, 2)
-    avg_val = round(avg_val, 2)
-
-    print(f"Update Reco Latency Max / Avg value: {max_val} / {avg_val}")
-else:
-    print(f"No valid values found in the specified column - {column_name_to_parse}")
+# Latencies are reported over the steady state rows, the warmup rows separately
+warmup_rows, total_rows = find_warmup_rows(csv_file_path, args.w)
+print(f"Warmup: first {warmup_rows} of {total_rows} samples")
 
-column_name_to_parse = 'updateResultsPerCall_success'
-max_val, avg_val = compute_max_avg(csv_file_path, column_name_to_parse)
-if max_val is not None and avg_val is not None:
-    max_val = round(max_val, 2)
-    avg_val = round(avg_val, 2)
-    print(f"Update Results Latency Max / Avg value: {max_val} / {avg_val}")
-else:
-    print(f"No valid values found in the specified column - {column_name_to_parse}")
-
-column_name_to_parse = 'loadResultsByExperimentName_sum_success'
-sum_max_val, sum_avg_val = compute_max_avg(csv_file_path, column_name_to_parse)
-
-column_name_to_parse = 'loadResultsByExperimentName_count_success'
-count_max_val, count_avg_val = compute_max_avg(csv_file_path, column_name_to_parse)
-if count_max_val is not None and count_avg_val is not None and sum_max_val is not None and sum_avg_val is not None:
-    max_val = round(sum_max_val/count_max_val, 2)
-    avg_val = round(sum_avg_val/count_avg_val, 2)
-    print(f"LoadResultsByExpName Latency Max / Avg value: {max_val} / {avg_val}")
-else:
-    print(f"No valid values found in the specified column - {column_name_to_parse}")
-
-column_name_to_parse = 'generatePlots_sum_success'
-sum_max_val, sum_avg_val = compute_max_avg(csv_file_path, column_name_to_parse)
-
-column_name_to_parse = 'generatePlots_count_success'
-count_max_val, count_avg_val = compute_max_avg(csv_file_path, column_name_to_parse)
-if count_max_val is not None and count_avg_val is not None and sum_max_val is not None and sum_avg_val is not None:
-    max_val = round(sum_max_val/count_max_val, 2)
-    avg_val = round(sum_avg_val/count_avg_val, 2)
-    print(f"Generate Plots Latency Max / Avg value: {max_val} / {avg_val}")
-else:
-    print(f"No valid values found in the specified column - {column_name_to_parse}")
+print_latency("Update Reco", csv_file_path, 'updateRecommendationsPerCall_success', None, warmup_rows)
+print_latency("Update Results", csv_file_path, 'updateResultsPerCall_success', None, warmup_rows)
+print_latency("LoadResultsByExpName", csv_file_path, 'loadResultsByExperimentName_sum_success',
+              'loadResultsByExperimentName_count_success', warmup_rows)
+print_latency("Generate Plots", csv_file_path, 'generatePlots_sum_success', 'generatePlots_count_success',
+              warmup_rows)
 
 column_name_to_parse = 'kruize_memory'
 max_val, avg_val = compute_max_avg(csv_file_path, column_name_to_parse)
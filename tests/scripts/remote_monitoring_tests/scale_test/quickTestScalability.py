@@ -38,6 +38,10 @@ import requests
 import argparse
 import sys
 
+sys.path.append("../../")
+from helpers.kruize import KruizeClient
+from helpers.retry_policy import RetryPolicy
+
 # create an ArgumentParser object
 parser = argparse.ArgumentParser()
 
@@ -49,23 +53,22 @@ parser.add_argument('--name', type=str, help='enter experiment name')
 parser.add_argument('--count', type=str, help='enter experiment_start_count,experiment_end_count,num_results to create separated by , ')
 parser.add_argument('--measurement_mins', type=int, help='enter time diff b/w interval_start_time and interval_end_time')
 parser.add_argument('--move_mins', type=int, help='move the interval minutes forward by this amount')
+parser.add_argument('--max_attempts', type=int, default=5, help='maximum attempts for a request that times out or is rejected as overloaded')
 
 # parse the arguments from the command line
 args = parser.parse_args()
 
 if args.cluster_type == "minikube":
-    createExpURL = 'http://%s:%s/createExperiment'%(args.ip,args.port)
-    listRecURL = 'http://%s:%s/listRecommendations'%(args.ip,args.port)
-    updateExpURL = 'http://%s:%s/updateResults'%(args.ip,args.port)
-    createProfileURL = 'http://%s:%s/createPerformanceProfile'%(args.ip,args.port)
+    kruizeURL = 'http://%s:%s'%(args.ip,args.port)
 elif args.cluster_type == "openshift":
-    createExpURL = 'http://%s/createExperiment'%(args.ip)
-    listRecURL = 'http://%s/listRecommendations'%(args.ip)
-    updateExpURL = 'http://%s/updateResults'%(args.ip)
-    createProfileURL = 'http://%s/createPerformanceProfile'%(args.ip)
+    kruizeURL = 'http://%s'%(args.ip)
 else:
     print("Unsupported cluster type")
     sys.exit(1)
+createExpURL = kruizeURL + '/createExperiment'
+listRecURL = kruizeURL + '/listRecommendations'
+updateExpURL = kruizeURL + '/updateResults'
+createProfileURL = kruizeURL + '/createPerformanceProfile'
 
 expnameprfix = args.name
 expstart = int(args.count.split(',')[0])
@@ -73,10 +76,10 @@ expend = int(args.count.split(',')[1])
 rescount = int(args.count.split(',')[2])
 measurement_mins = args.measurement_mins
 move_mins = args.move_mins
-headers = {
-    'Content-Type': 'application/json'
-}
 timeout = (60, 60)
+retryPolicy = RetryPolicy(max_attempts=args.max_attempts)
+client = KruizeClient(kruizeURL, timeout=timeout, retry_policy=retryPolicy)
+lostResultsCount = 0
 
 print(createExpURL)
 print(updateExpURL)
@@ -93,9 +96,8 @@ perf_profile_json = "../json_files/resource_optimization_openshift.json"
 with open(perf_profile_json, "r") as f:
     profile_data = json.load(f)
 
-profile_json_payload = json.dumps(profile_data)
 # Send the request with the payload
-response = requests.post(createProfileURL, data=profile_json_payload, headers=headers)
+response = client.create_performance_profile(profile_data)
 # Check the response
 if response.status_code == 201:
     print('CreateProfile Request successful!')
@@ -126,9 +128,8 @@ for i in range(expstart, expend+1):
         resultsdata['interval_start_time'] = new_interval_start_time.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
         resultsdata['interval_end_time'] = new_interval_end_time.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
 
-        profile_json_payload = json.dumps(profile_data)
         # Send the request with the payload
-        response = requests.post(createProfileURL, data=profile_json_payload, headers=headers)
+        response = client.create_performance_profile(profile_data)
         # Check the response
         if response.status_code == 201:
             print('CreateProfile Request successful!')
@@ -137,9 +138,8 @@ for i in range(expstart, expend+1):
 
         experiment_name = "%s_%s" %(expnameprfix, i)
         createdata['experiment_name'] = experiment_name
-        create_json_payload = json.dumps([createdata])
         # Send the request with the payload
-        response = requests.post(createExpURL, data=create_json_payload, headers=headers, timeout=timeout)
+        response = client.create_experiment([createdata])
         # Check the response
         if response.status_code == 201:
             print('CreateExp Request successful!')
@@ -149,9 +149,8 @@ for i in range(expstart, expend+1):
         resultsdata['experiment_name'] = experiment_name
         for j in range(rescount):
             try:
-                profile_json_payload = json.dumps(profile_data)
                 # Send the request with the payload
-                response = requests.post(createProfileURL, data=profile_json_payload, headers=headers)
+                response = client.create_performance_profile(profile_data)
                 # Check the response
                 if response.status_code == 201:
                     print('CreateProfile Request successful!')
@@ -168,20 +167,20 @@ for i in range(expstart, expend+1):
                 resultsdata['interval_start_time'] = interval_start_time.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
                 resultsdata['interval_end_time'] = interval_end_time.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
 
-                # Convert payload to JSON string
-                results_json_payload = json.dumps([resultsdata])
-
                 # Send the request with the payload
-                response = requests.post(updateExpURL, data=results_json_payload, headers=headers, timeout=timeout)
+                response = client.update_results([resultsdata])
 
-                # Check the response
-                if response.status_code == 201:
+                # Check the response, a retried post rejected only as a duplicate of its earlier attempt was saved
+                if response.status_code == 201 or response.replayed:
                     pass
                 else:
+                    lostResultsCount += 1
                     print(f'UpdateResults Request failed with status code {response.status_code}: {response.text}')
             except requests.exceptions.Timeout:
+                lostResultsCount += 1
                 print('Timeout occurred while connecting to')
             except requests.exceptions.RequestException as e:
+                lostResultsCount += 1
                 print('An error occurred while connecting to', e)
 
             print('### Experiment: %s: Progress: %s/%s  %s/%s' %(experiment_name, i, expend, j, rescount))
@@ -189,7 +188,7 @@ for i in range(expstart, expend+1):
         # Fetch recommendations
         print(experiment_name)
         print(listRecURL)
-        response = requests.get(listRecURL + "?experiment_name=" + experiment_name)
+        response = client.list_recommendations(experiment_name)
         # Check the response
         if response.status_code == 200:
             print('ListRecommendations Request successful!')
@@ -203,3 +202,5 @@ for i in range(expstart, expend+1):
 
     print('Request successful!  Completed: Day: %s for %s-%s  %s/%s'  %(daynum, expstart, expend, j, rescount))
 
+print("Lost results count: %s" % (lostResultsCount))
+retryPolicy.stats.print_summary()
@@ -1,11 +1,19 @@
 import argparse
-import copy
-import datetime
 import json
+import sys
 import time
 
 import requests
 
+sys.path.append("../../")
+from helpers.api_metrics import ApiMetrics, start_metrics_server
+from helpers.json_codec import AUTO_CODEC, SUPPORTED_CODECS, set_codec
+from helpers.kruize import KruizeClient
+from helpers.result_payload import ResultPayloadFactory
+from helpers.results_checkpoint import ResultsCheckpoint
+from helpers.retry_policy import RetryPolicy
+from helpers.steady_state import DEFAULT_WINDOW, split_warmup, summarize
+
 
 def loadData():
     json_file = open("./json_files/create_exp.json", "r")
@@ -22,9 +30,8 @@ def loadData():
 def updateRecommendation(experiment_name, endDate):
     try:
         # Send the request with the payload
-        payloadRecommendationURL = "%s?experiment_name=%s&interval_end_time=%s" % (
-            updateRecommendationURL, experiment_name, endDate.strftime('%Y-%m-%dT%H:%M:%S.%fZ')[:-4] + 'Z')
-        response = requests.post(payloadRecommendationURL, data={}, headers=headers, timeout=timeout)
+        response = client.update_recommendations(experiment_name, None,
+                                                 endDate.strftime('%Y-%m-%dT%H:%M:%S.%fZ')[:-4] + 'Z')
         # Check the response
         if response.status_code == 201:
             #data = response.json()
@@ -33,28 +40,39 @@ def updateRecommendation(experiment_name, endDate):
             pass
         else:
             print(
-                f'{payloadRecommendationURL} Request failed with status code {response.status_code}: {response.text}')
+                f'{response.url} Request failed with status code {response.status_code}: {response.text}')
             #requests.post(createProfileURL, data=profile_json_payload, headers=headers)
     except requests.exceptions.Timeout:
         print('updateRecommendation Timeout occurred while connecting to')
     except requests.exceptions.RequestException as e:
         print('updateRecommendation Timeout occurred while connecting to', e)
 
-def postResultsInBulk(expName, bulkData):
-    json_payload = json.dumps(bulkData)
+def printSteadyState(label, warmupTimes, steadyTimes):
+    for phase, times in [("steady state", steadyTimes), ("warmup", warmupTimes)]:
+        stats = summarize(times)
+        if stats is not None:
+            print("%s %s: count : %s  mean : %.3fs  p50 : %.3fs  p99 : %.3fs  max : %.3fs" % (
+                label, phase, stats["count"], stats["mean"], stats["p50"], stats["p99"], stats["max"]))
+
+def postResultsInBulk(expName, bulkData, resultsCount):
+    global lostResultsCount
     try:
         # Send the request with the payload
-        response = requests.post(updateExpURL, data=json_payload, headers=headers, timeout=timeout)
-        # Check the response
-        if response.status_code == 201:
-            pass
+        response = client.update_results(bulkData)
+        # Check the response, a retried bulk post rejected only as duplicates of its earlier attempt was saved
+        if response.status_code == 201 or response.replayed:
+            return True
         else:
+            lostResultsCount += resultsCount
             print(f'Request failed with status code {expName} {response.status_code}: {response.text}')
             #requests.post(createProfileURL, data=profile_json_payload, headers=headers)
     except requests.exceptions.Timeout:
+        lostResultsCount += resultsCount
         print('Timeout occurred while connecting to')
     except requests.exceptions.RequestException as e:
+        lostResultsCount += resultsCount
         print('An error occurred while connecting to', e)
+    return False
 
 if __name__ == "__main__":
     debug = False
@@ -70,34 +88,57 @@ if __name__ == "__main__":
     parser.add_argument('--startdate', type=str, help='Specify start date and time in  "%Y-%m-%dT%H:%M:%S.%fZ" format.')
     parser.add_argument('--minutesjump', type=int,
                         help='specify the time difference between the start time and end time of the interval.')
+    parser.add_argument('--maxattempts', type=int, default=5,
+                        help='specify the maximum number of attempts for a request that times out or is rejected as overloaded.')
+    parser.add_argument('--compression', type=str, choices=['gzip'], default=None,
+                        help='specify the Content-Encoding used to compress the bulk updateResults payloads.')
+    parser.add_argument('--jsoncodec', type=str, choices=SUPPORTED_CODECS + [AUTO_CODEC], default=None,
+                        help='specify the json codec used to serialize the payloads, orjson and msgspec need to be installed.')
+    parser.add_argument('--latencyfile', type=str, default=None,
+                        help='specify the file prefix to write the per API latency summary to, as <prefix>.csv and <prefix>.json.')
+    parser.add_argument('--metricsport', type=int, default=None,
+                        help='specify the port to serve the live per API latency metrics on in Prometheus format.')
+    parser.add_argument('--checkpointfile', type=str, default=None,
+                        help='specify the file to save the last acknowledged interval_end_time of every experiment to.')
+    parser.add_argument('--resume', action='store_true',
+                        help='skip the intervals the checkpoint file records as acknowledged by an earlier run.')
+    parser.add_argument('--warmupwindow', type=int, default=DEFAULT_WINDOW,
+                        help='specify the number of experiments averaged per batch to detect the end of warmup, 0 disables the detection.')
 
     # parse the arguments from the command line
     args = parser.parse_args()
+    if args.resume and not args.checkpointfile:
+        parser.error('--resume needs --checkpointfile')
     if args.port != 0:
-        createExpURL = 'http://%s:%s/createExperiment' % (args.ip, args.port)
-        updateExpURL = 'http://%s:%s/updateResults' % (args.ip, args.port)
-        createProfileURL = 'http://%s:%s/createPerformanceProfile' % (args.ip, args.port)
-        updateExpURL = 'http://%s:%s/updateResults' % (args.ip, args.port)
-        updateRecommendationURL = 'http://%s:%s/updateRecommendations' % (args.ip, args.port)
+        kruizeURL = 'http://%s:%s' % (args.ip, args.port)
     else:
-        createExpURL = 'http://%s/createExperiment' % (args.ip)
-        updateExpURL = 'http://%s/updateResults' % (args.ip)
-        createProfileURL = 'http://%s/createPerformanceProfile' % (args.ip)
-        updateExpURL = 'http://%s/updateResults' % (args.ip)
-        updateRecommendationURL = 'http://%s/updateRecommendations' % (args.ip)
+        kruizeURL = 'http://%s' % (args.ip)
+    createExpURL = kruizeURL + '/createExperiment'
+    updateExpURL = kruizeURL + '/updateResults'
+    createProfileURL = kruizeURL + '/createPerformanceProfile'
 
     expnameprfix = args.name
     expcount = int(args.count.split(',')[0])
     rescount = int(args.count.split(',')[1])
     minutesjump = args.minutesjump
-    headers = {
-        'Content-Type': 'application/json'
-    }
     timeout = (60, 60)
+    retryPolicy = RetryPolicy(max_attempts=args.maxattempts)
+    if args.jsoncodec:
+        print("json codec : %s" % (set_codec(args.jsoncodec).name))
+    apiMetrics = ApiMetrics()
+    if args.metricsport:
+        start_metrics_server(apiMetrics, args.metricsport)
+    client = KruizeClient(kruizeURL, timeout=timeout, retry_policy=retryPolicy, compression=args.compression,
+                          metrics=apiMetrics)
+    lostResultsCount = 0
+    skippedResultsCount = 0
+    checkpoint = ResultsCheckpoint.load(args.checkpointfile, args.name) if args.checkpointfile else None
     data, createdata, profile_data = loadData()
 
     if args.startdate:
         data['interval_end_time'] = args.startdate
+    # The results.json template is serialized once, only the experiment name and interval times change per result
+    resultPayloads = ResultPayloadFactory(data, data['interval_end_time'], minutesjump)
 
     if debug:
         print(createExpURL)
@@ -110,8 +151,7 @@ if __name__ == "__main__":
         print("minutes jump : %s" % (minutesjump))
 
     #Create a performance profile
-    profile_json_payload = json.dumps(profile_data)
-    response = requests.post(createProfileURL, data=profile_json_payload, headers=headers)
+    response = client.create_performance_profile(profile_data)
     if response.status_code == 201:
         if debug: print('Request successful!')
         if expcount > 10 : time.sleep(5)
@@ -121,6 +161,8 @@ if __name__ == "__main__":
     createExp_time = 0.0
     bulkDataPost_time = 0.0
     updateRec_time = 0.0
+    # Per experiment times, in order, to separate the warmup from the steady state
+    experimentTimes = []
 
     #Create experiment and post results
     start_time = time.time()
@@ -128,38 +170,38 @@ if __name__ == "__main__":
         try:
             successfulCnt = 0
             experiment_name = "%s_%s" % (expnameprfix, i)
+            # Without a start date, the intervals of an experiment follow the ones of the previous experiment
+            firstInterval = 0 if args.startdate else (i - 1) * rescount
+            # Intervals of the experiment acknowledged by an earlier run
+            postedCount = 0
+            if args.resume and checkpoint.last_end_time(i) is not None:
+                postedCount = min(rescount, max(0, resultPayloads.intervals_ended_by(checkpoint.last_end_time(i)) -
+                                                firstInterval))
+            if postedCount == rescount:
+                skippedResultsCount += rescount
+                continue
             createdata['experiment_name'] = experiment_name
-            create_json_payload = json.dumps([createdata])
             #Create experiment
             #requests.post(createProfileURL, data=profile_json_payload, headers=headers)
             createExp_start_time = time.time()
-            response = requests.post(createExpURL, data=create_json_payload, headers=headers, timeout=timeout)
+            response = client.create_experiment([createdata])
             createExp_elapsed_time = time.time() -createExp_start_time
-            j = 0
-            if args.startdate:
-                data['interval_end_time'] = args.startdate
             if response.status_code == 201 or response.status_code == 409 or response.status_code == 400:
-                bulkdata = []
-                totalResultDates = []
-                for j in range(rescount):
-                    interval_start_time = datetime.datetime.strptime(data['interval_end_time'], '%Y-%m-%dT%H:%M:%S.%fZ')
-                    interval_end_time = datetime.datetime.strptime(data['interval_end_time'],
-                                                                   '%Y-%m-%dT%H:%M:%S.%fZ') + datetime.timedelta(
-                        minutes=minutesjump)
-                    data['interval_end_time'] = interval_end_time.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
-                    totalResultDates.append(interval_end_time)
-                    data['experiment_name'] = experiment_name
-                    data['interval_start_time'] = interval_start_time.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
-                    data['interval_end_time'] = interval_end_time.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
-                    bulkdata.append(copy.deepcopy(data))
+                skippedResultsCount += postedCount
+                bulkdata = resultPayloads.bulk_body(experiment_name, firstInterval + postedCount,
+                                                    rescount - postedCount)
                 bulkDataPost_start_time = time.time()
-                postResultsInBulk(experiment_name, bulkdata)
+                posted = postResultsInBulk(experiment_name, bulkdata, rescount - postedCount)
                 bulkDataPost_elapsed_time = time.time() - bulkDataPost_start_time
                 # Get the maximum datetime object
-                max_datetime = max(totalResultDates)
+                max_datetime = resultPayloads.interval_end_time(firstInterval + rescount - 1)
                 updateRec_start_time = time.time()
                 updateRecommendation(experiment_name, max_datetime,)
                 updateRec_elapsed_time = time.time() - updateRec_start_time
+                # Acknowledged only once the recommendation was requested, a run resumed after a crash in between
+                # posts the results of the experiment again and generates its recommendation
+                if posted and checkpoint is not None:
+                    checkpoint.acknowledge(i, max_datetime.strftime('%Y-%m-%dT%H:%M:%S.%fZ'))
             else:
                 print(f'Request failed with status code {response.status_code}: {response.text}')
         except requests.exceptions.Timeout:
@@ -171,6 +213,7 @@ if __name__ == "__main__":
         createExp_time += createExp_elapsed_time
         bulkDataPost_time += bulkDataPost_elapsed_time
         updateRec_time += updateRec_elapsed_time
+        experimentTimes.append((createExp_elapsed_time, bulkDataPost_elapsed_time, updateRec_elapsed_time))
 
     elapsed_time = time.time() - start_time
     hours, rem = divmod(elapsed_time, 3600)
@@ -185,3 +228,20 @@ if __name__ == "__main__":
     hours, rem = divmod(updateRec_time, 3600)
     minutes, seconds = divmod(rem, 60)
     print("updateRec elapsed time: {:0>2}:{:0>2}:{:05.2f}".format(int(hours), int(minutes), seconds))
+    print("Lost results count: %s" % (lostResultsCount))
+    # The warmup (JVM warmup, cache fill, first partitions) ends when the time per experiment settles
+    totalTimes = [sum(times) for times in experimentTimes]
+    warmupTimes, steadyTimes = split_warmup(totalTimes, args.warmupwindow)
+    warmupCount = len(warmupTimes)
+    print("Warmup: %s experiments, %.2fs" % (warmupCount, sum(warmupTimes)))
+    for index, label in enumerate(["createExp", "bulkDataPost", "updateRec"]):
+        times = [experiment[index] for experiment in experimentTimes]
+        printSteadyState(label, times[:warmupCount], times[warmupCount:])
+    if args.resume:
+        print("Skipped results count: %s" % (skippedResultsCount))
+    retryPolicy.stats.print_summary()
+    client.print_compression_summary()
+    apiMetrics.print_summary()
+    if args.latencyfile:
+        apiMetrics.write_csv(args.latencyfile + ".csv")
+        apiMetrics.write_json(args.latencyfile + ".json")
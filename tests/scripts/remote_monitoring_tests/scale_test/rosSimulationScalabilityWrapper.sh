@@ -24,6 +24,9 @@ initial_startdate="2023-01-01T00:00:00.000Z"
 limit_days="15"
 interval_hours="6"
 outputdir="results"
+compression=""
+checkpoint_file=""
+resume=""
 
 # Parse command-line arguments
 while [[ $# -gt 0 ]]; do
@@ -72,6 +75,18 @@ while [[ $# -gt 0 ]]; do
             outputdir="$2"
             shift 2
 	    ;;
+        --compression)
+            compression="$2"
+            shift 2
+            ;;
+        --checkpointfile)
+            checkpoint_file="$2"
+            shift 2
+            ;;
+        --resume)
+            resume="true"
+            shift
+            ;;
         *)
             echo "Unknown option: $1"
             exit 1
@@ -81,10 +96,18 @@ done
 
 if [[ -z "$ip" || -z "$port" || -z "$count" || -z "$minutesjump" || -z "$name_prefix" ]]; then
     echo "Missing required arguments."
-    echo "Usage: $0 --ip <IP> --port <port> --count <count> --minutesjump <minutesjump> --name <name_prefix> --initialstartdate <initial_startdate> --limitdays <limit_days> --intervalhours <interval_hours>"
+    echo "Usage: $0 --ip <IP> --port <port> --count <count> --minutesjump <minutesjump> --name <name_prefix> --initialstartdate <initial_startdate> --limitdays <limit_days> --intervalhours <interval_hours> [--compression gzip] [--checkpointfile <file>] [--resume]"
     exit 1
 fi
 
+# The checkpoint records the last results posted for every experiment, a resumed run skips them
+if [[ -z "$checkpoint_file" ]]; then
+    checkpoint_file="${name_prefix}.checkpoint.json"
+fi
+if [[ -z "$resume" ]]; then
+    rm -f "${checkpoint_file}"
+fi
+
 # Calculate the number of iterations based on interval and limit days
 iterations=$(( $limit_days * 24 / $interval_hours ))
 
@@ -95,6 +118,13 @@ for (( i = 0; i < $iterations; i++ )); do
 
     # Build the full command
     full_command="python3 -u rosSimulationScalabilityTest.py --ip $ip --port $port --count $count --minutesjump $minutesjump --startdate $current_startdate --name ${name_prefix}"
+    if [[ -n "$compression" ]]; then
+        full_command="${full_command} --compression ${compression}"
+    fi
+    full_command="${full_command} --checkpointfile ${checkpoint_file}"
+    if [[ -n "$resume" ]]; then
+        full_command="${full_command} --resume"
+    fi
 
     # Execute the command
     echo "Executing: $full_command"
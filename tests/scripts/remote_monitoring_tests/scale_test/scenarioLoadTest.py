@@ -0,0 +1,74 @@
+"""
+Copyright (c) 2024, 2024 Red Hat, IBM Corporation and others.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+# Scenario load test: runs a workload scenario, a built-in one (quickTest, rosSimulation, rosMixed) or a .json / .yaml
+# scenario file, see scenarios/ros_mixed.yaml for the format.
+#
+# python3 scenarioLoadTest.py --ip <kruize ip> --port <kruize port> --scenario rosMixed [--count 1000] [--users 20]
+
+import argparse
+import sys
+
+sys.path.append("../../")
+from helpers.api_metrics import ApiMetrics
+from helpers.kruize import KruizeClient
+from helpers.workload_scenario import BUILTIN_SCENARIOS, ScenarioDriver, load_scenario
+from openLoopLoadTest import kruize_url, loadData
+
+
+def main(args):
+    scenario = load_scenario(args.scenario)
+    # Command line overrides of the scenario
+    if args.count:
+        scenario["experiments"]["count"] = args.count
+    if args.name:
+        scenario["experiments"]["name_prefix"] = args.name
+    if args.users:
+        scenario["users"] = args.users
+    if args.duration:
+        scenario["duration"] = args.duration
+
+    data, createdata, profile_data = loadData()
+    apiMetrics = ApiMetrics()
+    with KruizeClient(kruize_url(args.ip, args.port), pool_size=max(10, scenario.get("users", 1)),
+                      metrics=apiMetrics) as client:
+        response = client.create_performance_profile(profile_data)
+        print("createPerformanceProfile status code : %s" % (response.status_code))
+        driver = ScenarioDriver(client, scenario, createdata, data, args.seed)
+        driver.run()
+
+    driver.print_summary()
+    apiMetrics.print_summary()
+    if args.latencyfile:
+        apiMetrics.write_csv(args.latencyfile + ".csv")
+        apiMetrics.write_json(args.latencyfile + ".json")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--ip', type=str, required=True, help='specify kruize ip')
+    parser.add_argument('--port', type=int, default=0, help='specify kruize port')
+    parser.add_argument('--scenario', type=str, required=True,
+                        help='specify a built-in scenario (%s) or a .json / .yaml scenario file' % (
+                            ", ".join(BUILTIN_SCENARIOS)))
+    parser.add_argument('--name', type=str, default=None, help='specify experiment name prefix')
+    parser.add_argument('--count', type=int, default=None, help='specify the number of experiments')
+    parser.add_argument('--users', type=int, default=None, help='specify the number of concurrent users')
+    parser.add_argument('--duration', type=float, default=None, help='specify the maximum test duration in seconds')
+    parser.add_argument('--seed', type=int, default=None, help='specify the random seed of the api mix')
+    parser.add_argument('--latencyfile', type=str, default=None,
+                        help='specify the file prefix to write the per API latency summary to, as <prefix>.csv and <prefix>.json.')
+    main(parser.parse_args())
@@ -0,0 +1,65 @@
+"""
+Copyright (c) 2024, 2024 Red Hat, IBM Corporation and others.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+# Traffic replay: reissues the Kruize requests captured by the python clients. Any test or driver using KruizeClient
+# or AsyncKruizeClient captures its requests when KRUIZE_TRAFFIC_CAPTURE is set:
+#
+# KRUIZE_TRAFFIC_CAPTURE=/tmp/ros.cap python3 rosSimulationScalabilityTest.py --ip <kruize ip> --port <kruize port> ...
+# python3 trafficReplay.py --capture /tmp/ros.cap --ip <kruize ip> --port <kruize port> --speed 10
+#
+# --speed 1 replays in real time, N N times faster, 0 as fast as possible
+
+import argparse
+import asyncio
+import sys
+
+sys.path.append("../../")
+from helpers.api_metrics import ApiMetrics
+from helpers.kruize_async import AsyncKruizeClient, DEFAULT_MAX_IN_FLIGHT
+from helpers.traffic_capture import read_capture
+from helpers.traffic_replay import TrafficReplayer
+from openLoopLoadTest import kruize_url
+
+
+async def main(args):
+    capturedRequests = list(read_capture(args.capture))
+    print("Captured requests : %s" % (len(capturedRequests)))
+    apiMetrics = ApiMetrics()
+    # The replayed requests are not captured again
+    async with AsyncKruizeClient(kruize_url(args.ip, args.port), max_in_flight=args.maxinflight,
+                                 metrics=apiMetrics, capture=False) as client:
+        replayer = TrafficReplayer(client, capturedRequests, args.speed or None)
+        await replayer.run()
+
+    replayer.print_summary()
+    apiMetrics.print_summary()
+    if args.latencyfile:
+        apiMetrics.write_csv(args.latencyfile + ".csv")
+        apiMetrics.write_json(args.latencyfile + ".json")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--capture', type=str, required=True, help='specify the capture file to replay')
+    parser.add_argument('--ip', type=str, required=True, help='specify kruize ip')
+    parser.add_argument('--port', type=int, default=0, help='specify kruize port')
+    parser.add_argument('--speed', type=float, default=1,
+                        help='specify the replay speed, 1 for real time, N for N times faster, 0 as fast as possible')
+    parser.add_argument('--maxinflight', type=int, default=DEFAULT_MAX_IN_FLIGHT,
+                        help='specify the maximum number of requests in flight')
+    parser.add_argument('--latencyfile', type=str, default=None,
+                        help='specify the file prefix to write the per API latency summary to, as <prefix>.csv and <prefix>.json.')
+    asyncio.run(main(parser.parse_args()))
@@ -1,11 +1,15 @@
 import argparse
-import copy
-import datetime
 import json
+import os
+import sys
 import time
 
 import requests
 
+# helpers/ sits next to this script, add its directory so the script runs from any working directory
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from helpers.result_payload import ResultPayloadFactory
+
 
 def loadData():
     createdata = {"version":"1.0","experiment_name":"quarkus-resteasy-kruize-min-http-response-time-db_10","cluster_name":"cluster-one-division-bell","performance_profile":"resource-optimization-openshift","mode":"monitor","target_cluster":"remote","kubernetes_objects":[{"type":"deployment","name":"tfb-qrh-deployment_5","namespace":"default_5","containers":[{"container_image_name":"kruize/tfb-db:1.15","container_name":"tfb-server-0"},{"container_image_name":"kruize/tfb-qrh:1.13.2.F_et17","container_name":"tfb-server-1"}]}],"trial_settings":{"measurement_duration":"15min"},"recommendation_settings":{"threshold":"0.1"}}
@@ -35,10 +39,9 @@ def updateRecommendation(experiment_name, endDate):
         print('updateRecommendation Timeout occurred while connecting to', e)
 
 def postResultsInBulk(expName, bulkData):
-    json_payload = json.dumps(bulkData)
     try:
         # Send the request with the payload
-        response = requests.post(updateExpURL, data=json_payload, headers=headers, timeout=timeout)
+        response = requests.post(updateExpURL, data=bulkData, headers=headers, timeout=timeout)
         # Check the response
         if response.status_code == 201:
             pass
@@ -92,6 +95,8 @@ if __name__ == "__main__":
 
     if args.startdate:
         data['interval_end_time'] = args.startdate
+    # The result template is serialized once, only the experiment name and interval times change per result
+    resultPayloads = ResultPayloadFactory(data, data['interval_end_time'], minutesjump)
 
     if debug:
         print(createExpURL)
@@ -123,26 +128,13 @@ if __name__ == "__main__":
             #Create experiment
             #requests.post(createProfileURL, data=profile_json_payload, headers=headers)
             response = requests.post(createExpURL, data=create_json_payload, headers=headers, timeout=timeout)
-            j = 0
-            if args.startdate:
-                data['interval_end_time'] = args.startdate
             if response.status_code == 201 or response.status_code == 409 or response.status_code == 400:
-                bulkdata = []
-                totalResultDates = []
-                for j in range(rescount):
-                    interval_start_time = datetime.datetime.strptime(data['interval_end_time'], '%Y-%m-%dT%H:%M:%S.%fZ')
-                    interval_end_time = datetime.datetime.strptime(data['interval_end_time'],
-                                                                   '%Y-%m-%dT%H:%M:%S.%fZ') + datetime.timedelta(
-                        minutes=minutesjump)
-                    data['interval_end_time'] = interval_end_time.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
-                    totalResultDates.append(interval_end_time)
-                    data['experiment_name'] = experiment_name
-                    data['interval_start_time'] = interval_start_time.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
-                    data['interval_end_time'] = interval_end_time.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
-                    bulkdata.append(copy.deepcopy(data))
+                # Without a start date, the intervals of an experiment follow the ones of the previous experiment
+                firstInterval = 0 if args.startdate else (i - 1) * rescount
+                bulkdata = resultPayloads.bulk_body(experiment_name, firstInterval, rescount)
                 postResultsInBulk(experiment_name, bulkdata)
                 # Get the maximum datetime object
-                max_datetime = max(totalResultDates)
+                max_datetime = resultPayloads.interval_end_time(firstInterval + rescount - 1)
                 updateRecommendation(experiment_name, max_datetime,)
             else:
                 print(f'Request failed with status code {response.status_code}: {response.text}')